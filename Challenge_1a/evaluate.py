@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Accuracy-versus-speed evaluation for Challenge 1a
+Runs every extraction mode, backend, heading strategy and region-masking
+setting over the sample PDFs, scores the outlines against the expected
+outputs (heading precision/recall, level accuracy, title match) and prints
+them with latency and peak memory as a Pareto table, so the fastest
+configuration meeting an accuracy bar can be picked.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from contextlib import redirect_stdout
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional, NamedTuple
+
+# The shared parsing core lives in ../common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from process_pdfs import PDFOutlineExtractor
+from common.document_parser import (
+    DOCUMENT_STORE_ENV, clear_document_cache, set_backend_policy, set_document_store,
+    set_region_masking
+)
+
+SAMPLE_DATASET = Path(__file__).resolve().parent / "sample_dataset"
+
+# The expected outlines number pages from 0, the extractor from 1
+PAGE_OFFSET = 1
+
+# Titles at least this similar (after normalization) count as a match
+TITLE_MATCH_RATIO = 0.9
+
+
+class Config(NamedTuple):
+    mode: str          # 'full', 'quick' or 'title' (title-only catalog pass)
+    backend: str       # 'auto', 'pdfplumber' or 'pypdf2'
+    headings: str      # Heading strategy, see PDFOutlineExtractor.HEADING_STRATEGIES
+    mask: bool         # Mask table and figure regions
+
+    @property
+    def name(self) -> str:
+        if self.mode == 'title':
+            return 'title-only'
+        return f"{self.mode}/{self.backend}/{self.headings}" + ("+mask" if self.mask else "")
+
+
+class Score(NamedTuple):
+    config: Config
+    precision: Optional[float]   # None when the configuration produces no outline
+    recall: Optional[float]
+    f1: Optional[float]
+    level_accuracy: Optional[float]
+    title_match: float
+    ms_per_file: float
+    peak_mb: Optional[float]     # Peak traced Python allocations of a single file
+    pareto: bool = False
+
+    def to_dict(self) -> Dict:
+        record = self._asdict()
+        record['config'] = self.config.name
+        return record
+
+
+def configurations() -> List[Config]:
+    """Every supported combination; masking needs pdfplumber, so it is skipped for PyPDF2."""
+    configs = []
+    for mode in ('full', 'quick'):
+        for backend in ('auto', 'pdfplumber', 'pypdf2'):
+            for headings in PDFOutlineExtractor.HEADING_STRATEGIES:
+                for mask in (False, True):
+                    if not (mask and backend == 'pypdf2'):
+                        configs.append(Config(mode, backend, headings, mask))
+    configs.append(Config('title', 'auto', 'patterns', False))
+    return configs
+
+
+def normalize(text: str) -> str:
+    return ' '.join(text.split()).casefold()
+
+
+def match_headings(predicted: List[Dict], expected: List[Dict]) -> Tuple[int, int]:
+    """(matched headings, matched headings with the right level).
+
+    Headings match one-to-one on normalized text and page.
+    """
+    unmatched = list(expected)
+    matched = level_matched = 0
+    for heading in predicted:
+        text = normalize(heading['text'])
+        for candidate in unmatched:
+            if normalize(candidate['text']) == text and heading['page'] - candidate['page'] == PAGE_OFFSET:
+                unmatched.remove(candidate)
+                matched += 1
+                level_matched += candidate['level'] == heading['level']
+                break
+    return matched, level_matched
+
+
+def title_matches(predicted: str, expected: str) -> bool:
+    a, b = normalize(predicted), normalize(expected)
+    return a == b or SequenceMatcher(None, a, b).ratio() >= TITLE_MATCH_RATIO
+
+
+def run_config(config: Config, pdf_files: List[Path], extractor: PDFOutlineExtractor,
+               trace_memory: bool = False) -> Tuple[List[Dict], List[float], float]:
+    """Outputs, seconds per file and peak traced MB of one configuration, parsing from scratch."""
+    set_backend_policy(config.backend)
+    set_region_masking(config.mask)
+    outputs, seconds, peak = [], [], 0.0
+
+    for pdf_file in pdf_files:
+        clear_document_cache()
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            if config.mode == 'title':
+                output = {"title": extractor.extract_title_lazy(str(pdf_file)), "outline": []}
+            else:
+                output = extractor.extract_outline(str(pdf_file), quick=config.mode == 'quick',
+                                                   heading_strategy=config.headings)
+        seconds.append(time.perf_counter() - start)
+        if trace_memory:
+            peak = max(peak, tracemalloc.get_traced_memory()[1] / 1e6)
+            tracemalloc.stop()
+        outputs.append(output)
+
+    return outputs, seconds, peak
+
+
+def score(config: Config, outputs: List[Dict], expected: List[Dict], seconds: List[float],
+          peak_mb: Optional[float]) -> Score:
+    predicted_total = expected_total = matched = level_matched = titles = 0
+    for output, truth in zip(outputs, expected):
+        found, right_level = match_headings(output['outline'], truth['outline'])
+        predicted_total += len(output['outline'])
+        expected_total += len(truth['outline'])
+        matched += found
+        level_matched += right_level
+        titles += title_matches(output['title'], truth['title'])
+
+    if config.mode == 'title':
+        precision = recall = f1 = level_accuracy = None
+    else:
+        precision = matched / predicted_total if predicted_total else 0.0
+        recall = matched / expected_total if expected_total else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        level_accuracy = level_matched / matched if matched else 0.0
+
+    return Score(config, precision, recall, f1, level_accuracy, titles / len(outputs),
+                 1000 * sum(seconds) / len(seconds), peak_mb)
+
+
+def mark_pareto(scores: List[Score]) -> List[Score]:
+    """Flag configurations no other one beats on F1, title match and latency at once."""
+    def dominates(a: Score, b: Score) -> bool:
+        a_key = (a.f1 or 0.0, a.title_match, -a.ms_per_file)
+        b_key = (b.f1 or 0.0, b.title_match, -b.ms_per_file)
+        return all(x >= y for x, y in zip(a_key, b_key)) and a_key != b_key
+
+    return [s._replace(pareto=not any(dominates(other, s) for other in scores)) for s in scores]
+
+
+def evaluate(dataset: Path = SAMPLE_DATASET, configs: Optional[List[Config]] = None,
+             trace_memory: bool = True) -> List[Score]:
+    """Score every configuration over ``dataset``'s pdfs/ against its outputs/."""
+    pdf_files = sorted((dataset / "pdfs").glob("*.pdf"))
+    expected = []
+    for pdf_file in pdf_files:
+        with open(dataset / "outputs" / f"{pdf_file.stem}.json", encoding="utf-8") as f:
+            expected.append(json.load(f))
+
+    # Parses must not come from an earlier run
+    os.environ.pop(DOCUMENT_STORE_ENV, None)
+    set_document_store(None)
+    extractor = PDFOutlineExtractor()
+
+    scores = []
+    try:
+        for config in configs or configurations():
+            outputs, seconds, _ = run_config(config, pdf_files, extractor)
+            # Tracing slows execution down, so memory is measured in a second pass
+            peak_mb = run_config(config, pdf_files, extractor, trace_memory=True)[2] if trace_memory else None
+            scores.append(score(config, outputs, expected, seconds, peak_mb))
+    finally:
+        set_backend_policy(None)
+        set_region_masking(None)
+        clear_document_cache()
+    return mark_pareto(scores)
+
+
+def format_table(scores: List[Score]) -> str:
+    def percent(value: Optional[float]) -> str:
+        return f"{100 * value:5.1f}" if value is not None else "    -"
+
+    lines = [f"{'configuration':<34} {'prec':>5} {'rec':>5} {'F1':>5} {'level':>5} "
+             f"{'title':>5} {'ms/pdf':>7} {'peak MB':>7}  pareto"]
+    for s in sorted(scores, key=lambda s: s.ms_per_file):
+        peak = f"{s.peak_mb:7.1f}" if s.peak_mb is not None else "      -"
+        lines.append(f"{s.config.name:<34} {percent(s.precision)} {percent(s.recall)} {percent(s.f1)} "
+                     f"{percent(s.level_accuracy)} {percent(s.title_match)} {s.ms_per_file:7.0f} "
+                     f"{peak}  {'*' if s.pareto else ''}")
+    return "\n".join(lines)
+
+
+def fastest_meeting(scores: List[Score], min_f1: float) -> Optional[Score]:
+    eligible = [s for s in scores if s.f1 is not None and s.f1 >= min_f1]
+    return min(eligible, key=lambda s: s.ms_per_file) if eligible else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score extraction configurations against expected outlines")
+    parser.add_argument("--dataset", type=Path, default=SAMPLE_DATASET,
+                        help="directory with pdfs/ and expected outputs/ (default: sample_dataset)")
+    parser.add_argument("--only", metavar="TEXT",
+                        help="only run configurations whose name contains TEXT (e.g. 'full/auto')")
+    parser.add_argument("--min-f1", type=float, default=0.0,
+                        help="report the fastest configuration with at least this heading F1 (0-1)")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the tracemalloc pass that measures peak memory")
+    parser.add_argument("--json", metavar="PATH", help="also write the scores as JSON to PATH")
+    args = parser.parse_args()
+
+    configs = [c for c in configurations() if not args.only or args.only in c.name]
+    scores = evaluate(args.dataset, configs, trace_memory=not args.no_memory)
+    print(format_table(scores))
+
+    best = fastest_meeting(scores, args.min_f1)
+    if best is not None:
+        print(f"\nFastest with F1 >= {args.min_f1:.2f}: {best.config.name} "
+              f"(F1 {best.f1:.3f}, {best.ms_per_file:.0f} ms/pdf)")
+    else:
+        print(f"\nNo configuration reaches F1 {args.min_f1:.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([s.to_dict() for s in scores], f, indent=2)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Output validation for Challenge 1a
+Compiles the output schema once and validates outlines either with a fast
+structural check (hot path) or in batches against the full JSON schema.
+"""
+
+import json
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional, Iterable, Iterator, NamedTuple
+from jsonschema.validators import validator_for
+
+# Schema shipped with the sample dataset, or copied next to the script in Docker
+SCHEMA_LOCATIONS = [
+    Path(__file__).resolve().parent / "sample_dataset" / "schema" / "output_schema.json",
+    Path(__file__).resolve().parent / "schema" / "output_schema.json",
+]
+
+# Used when no schema file is available
+DEFAULT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "outline": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "level": {"type": "string"},
+                    "text": {"type": "string"},
+                    "page": {"type": "integer"}
+                },
+                "required": ["level", "text", "page"]
+            }
+        }
+    },
+    "required": ["title", "outline"]
+}
+
+OUTLINE_FIELDS = (("level", str), ("text", str), ("page", int))
+
+
+class ValidationFailure(NamedTuple):
+    """One validation problem in one output."""
+    source: str      # Output identifier, usually the PDF or JSON file name
+    path: str        # Location inside the output, e.g. "outline/3/page"
+    message: str
+    check: str       # "structure" or the failing JSON schema keyword
+
+    def to_dict(self) -> Dict:
+        return self._asdict()
+
+
+class OutlineValidator:
+    """Validator for outline outputs, compiled once and reused."""
+
+    def __init__(self, schema_path: Optional[str] = None):
+        self.schema = load_schema(schema_path)
+        validator_class = validator_for(self.schema)
+        validator_class.check_schema(self.schema)
+        self._validator = validator_class(self.schema)
+
+    def quick_check(self, output: Dict, source: str = '') -> List[ValidationFailure]:
+        """Structural check of the fields every outline must have, without jsonschema."""
+        if not isinstance(output, dict):
+            return [ValidationFailure(source, '', 'output is not an object', 'structure')]
+
+        failures = []
+        if not isinstance(output.get("title"), str):
+            failures.append(ValidationFailure(source, 'title', 'missing or not a string', 'structure'))
+
+        outline = output.get("outline")
+        if not isinstance(outline, list):
+            failures.append(ValidationFailure(source, 'outline', 'missing or not an array', 'structure'))
+            return failures
+
+        for index, item in enumerate(outline):
+            if not isinstance(item, dict):
+                failures.append(ValidationFailure(source, f'outline/{index}', 'not an object', 'structure'))
+                continue
+            for field, field_type in OUTLINE_FIELDS:
+                value = item.get(field)
+                # bool is an int subclass but not a valid page number
+                if not isinstance(value, field_type) or isinstance(value, bool):
+                    failures.append(ValidationFailure(
+                        source, f'outline/{index}/{field}',
+                        f'missing or not a {field_type.__name__}', 'structure'
+                    ))
+
+        return failures
+
+    def validate(self, output: Dict, source: str = '') -> List[ValidationFailure]:
+        """Full validation: the structural check, then the compiled JSON schema."""
+        failures = self.quick_check(output, source)
+        if failures:
+            return failures
+
+        return [
+            ValidationFailure(source, '/'.join(str(p) for p in error.absolute_path),
+                              error.message, str(error.validator))
+            for error in self._validator.iter_errors(output)
+        ]
+
+    def validate_batch(self, outputs: Iterable[Tuple[str, Dict]]) -> Iterator[ValidationFailure]:
+        """Validate a stream of (source, output) pairs, yielding every failure."""
+        for source, output in outputs:
+            yield from self.validate(output, source)
+
+
+def load_schema(schema_path: Optional[str] = None) -> Dict:
+    """Load the output schema from ``schema_path`` or the known locations."""
+    candidates = [Path(schema_path)] if schema_path else SCHEMA_LOCATIONS
+    for candidate in candidates:
+        if candidate.exists():
+            with open(candidate, 'r', encoding='utf-8') as f:
+                return json.load(f)
+    return DEFAULT_SCHEMA
+
+
+def iter_output_files(output_dir: Path) -> Iterator[Tuple[str, Dict]]:
+    """Stream (file name, output) pairs from a directory of JSON outputs."""
+    for output_file in sorted(Path(output_dir).glob("*.json")):
+        try:
+            with open(output_file, 'r', encoding='utf-8') as f:
+                yield output_file.name, json.load(f)
+        except (OSError, ValueError) as e:
+            yield output_file.name, {"__error__": str(e)}
+
+
+_default_validator: Optional[OutlineValidator] = None
+
+
+def get_validator() -> OutlineValidator:
+    """Process-wide validator compiled on first use."""
+    global _default_validator
+    if _default_validator is None:
+        _default_validator = OutlineValidator()
+    return _default_validator
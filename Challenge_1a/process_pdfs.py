@@ -5,19 +5,49 @@ Extracts structured outlines from PDF documents with title and heading hierarchy
 """
 
 import os
+import sys
 import json
 import re
 import time
+import argparse
+from collections import Counter
+from functools import partial
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional
-import PyPDF2
-import pdfplumber
-from jsonschema import validate
+from typing import List, Dict, Tuple, Optional, Iterator, Union
+
+# The shared parsing core lives in ../common locally and next to this script in Docker
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from output_validation import get_validator, iter_output_files
+from common.document_parser import (
+    ParsedDocument, TextLine, iter_pages, load_document, parse_pdf, resolve_io_dirs,
+    discover_files, scan_page_font_sizes, set_document_store, set_backend_policy,
+    set_region_masking, set_ocr_deferred, finish_ocr, write_backend_log, backend_decisions,
+    record_backend_decisions
+)
+from common.profiling import DocumentProfiler, profiled
+from common.dedup import exact_duplicates, file_digest
+from common.running_lines import iter_content_lines
+from common.output_writer import OutputWriter
+from common.scheduler import run_batch
+from common.search_index import IndexedSection, open_search_index
+from common.text_normalization import NormalizedText, normalize_line
+
 
 class PDFOutlineExtractor:
     """Advanced PDF outline extractor with intelligent heading detection."""
     
+    # A line must be this much larger than the page's body text to count as a title
+    TITLE_SIZE_RATIO = 1.2
+    
+    # Quick mode: a page is analysed only if enough chars are this much larger than body text
+    HEADING_SIZE_RATIO = 1.15
+    MIN_LARGE_FONT_CHARS = 3
+    
+    # Heading detectors selectable in extract_outline()
+    HEADING_STRATEGIES = ('patterns', 'layout')
+    
     def __init__(self):
+        self.validation_failures = []
         self.heading_patterns = {
             'H1': [
                 r'^[A-Z][A-Z\s]{2,}$',  # ALL CAPS titles
@@ -47,110 +77,155 @@ class PDFOutlineExtractor:
             r'^[A-Z][a-z]+\s+[a-z]+\s+[a-z]+\s+[a-z]+',  # Longer normal sentences
             r'^[A-Z][a-z]+\s+[a-z]+\s+[a-z]+\s+[a-z]+\s+[a-z]+',  # Even longer sentences
         ]
-    
-    def extract_text_with_positions(self, pdf_path: str) -> List[Tuple[str, int, float, float]]:
-        """Extract text with page numbers and positions using pdfplumber."""
-        text_elements = []
-        
-        try:
-            with pdfplumber.open(pdf_path) as pdf:
-                for page_num, page in enumerate(pdf.pages, 1):
-                    # Extract text blocks with their positions
-                    words = page.extract_words()
-                    if words:
-                        # Group words into lines based on y-position
-                        lines = self._group_words_into_lines(words)
-                        for line in lines:
-                            if line.strip():
-                                text_elements.append((line.strip(), page_num, 0, 0))
-                    
-                    # Also extract text directly for fallback
-                    text = page.extract_text()
-                    if text:
-                        lines = text.split('\n')
-                        for line in lines:
-                            if line.strip():
-                                text_elements.append((line.strip(), page_num, 0, 0))
-        except Exception as e:
-            print(f"Error extracting text from {pdf_path}: {e}")
-            # Fallback to PyPDF2
-            return self._extract_text_pypdf2(pdf_path)
         
-        return text_elements
+        # One compiled alternation per pattern group, so a line is matched in a single call each
+        self._exclude_regex = re.compile('|'.join(f'(?:{p})' for p in self.exclude_patterns), re.IGNORECASE)
+        self._heading_regexes = [(level, re.compile('|'.join(f'(?:{p})' for p in patterns)))
+                                 for level, patterns in self.heading_patterns.items()]
     
-    def _extract_text_pypdf2(self, pdf_path: str) -> List[Tuple[str, int, float, float]]:
-        """Fallback text extraction using PyPDF2."""
-        text_elements = []
-        
-        try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                for page_num, page in enumerate(pdf_reader.pages, 1):
-                    text = page.extract_text()
-                    if text:
-                        lines = text.split('\n')
-                        for line in lines:
-                            if line.strip():
-                                text_elements.append((line.strip(), page_num, 0, 0))
-        except Exception as e:
-            print(f"Error with PyPDF2 extraction: {e}")
+    def extract_text_with_positions(self, pdf_path: str,
+                                    document: Optional[ParsedDocument] = None) -> List[Tuple[str, int, float, float]]:
+        """Extract (text, page, top, font_size) elements using the shared parsing core."""
+        if document is None:
+            document = load_document(pdf_path)
+        return self.elements_from_document(document)
+    
+    def elements_from_document(self, document: ParsedDocument) -> List[Tuple[str, int, float, float]]:
+        """Flatten a parsed document into text elements, without running headers/footers."""
+        return [(line.text, line.page, line.top, line.font_size) for line in iter_content_lines(document)]
+    
+    def iter_page_elements(self, pdf_path: str,
+                           max_pages: Optional[int] = None) -> Iterator[List[Tuple[str, int, float, float]]]:
+        """Lazily yield (text, page, top, font_size) elements one page at a time.
         
-        return text_elements
+        Pages are only parsed when the consumer asks for them, so callers that
+        stop iterating early never pay for the rest of the document.
+        """
+        pages = range(1, max_pages + 1) if max_pages is not None else None
+        for page in iter_pages(pdf_path, pages):
+            yield [(line.text, line.page, line.top, line.font_size) for line in page.lines]
+    
+    def extract_text_sampled(self, pdf_path: str, first_pages: int = 3) -> List[Tuple[str, int, float, float]]:
+        """Extract text from a sample of pages likely to hold headings."""
+        document = self.sample_document(pdf_path, first_pages)
+        return self.elements_from_document(document) if document is not None else []
     
-    def _group_words_into_lines(self, words: List[Dict]) -> List[str]:
-        """Group words into lines based on y-position."""
-        if not words:
-            return []
+    def sample_document(self, pdf_path: str, first_pages: int = 3) -> Optional[ParsedDocument]:
+        """Parse only the pages likely to hold headings (None if there are none).
         
-        # Sort words by y-position (top to bottom)
-        sorted_words = sorted(words, key=lambda w: (-w['top'], w['x0']))
+        The first ``first_pages`` pages are always analysed. Later pages are
+        only analysed when a cheap font scan finds text clearly larger than the
+        document's body font size; body-text-only pages never reach pdfplumber.
+        If the scan cannot read the file at all, the whole document is parsed.
+        """
+        font_histograms = scan_page_font_sizes(pdf_path)
+        if not font_histograms:
+            return load_document(pdf_path)
         
-        lines = []
-        current_line = []
-        current_y = None
-        y_tolerance = 5  # pixels
+        body_histogram = Counter()
+        for histogram in font_histograms.values():
+            body_histogram.update(histogram)
+        body_size = body_histogram.most_common(1)[0][0] if body_histogram else 0
         
-        for word in sorted_words:
-            if current_y is None:
-                current_y = word['top']
-                current_line.append(word['text'])
-            elif abs(word['top'] - current_y) <= y_tolerance:
-                current_line.append(word['text'])
-            else:
-                lines.append(' '.join(current_line))
-                current_line = [word['text']]
-                current_y = word['top']
+        selected_pages = []
+        for page_num, histogram in sorted(font_histograms.items()):
+            if page_num <= first_pages or not histogram:  # Empty scan; analyse to be safe
+                selected_pages.append(page_num)
+                continue
+            # Compare against the smaller of the document and page body sizes so a
+            # page set in a smaller body font still surfaces its headings
+            page_body_size = histogram.most_common(1)[0][0]
+            if self._has_large_fonts(histogram, min(body_size, page_body_size)):
+                selected_pages.append(page_num)
         
-        if current_line:
-            lines.append(' '.join(current_line))
+        if not selected_pages:
+            return None
         
-        return lines
+        return parse_pdf(pdf_path, pages=selected_pages)
+    
+    def _has_large_fonts(self, histogram: Counter, body_size: float) -> bool:
+        """Check whether a page's font-size histogram suggests heading text."""
+        threshold = body_size * self.HEADING_SIZE_RATIO
+        large_chars = sum(count for size, count in histogram.items() if size >= threshold)
+        return large_chars >= self.MIN_LARGE_FONT_CHARS
     
-    def detect_heading_level(self, text: str) -> Optional[str]:
-        """Intelligently detect heading level based on text patterns."""
-        text = text.strip()
+    def detect_heading_level(self, text: Union[str, NormalizedText]) -> Optional[str]:
+        """Intelligently detect heading level based on text patterns.
+        
+        Parsed lines pass their precomputed ``TextLine.normalized`` form.
+        """
+        normalized = text if isinstance(text, NormalizedText) else normalize_line(text)
+        text = normalized.normalized
         
         # Skip if text matches exclusion patterns
-        for pattern in self.exclude_patterns:
-            if re.match(pattern, text, re.IGNORECASE):
-                return None
+        if self._exclude_regex.match(text):
+            return None
         
         # Additional check for normal sentences (more than 4 words)
-        words = text.split()
-        if len(words) > 4 and not any(word.isupper() for word in words):
+        if normalized.word_count > 4 and not any(word.isupper() for word in normalized.words):
             return None
         
         # Check heading patterns from H1 to H3
-        for level, patterns in self.heading_patterns.items():
-            for pattern in patterns:
-                if re.match(pattern, text):
-                    return level
+        for level, regex in self._heading_regexes:
+            if regex.match(text):
+                return level
         
         return None
     
+    def find_heading_lines(self, lines: List[TextLine]) -> List[Tuple[int, str]]:
+        """Return (index, level) for every heading among parsed lines.
+        
+        Text patterns are applied as in ``detect_heading_level``. When the lines
+        carry layout information, headings must also open a paragraph, and
+        short standalone lines set in bold or a larger font count as headings
+        even if no text pattern matches them.
+        """
+        size_histogram = Counter()
+        for line in lines:
+            if line.font_size > 0:
+                size_histogram[line.font_size] += len(line.text)
+        body_size = size_histogram.most_common(1)[0][0] if size_histogram else 0
+        
+        headings = []
+        for index, line in enumerate(lines):
+            has_layout = line.bbox is not None
+            if has_layout and not line.paragraph_start:
+                continue
+            
+            level = self.detect_heading_level(line.normalized)
+            if level is None and has_layout and self._is_emphasised_heading(lines, index, body_size):
+                level = 'H1' if line.font_size >= body_size * self.TITLE_SIZE_RATIO else 'H2'
+            
+            if level:
+                headings.append((index, level))
+        
+        return headings
+    
+    def _is_emphasised_heading(self, lines: List[TextLine], index: int, body_size: float) -> bool:
+        """Check whether a line looks like a heading from its layout alone."""
+        line = lines[index]
+        text = line.normalized.normalized
+        
+        if not text or len(text) > 80 or line.normalized.word_count > 12 or text[-1] in '.,;' or text[0] in '•-*▪●':
+            return False
+        if not (line.is_bold or (body_size and line.font_size >= body_size * self.HEADING_SIZE_RATIO)):
+            return False
+        
+        # A heading stands alone: the next line starts a new paragraph
+        return index + 1 >= len(lines) or lines[index + 1].paragraph_start
+    
     def extract_title(self, text_elements: List[Tuple[str, int, float, float]]) -> str:
         """Extract document title from first few pages."""
+        # Prefer font-size ranking when the elements carry font sizes
+        sized_elements = [e for e in text_elements if e[1] <= 3 and e[3] > 0]
+        if sized_elements:
+            first_page = min(e[1] for e in sized_elements)
+            title = self._rank_title_by_font_size(
+                [e for e in sized_elements if e[1] == first_page]
+            )
+            if title:
+                return title
+        
         # Look for title in first 3 pages
         title_candidates = []
         
@@ -169,23 +244,92 @@ class PDFOutlineExtractor:
         
         return "Document Title"
     
-    def extract_outline(self, pdf_path: str) -> Dict:
-        """Extract complete outline from PDF."""
+    def _rank_title_by_font_size(self, page_elements: List[Tuple[str, int, float, float]]) -> Optional[str]:
+        """Pick the title as the first run of lines set in the page's largest font."""
+        # Body size is the size carrying the most characters on the page
+        size_histogram = Counter()
+        for text, _, _, size in page_elements:
+            if size > 0:
+                size_histogram[round(size, 1)] += len(text)
+        if not size_histogram:
+            return None
+        
+        body_size = size_histogram.most_common(1)[0][0]
+        top_size = max(size_histogram)
+        if top_size < body_size * self.TITLE_SIZE_RATIO:
+            return None
+        
+        # Multi-line titles are consecutive lines sharing the largest size
+        title_lines = []
+        for text, _, _, size in page_elements:
+            if abs(round(size, 1) - top_size) < 0.5:
+                title_lines.append(text)
+            elif title_lines:
+                break
+        
+        title = ' '.join(title_lines).strip()
+        if len(title) < 3 or re.match(r'^[\d\W]+$', title):
+            return None
+        
+        return title
+    
+    def extract_title_lazy(self, pdf_path: str, max_pages: int = 3) -> str:
+        """Resolve the document title while parsing as few pages as possible.
+        
+        Pages are pulled one at a time and parsing stops as soon as a page has a
+        line clearly larger than its body text. Documents without a prominent
+        title fall back to the pattern-based rules over the pages seen so far.
+        """
+        text_elements = []
+        
+        try:
+            for page_elements in self.iter_page_elements(pdf_path, max_pages=max_pages):
+                title = self._rank_title_by_font_size(page_elements)
+                if title:
+                    return title
+                text_elements.extend(page_elements)
+        except Exception as e:
+            print(f"Error extracting title from {pdf_path}: {e}")
+        
+        # No font-size winner; use the text patterns only
+        return self.extract_title([(text, page, 0, 0) for text, page, _, _ in text_elements])
+    
+    def extract_outline(self, pdf_path: str, quick: bool = False, quick_pages: int = 3,
+                        document: Optional[ParsedDocument] = None,
+                        heading_strategy: str = 'patterns') -> Dict:
+        """Extract complete outline from PDF.
+        
+        With ``quick`` set, only the first ``quick_pages`` pages plus pages
+        whose font scan suggests large (heading) text are analysed, giving a
+        coarse outline of long text-heavy documents at a fraction of the cost.
+        An already parsed ``document`` is used as-is instead of re-parsing.
+        ``heading_strategy`` 'patterns' classifies every line by its text;
+        'layout' uses ``find_heading_lines``, which also requires headings to
+        open a paragraph and accepts standalone bold or large lines.
+        """
         start_time = time.time()
         
         # Extract text with page numbers
-        text_elements = self.extract_text_with_positions(pdf_path)
+        if document is None:
+            document = self.sample_document(pdf_path, quick_pages) if quick else load_document(pdf_path)
+        text_elements = self.elements_from_document(document) if document is not None else []
         
         # Extract title
         title = self.extract_title(text_elements)
         
         # Extract headings
+        if heading_strategy == 'layout':
+            lines = list(iter_content_lines(document)) if document is not None else []
+            candidates = [(lines[index].text, lines[index].page, level)
+                          for index, level in self.find_heading_lines(lines)]
+        else:
+            lines = iter_content_lines(document) if document is not None else []
+            candidates = [(line.text, line.page, self.detect_heading_level(line.normalized)) for line in lines]
+        
         outline = []
         seen_headings = set()
         
-        for text, page_num, _, _ in text_elements:
-            heading_level = self.detect_heading_level(text)
-            
+        for text, page_num, heading_level in candidates:
             if heading_level and text not in seen_headings:
                 outline.append({
                     "level": heading_level,
@@ -208,54 +352,138 @@ class PDFOutlineExtractor:
             "outline": outline
         }
     
+    def outline_sections(self, document: ParsedDocument, result: Dict) -> List[IndexedSection]:
+        """Split the content lines at the outline's headings, for the search index.
+        
+        Text before the first heading is filed under the document title.
+        """
+        headings = {(entry["text"], entry["page"]) for entry in result["outline"]}
+        sections = []
+        title, page, lines = result["title"].strip(), None, []
+        
+        for line in iter_content_lines(document):
+            if (line.text, line.page) in headings:
+                if lines or page is not None:
+                    sections.append(IndexedSection(page or line.page, title, " ".join(lines)))
+                title, page, lines = line.text, line.page, []
+            else:
+                lines.append(line.text)
+        
+        if lines or page is not None:
+            sections.append(IndexedSection(page or 1, title, " ".join(lines)))
+        return sections
+    
     def _level_to_number(self, level: str) -> int:
         """Convert heading level to number for sorting."""
         return {"H1": 1, "H2": 2, "H3": 3}.get(level, 4)
     
-    def validate_output(self, output: Dict) -> bool:
-        """Validate output against schema."""
-        try:
-            schema = {
-                "type": "object",
-                "properties": {
-                    "title": {"type": "string"},
-                    "outline": {
-                        "type": "array",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "level": {"type": "string"},
-                                "text": {"type": "string"},
-                                "page": {"type": "integer"}
-                            },
-                            "required": ["level", "text", "page"]
-                        }
-                    }
-                },
-                "required": ["title", "outline"]
-            }
-            validate(instance=output, schema=schema)
-            return True
-        except Exception as e:
-            print(f"Validation error: {e}")
-            return False
+    def validate_output(self, output: Dict, source: str = '') -> bool:
+        """Validate output with the fast structural check.
+        
+        Failures are recorded as structured records in ``validation_failures``;
+        full JSON schema validation runs in the batch stage instead.
+        """
+        failures = get_validator().quick_check(output, source)
+        self.validation_failures.extend(failures)
+        return not failures
+
+# Extractor of the current (worker) process, see extract_file()
+_extractor: Optional[PDFOutlineExtractor] = None
+
+def configure_parsing(store_dir: Optional[str] = None, backend: Optional[str] = None,
+                      mask_regions: bool = False):
+    """Apply the parse settings; also the initializer of worker processes."""
+    if store_dir:
+        set_document_store(store_dir)
+    if backend:
+        set_backend_policy(backend)
+    if mask_regions:
+        set_region_masking(True)
+
+def extract_file(pdf_file: Path, title_only: bool = False, quick: bool = False,
+                 quick_pages: int = 3, heading_strategy: str = 'patterns',
+                 index_sections: bool = False,
+                 document: Optional[ParsedDocument] = None) -> Tuple[Dict, List, List[IndexedSection]]:
+    """Result for one PDF, the backend decisions made while parsing it and its
+    sections for the search index (empty unless ``index_sections``).
+    An already parsed ``document`` is used instead of loading the file."""
+    global _extractor
+    if _extractor is None:
+        _extractor = PDFOutlineExtractor()
+    print(f"Processing {pdf_file.name}...")
+    
+    first_decision = len(backend_decisions())
+    if title_only:
+        result = {
+            "title": _extractor.extract_title_lazy(str(pdf_file)),
+            "outline": []
+        }
+    else:
+        result = _extractor.extract_outline(str(pdf_file), quick=quick, quick_pages=quick_pages,
+                                            document=document, heading_strategy=heading_strategy)
+    
+    # The full parse is still in the document cache
+    sections = []
+    if index_sections and not (title_only or quick):
+        sections = _extractor.outline_sections(document or load_document(str(pdf_file)), result)
+    return result, backend_decisions()[first_decision:], sections
+
+def _profiled_extract(profiler: DocumentProfiler, extract, pdf_file: Path):
+    with profiled(profiler, pdf_file.stem):
+        return extract(pdf_file)
 
-def process_pdfs():
-    """Main processing function."""
+def process_pdfs(title_only: bool = False, quick: bool = False, quick_pages: int = 3,
+                 validate_batch: bool = False, validation_report: Optional[str] = None,
+                 store_dir: Optional[str] = None, profile_every: int = 0,
+                 profile_threshold: Optional[float] = None, backend: Optional[str] = None,
+                 backend_log: Optional[str] = None, mask_regions: bool = False,
+                 workers: int = 1, max_inflight_pages: Optional[int] = None,
+                 heading_strategy: str = 'patterns', index_dir: Optional[str] = None,
+                 compact_json: bool = False):
+    """Main processing function.
+    
+    With ``title_only`` set, only the first pages of each PDF are parsed and
+    the output carries the title with an empty outline (catalog pass).
+    ``quick`` produces a coarse outline from sampled pages only.
+    ``validate_batch`` runs full schema validation over the written outputs
+    at the end; failures go to ``validation_report`` as JSON when given.
+    ``store_dir`` keeps full parses on disk so later runs skip parsing.
+    ``profile_every``/``profile_threshold`` profile every Nth PDF or those
+    slower than the threshold (seconds), writing collapsed stacks next to
+    the outputs.
+    ``backend`` forces 'pdfplumber' or 'pypdf2' instead of choosing per
+    document; ``backend_log`` receives the decisions as JSON lines.
+    ``mask_regions`` leaves the text of tables and figures out of the lines
+    headings are detected in.
+    PDFs run most expensive first (see ``common/scheduler.py``); with
+    ``workers`` > 1 they are parsed in worker processes, keeping at most
+    ``max_inflight_pages`` pages in flight. With a single worker, PDFs with
+    scanned pages are written from their text pages first and rewritten
+    once their OCR pages are in.
+    ``heading_strategy`` selects the heading detector (see ``extract_outline``).
+    ``index_dir`` (default: $SEARCH_INDEX_DIR) receives the sections under
+    each outline heading for keyword search (see ``common/search_index.py``);
+    title-only and quick runs index nothing.
+    Outputs are written by a background thread with atomic renames (see
+    ``common/output_writer.py``); ``compact_json`` drops their indentation.
+    """
     print("Starting PDF outline extraction...")
     
+    configure_parsing(store_dir, backend, mask_regions)
+    # Worker processes wait for their own OCR; here it runs behind the rest of the batch
+    set_ocr_deferred(workers <= 1)
+    
     # Initialize extractor
     extractor = PDFOutlineExtractor()
     
     # Get input and output directories - handle both Docker and local environments
-    input_dir = Path("/app/input") if Path("/app/input").exists() else Path("./input")
-    output_dir = Path("/app/output") if Path("/app/output").exists() else Path("./output")
+    input_dir, output_dir = resolve_io_dirs()
     
     # Create output directory if it doesn't exist
     output_dir.mkdir(parents=True, exist_ok=True)
     
     # Get all PDF files
-    pdf_files = list(input_dir.glob("*.pdf"))
+    pdf_files = discover_files(input_dir, "*.pdf")
     
     if not pdf_files:
         print("No PDF files found in input directory")
@@ -263,37 +491,162 @@ def process_pdfs():
     
     print(f"Found {len(pdf_files)} PDF files to process")
     
-    # Process each PDF
-    for pdf_file in pdf_files:
+    search_index = open_search_index(index_dir)
+    if search_index is not None and (title_only or quick):
+        print("Sections are only indexed from full outlines; not indexing this run")
+        search_index = None
+    
+    extract = partial(extract_file, title_only=title_only, quick=quick, quick_pages=quick_pages,
+                      heading_strategy=heading_strategy, index_sections=search_index is not None)
+    extract_parsed = extract
+    profiler = None
+    if profile_every or profile_threshold is not None:
+        if workers > 1:
+            print("Profiling samples this process only; run with --workers 1 to profile")
+        else:
+            profiler = DocumentProfiler(output_dir, every=profile_every, threshold=profile_threshold)
+            extract = partial(_profiled_extract, profiler, extract)
+    
+    writer = OutputWriter(compact=compact_json)
+    
+    def write_result(pdf_file: Path, result: Dict):
+        # Validate output
+        if not extractor.validate_output(result, source=pdf_file.name):
+            print(f"Warning: Output validation failed for {pdf_file.name}")
+        
+        # Create output JSON file
+        output_file = output_dir / f"{pdf_file.stem}.json"
+        writer.submit(output_file, result)
+        print(f"✓ Processed {pdf_file.name} -> {output_file.name}")
+    
+    def write_minimal(pdf_file: Path, error: str):
+        print(f"✗ Error processing {pdf_file.name}: {error}")
+        # Create minimal output file
+        minimal_output = {
+            "title": pdf_file.stem,
+            "outline": []
+        }
+        writer.submit(output_dir / f"{pdf_file.stem}.json", minimal_output)
+    
+    # Byte-identical PDFs are parsed once; the copies reuse the first result
+    duplicates = exact_duplicates(pdf_files)
+    originals = set(duplicates.values())
+    results = {}
+    
+    # Process each PDF, most expensive first
+    for completed in run_batch([f for f in pdf_files if f not in duplicates], extract,
+                               workers=workers, max_inflight_pages=max_inflight_pages,
+                               initializer=configure_parsing,
+                               initargs=(store_dir, backend, mask_regions)):
+        pdf_file = completed.job.path
         try:
-            print(f"Processing {pdf_file.name}...")
-            
-            # Extract outline
-            result = extractor.extract_outline(str(pdf_file))
-            
-            # Validate output
-            if not extractor.validate_output(result):
-                print(f"Warning: Output validation failed for {pdf_file.name}")
-            
-            # Create output JSON file
-            output_file = output_dir / f"{pdf_file.stem}.json"
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(result, f, indent=2, ensure_ascii=False)
-            
-            print(f"✓ Processed {pdf_file.name} -> {output_file.name}")
-            
+            if completed.error is not None:
+                raise RuntimeError(completed.error)
+            result, decisions, sections = completed.result
+            if workers > 1:
+                record_backend_decisions(decisions)
+            if search_index is not None:
+                key, digest = str(pdf_file.resolve()), file_digest(str(pdf_file))
+                if not search_index.is_indexed(key, digest):
+                    search_index.add_document(key, digest, sections)
+            if pdf_file in originals:
+                results[pdf_file] = result
+            write_result(pdf_file, result)
         except Exception as e:
-            print(f"✗ Error processing {pdf_file.name}: {e}")
-            # Create minimal output file
-            minimal_output = {
-                "title": pdf_file.stem,
-                "outline": []
-            }
-            output_file = output_dir / f"{pdf_file.stem}.json"
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(minimal_output, f, indent=2, ensure_ascii=False)
+            write_minimal(pdf_file, str(e))
+    
+    # Outlines written before their scanned pages were recognised are redone
+    for document in finish_ocr():
+        pdf_file = Path(document.path)
+        print(f"Recognised scanned pages of {pdf_file.name}, updating its outline")
+        try:
+            result, _, sections = extract_parsed(pdf_file, document=document)
+            if search_index is not None:
+                search_index.add_document(str(pdf_file.resolve()), file_digest(str(pdf_file)), sections)
+            if pdf_file in originals:
+                results[pdf_file] = result
+            write_result(pdf_file, result)
+        except Exception as e:
+            write_minimal(pdf_file, str(e))
+    
+    for pdf_file, original in duplicates.items():
+        try:
+            if original not in results:
+                raise RuntimeError(f"identical to {original.name}, which failed")
+            print(f"{pdf_file.name} is identical to {original.name}, reusing its outline")
+            write_result(pdf_file, results[original])
+        except Exception as e:
+            write_minimal(pdf_file, str(e))
+    
+    # Every output must be on disk before validation reads them back
+    writer.close()
+    if search_index is not None:
+        search_index.close()
+    
+    if validate_batch:
+        extractor.validation_failures.extend(
+            get_validator().validate_batch(iter_output_files(output_dir))
+        )
+    
+    if extractor.validation_failures:
+        print(f"Validation: {len(extractor.validation_failures)} failure(s) in "
+              f"{len({f.source for f in extractor.validation_failures})} output(s)")
+    if validation_report:
+        with open(validation_report, "w", encoding="utf-8") as f:
+            json.dump([failure.to_dict() for failure in extractor.validation_failures],
+                      f, indent=2, ensure_ascii=False)
+    
+    if profiler is not None:
+        profiler.print_summary()
+    if backend_log:
+        write_backend_log(backend_log)
     
     print("PDF processing completed!")
 
 if __name__ == "__main__":
-    process_pdfs()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Extract structured outlines from PDFs")
+    parser.add_argument("--title-only", action="store_true",
+                        help="only resolve document titles, parsing the first pages lazily")
+    parser.add_argument("--quick", action="store_true",
+                        help="coarse outline from the first pages plus large-font pages only")
+    parser.add_argument("--quick-pages", type=int, default=3,
+                        help="number of leading pages always analysed in quick mode (default: 3)")
+    parser.add_argument("--validate", action="store_true",
+                        help="validate all written outputs against the full JSON schema at the end")
+    parser.add_argument("--validation-report", metavar="PATH",
+                        help="write validation failures as JSON records to PATH")
+    parser.add_argument("--store", metavar="DIR",
+                        help="keep parsed documents in DIR and reuse them on later runs "
+                             "(default: $DOCUMENT_STORE_DIR)")
+    parser.add_argument("--profile-every", type=int, default=0, metavar="N",
+                        help="profile every Nth PDF, writing <name>.collapsed next to the outputs")
+    parser.add_argument("--profile-threshold", type=float, metavar="SECONDS",
+                        help="profile PDFs that take at least SECONDS")
+    parser.add_argument("--backend", choices=["auto", "pdfplumber", "pypdf2"],
+                        help="extraction backend (default: $PDF_BACKEND or auto, chosen per PDF)")
+    parser.add_argument("--backend-log", metavar="PATH",
+                        help="write backend decisions and timings as JSON lines to PATH")
+    parser.add_argument("--mask-regions", action="store_true",
+                        help="ignore text inside tables and figures (default: $PDF_MASK_REGIONS)")
+    parser.add_argument("--headings", choices=PDFOutlineExtractor.HEADING_STRATEGIES, default="patterns",
+                        help="heading detector: text patterns only, or patterns plus layout (default: patterns)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes; PDFs are dispatched most expensive first (default: 1)")
+    parser.add_argument("--max-inflight-pages", type=int, metavar="N",
+                        help="memory cap: pages parsed at once across workers "
+                             "(default: $SCHEDULER_MAX_PAGES or 1000)")
+    parser.add_argument("--index", metavar="DIR",
+                        help="add the sections under each heading to the keyword search index in DIR "
+                             "(default: $SEARCH_INDEX_DIR)")
+    parser.add_argument("--compact-json", action="store_true",
+                        help="write outputs without indentation")
+    args = parser.parse_args()
+    
+    process_pdfs(title_only=args.title_only, quick=args.quick, quick_pages=args.quick_pages,
+                 validate_batch=args.validate, validation_report=args.validation_report,
+                 store_dir=args.store, profile_every=args.profile_every,
+                 profile_threshold=args.profile_threshold, backend=args.backend,
+                 backend_log=args.backend_log, mask_regions=args.mask_regions,
+                 workers=args.workers, max_inflight_pages=args.max_inflight_pages,
+                 heading_strategy=args.headings, index_dir=args.index,
+                 compact_json=args.compact_json)
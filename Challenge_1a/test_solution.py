@@ -4,7 +4,30 @@ Test script for Challenge 1a solution
 """
 
 import json
+import os
+import time
+import tempfile
+from collections import Counter
+from concurrent.futures import Future
+from pathlib import Path
 from process_pdfs import PDFOutlineExtractor
+from output_validation import OutlineValidator
+from common.document_parser import (
+    TextLine, PageModel, ParsedDocument, font_histogram_from_stream, parse_pdf, REGION_MASKS_KEY,
+    load_document, set_document_store, set_backend_policy, clear_document_cache, set_ocr_deferred,
+    finish_ocr
+)
+from common.ocr import ocr_available
+from common.output_writer import OutputWriter
+from common.scheduler import CostModel, run_batch, count_pages
+from common.synthetic_corpus import generate_corpus
+from common.document_store import SECTION_RECORDS_KEY, save_document, open_document
+from common.profiling import DocumentProfiler
+from common.backend_selector import choose_backend
+from common.dedup import exact_duplicates
+from common.running_lines import find_running_lines, iter_content_lines
+from common.text_normalization import normalize_line, normalize_block
+from evaluate import Config, Score, match_headings, mark_pareto, fastest_meeting
 
 def test_heading_detection():
     """Test the heading detection logic."""
@@ -43,6 +66,80 @@ def test_title_extraction():
     title = extractor.extract_title(text_elements)
     print(f"\nExtracted title: '{title}'")
 
+def test_title_font_ranking():
+    """Test font-size based title ranking."""
+    extractor = PDFOutlineExtractor()
+    
+    # Mock (text, page, top, size) elements with a two-line title
+    page_elements = [
+        ("Overview", 1, 190.0, 24.0),
+        ("Foundation Level Extensions", 1, 250.0, 24.0),
+        ("Version 1.0", 1, 380.0, 12.0),
+        ("This document may be copied in its entirety, or extracts made.", 1, 660.0, 10.0),
+        ("Copyright notice and other body text that dominates the page.", 1, 680.0, 10.0),
+    ]
+    
+    title = extractor._rank_title_by_font_size(page_elements)
+    expected = "Overview Foundation Level Extensions"
+    status = "✓" if title == expected else "✗"
+    print(f"\n{status} Font-ranked title: '{title}' (expected: '{expected}')")
+    assert title == expected
+    
+    # Uniform font size gives no confident title
+    uniform = [(text, page, top, 10.0) for text, page, top, _ in page_elements]
+    assert extractor._rank_title_by_font_size(uniform) is None
+
+def test_overprinted_title():
+    """Test that fake-bold (overprinted) text is read once per glyph."""
+    extractor = PDFOutlineExtractor()
+    
+    pdf_path = str(Path(__file__).parent / "sample_dataset" / "pdfs" / "file03.pdf")
+    document = parse_pdf(pdf_path, backend='pdfplumber')
+    title = extractor.extract_title(extractor.elements_from_document(document))
+    status = "✓" if title.startswith("RFP: Request for Proposal") else "✗"
+    print(f"\n{status} Overprinted title: '{title}'")
+    assert title.startswith("RFP: Request for Proposal")
+
+def test_quick_mode_font_scan():
+    """Test the cheap content-stream font scan used by quick mode."""
+    extractor = PDFOutlineExtractor()
+    
+    stream = (b"BT /F1 24 Tf 72 700 Td (Introduction) Tj ET "
+              b"BT /F2 1 Tf 10 0 0 10 72 650 Tm [(Body text that) -250 (runs on)] TJ ET")
+    histogram = font_histogram_from_stream(stream)
+    print(f"\nFont histogram: {dict(histogram)}")
+    assert set(histogram) == {24.0, 10.0}
+    
+    # The text matrix of one text object does not scale the next one
+    rescaled = font_histogram_from_stream(b"BT /F1 1 Tf 10 0 0 10 72 650 Tm (Scaled) Tj ET "
+                                          b"BT /F1 12 Tf 72 600 Td (Unscaled) Tj ET")
+    assert set(rescaled) == {10.0, 12.0}
+    
+    body_only = font_histogram_from_stream(b"BT /F1 10 Tf (Just body text here) Tj ET")
+    assert extractor._has_large_fonts(histogram, 10.0)
+    assert not extractor._has_large_fonts(body_only, 10.0)
+
+def test_heading_lines():
+    """Test heading detection over parsed lines with layout information."""
+    extractor = PDFOutlineExtractor()
+    
+    def line(text, top, bold=False, paragraph_start=True):
+        return TextLine(text=text, page=1, bbox=(72, top, 400, top + 12), font_size=12.0,
+                        font_name='Arial-BoldMT' if bold else 'ArialMT',
+                        paragraph_start=paragraph_start)
+    
+    lines = [
+        line("Marseille: The Oldest City in France", 100, bold=True),
+        line("History", 120),
+        line("Marseille, founded by Greek sailors around 600 BC, is the oldest city", 140),
+        line("Provence Alpes", 154, paragraph_start=False),  # Wrapped body line
+        line("• Old Port : The heart of Marseille.", 170, bold=True),
+    ]
+    
+    headings = [index for index, _ in extractor.find_heading_lines(lines)]
+    print(f"\nHeading lines: {headings}")
+    assert headings == [0, 1]
+
 def test_output_validation():
     """Test the output validation logic."""
     extractor = PDFOutlineExtractor()
@@ -69,6 +166,361 @@ def test_output_validation():
     print(f"Valid output: {extractor.validate_output(valid_output)}")
     print(f"Invalid output: {extractor.validate_output(invalid_output)}")
 
+def test_batch_validation():
+    """Test the compiled validator and structured failure records."""
+    validator = OutlineValidator()
+    
+    outputs = [
+        ("good.pdf", {"title": "Doc", "outline": [{"level": "H1", "text": "Intro", "page": 1}]}),
+        ("no_outline.pdf", {"title": "Doc"}),
+        ("bad_page.pdf", {"title": "Doc", "outline": [{"level": "H1", "text": "Intro", "page": "1"}]}),
+    ]
+    
+    failures = list(validator.validate_batch(outputs))
+    print("\nBatch validation failures:")
+    for failure in failures:
+        print(f"  {failure.to_dict()}")
+    
+    assert {f.source for f in failures} == {"no_outline.pdf", "bad_page.pdf"}
+    assert ("bad_page.pdf", "outline/0/page") in {(f.source, f.path) for f in failures}
+
+def test_document_store():
+    """Test the on-disk document format round trip."""
+    page = PageModel(number=1, width=612.0, height=792.0, font_histogram=Counter({11.0: 120, 16.0: 9}))
+    page.lines = [
+        TextLine("Résumé Overview", 1, (72.0, 70.5, 240.25, 86.5), 16.0, "Arial-Bold", True),
+        TextLine("Body text line", 1, (72.0, 100.0, 300.0, 111.0), 11.0, "Arial", True),
+        TextLine("Recovered without layout", 1, None, 0.0, "", False),
+    ]
+    document = ParsedDocument(path="/tmp/sample.pdf", pages=[page])
+    document.cache[SECTION_RECORDS_KEY] = ("test-v1", [("Résumé Overview", "Body text line", 1, 1)])
+    
+    print("\nDocument store:")
+    with tempfile.TemporaryDirectory() as store_dir:
+        path = os.path.join(store_dir, "sample.pdoc")
+        save_document(document, path, os.stat(__file__))
+        with open_document(path) as stored:
+            assert stored.is_current(os.stat(__file__))
+            assert list(stored.columns['lines.font_size']) == [16.0, 11.0, 0.0]
+            assert stored.line_text(0) == "Résumé Overview"
+            loaded = stored.to_parsed_document(document.path)
+    
+    for original, restored in zip(document.iter_lines(), loaded.iter_lines()):
+        status = "✓" if original == restored else "✗"
+        print(f"{status} {restored.text!r}")
+        assert original == restored
+    assert loaded.pages[0].font_histogram == page.font_histogram
+    assert loaded.cache[SECTION_RECORDS_KEY] == document.cache[SECTION_RECORDS_KEY]
+    
+    # A forced backend never reuses a parse stored under another one
+    pdf_path = str(Path(__file__).parent / "sample_dataset" / "pdfs" / "file02.pdf")
+    with tempfile.TemporaryDirectory() as store_dir:
+        set_document_store(store_dir)
+        try:
+            store_paths = set()
+            for backend in ("pypdf2", "pdfplumber", "pypdf2"):
+                set_backend_policy(backend)
+                clear_document_cache()
+                parsed = load_document(pdf_path)
+                assert parsed.cache.get('backend_decision') is None or \
+                    parsed.cache['backend_decision'].backend == backend
+                store_paths.add(parsed.store_path)
+            assert len(store_paths) == 2 and len(os.listdir(store_dir)) == 2
+        finally:
+            set_document_store(None)
+            set_backend_policy(None)
+            clear_document_cache()
+    print("✓ Stored parses are kept per backend")
+
+def _busy_loop(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(100))
+
+def test_profiling():
+    """Test per-document profiles and the hot-function summary."""
+    print("\nProfiling:")
+    with tempfile.TemporaryDirectory() as output_dir:
+        profiler = DocumentProfiler(output_dir, threshold=0.05, interval=0.001)
+        with profiler.document("slow"):
+            _busy_loop(0.1)
+        with profiler.document("fast"):
+            pass
+        
+        written = sorted(os.listdir(output_dir))
+        print(f"✓ Profiles written: {written}")
+        assert written == ["slow.collapsed"]
+        with open(os.path.join(output_dir, "slow.collapsed"), encoding="utf-8") as f:
+            stacks = [line.rsplit(" ", 1) for line in f.read().splitlines()]
+        assert all(int(count) > 0 for _, count in stacks)
+        assert any("_busy_loop (test_solution.py:" in stack for stack, _ in stacks)
+        assert "_busy_loop" in profiler.summary()
+
+def _write_pdf(path, content, base_fonts):
+    """Write a one-page PDF showing ``content`` with fonts /F1, /F2, ..."""
+    fonts = " ".join(f"/F{i} {5 + i} 0 R" for i in range(1, len(base_fonts) + 1))
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        f"/Resources << /Font << {fonts} >> >> >>",
+        f"<< /Length {len(content)} >>\nstream\n{content}\nendstream",
+        "<< >>",
+    ] + [f"<< /Type /Font /Subtype /Type1 /BaseFont /{name} >>" for name in base_fonts]
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    data += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(data)
+
+def test_backend_selection():
+    """Test per-document backend choice from the sampled content stream."""
+    body = " ".join(f"0 -14 Td (This is line {i} of a plain single column text page.) Tj"
+                    for i in range(20))
+    plain = f"BT /F1 11 Tf 72 720 Td {body} ET"
+    headed = f"BT /F2 18 Tf 72 740 Td (Chapter One) Tj ET {plain}"
+    
+    print("\nBackend selection:")
+    with tempfile.TemporaryDirectory() as pdf_dir:
+        cases = [("plain.pdf", plain, ["Helvetica"], None, "pypdf2"),
+                 ("headed.pdf", headed, ["Helvetica", "Helvetica-Bold"], None, "pdfplumber"),
+                 ("forced.pdf", plain, ["Helvetica"], "pdfplumber", "pdfplumber")]
+        for name, content, fonts, forced, expected in cases:
+            path = os.path.join(pdf_dir, name)
+            _write_pdf(path, content, fonts)
+            decision = choose_backend(path, forced=forced)
+            status = "✓" if decision.backend == expected else "✗"
+            print(f"{status} {name} -> {decision.backend} ({decision.reason})")
+            assert decision.backend == expected
+
+def test_region_masking():
+    """Test that the cells of a ruled table are masked out of line building."""
+    rulings = " ".join(f"72 {y} m 372 {y} l S" for y in (600, 580, 560, 540))
+    rulings += " " + " ".join(f"{x} 540 m {x} 600 l S" for x in (72, 172, 272, 372))
+    cells = " ".join(f"BT /F1 11 Tf {x} {y} Td ({text}) Tj ET"
+                     for y, row in ((586, ("Revenue", "Growth", "Margin")),
+                                    (566, ("Europe", "North", "South")),
+                                    (546, ("Total", "Annual", "Quarterly")))
+                     for x, text in zip((80, 180, 280), row))
+    body = " ".join(f"BT /F1 11 Tf 72 {700 - 14 * i} Td (Body line {i} describing the quarter.) Tj ET"
+                    for i in range(4))
+    content = f"BT /F2 18 Tf 72 740 Td (Quarterly Results) Tj ET {body} {rulings} {cells}"
+    
+    print("\nRegion masking:")
+    with tempfile.TemporaryDirectory() as pdf_dir:
+        path = os.path.join(pdf_dir, "table.pdf")
+        _write_pdf(path, content, ["Helvetica", "Helvetica-Bold"])
+        plain = [line.text for line in parse_pdf(path, mask_regions=False).iter_lines()]
+        document = parse_pdf(path, mask_regions=True)
+        masked = [line.text for line in document.iter_lines()]
+        # Stored parses keep their regions
+        save_document(document, os.path.join(pdf_dir, "table.pdoc"), os.stat(path))
+        with open_document(os.path.join(pdf_dir, "table.pdoc")) as stored:
+            restored = stored.to_parsed_document(path)
+    
+    print(f"✓ {len(plain)} lines -> {len(masked)} lines, regions {document.cache[REGION_MASKS_KEY]}")
+    assert "Revenue Growth Margin" in plain
+    assert masked == ["Quarterly Results"] + [f"Body line {i} describing the quarter." for i in range(4)]
+    assert len(document.cache[REGION_MASKS_KEY][1]) == 1
+    [region], [restored_region] = document.cache[REGION_MASKS_KEY][1], restored.cache[REGION_MASKS_KEY][1]
+    assert all(abs(a - b) < 0.01 for a, b in zip(region, restored_region))
+    assert restored.pages[0].masked_regions == [restored_region]
+
+def test_scanned_page_detection():
+    """Test that an image-only page is flagged for OCR instead of coming back as text."""
+    scan = "q 500 0 0 700 50 50 cm BI /W 2 /H 2 /BPC 8 /CS /G ID \x00\xff\xff\x00 EI Q"
+    
+    print("\nScanned pages:")
+    with tempfile.TemporaryDirectory() as pdf_dir:
+        scanned_path = os.path.join(pdf_dir, "scan.pdf")
+        text_path = os.path.join(pdf_dir, "text.pdf")
+        _write_pdf(scanned_path, scan, ["Helvetica"])
+        _write_pdf(text_path, f"{scan} BT /F1 11 Tf 72 720 Td (Typed caption) Tj ET", ["Helvetica"])
+        scanned = parse_pdf(scanned_path).pages[0]
+        typed = parse_pdf(text_path).pages[0]
+    
+    print(f"✓ scan.pdf needs OCR: {scanned.needs_ocr} (OCR available: {ocr_available()})")
+    assert not typed.needs_ocr and typed.lines[0].text == "Typed caption"
+    if not ocr_available():
+        assert scanned.needs_ocr and not scanned.lines
+
+def test_deferred_ocr():
+    """Test that OCR pages are merged into documents returned before they were recognised."""
+    import common.document_parser as document_parser
+    scan = "q 500 0 0 700 50 50 cm BI /W 2 /H 2 /BPC 8 /CS /G ID \x00\xff\xff\x00 EI Q"
+    
+    def recognised(pdf_path, page_number):
+        page = PageModel(number=page_number, width=612.0, height=792.0, backend='ocr')
+        page.lines = [TextLine("Recognised text", page_number, (72.0, 72.0, 200.0, 84.0), 12.0)]
+        future = Future()
+        future.set_result(page)
+        return future
+    
+    print("\nDeferred OCR:")
+    original = (document_parser.ocr_available, document_parser.submit_page)
+    with tempfile.TemporaryDirectory() as pdf_dir:
+        scanned_path = os.path.join(pdf_dir, "scan.pdf")
+        _write_pdf(scanned_path, scan, ["Helvetica"])
+        document_parser.ocr_available, document_parser.submit_page = (lambda: True), recognised
+        set_ocr_deferred(True)
+        clear_document_cache()
+        try:
+            document = load_document(scanned_path)
+            assert document.pages[0].needs_ocr and document.pending_ocr
+            assert finish_ocr() == [document] and not document.pending_ocr
+            assert [line.text for line in document.iter_lines()] == ["Recognised text"]
+            assert finish_ocr() == []
+        finally:
+            document_parser.ocr_available, document_parser.submit_page = original
+            set_ocr_deferred(False)
+            clear_document_cache()
+    print("✓ Scanned page returned pending and merged by the batch")
+
+def test_batch_scheduling():
+    """Test longest-first dispatch and cost model refinement."""
+    pdf_files = sorted(Path("sample_dataset/pdfs").glob("*.pdf"))
+    
+    print("\nBatch scheduling:")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        model = CostModel(os.path.join(cache_dir, "costs.json"))
+        completed = list(run_batch(pdf_files, lambda path: path.name, cost_model=model))
+        estimates = [c.job.estimate for c in completed]
+        print(f"✓ Order: {[c.result for c in completed]}")
+        assert estimates == sorted(estimates, reverse=True)
+        assert completed[0].job.pages == max(c.job.pages for c in completed)
+        
+        model = CostModel(os.path.join(cache_dir, "learned.json"))
+        for pages in (1, 2, 5, 10, 20, 40, 80):
+            model.record(pages, pages * 50000, 0.1 * pages)
+        model.save()
+        reloaded = CostModel(os.path.join(cache_dir, "learned.json"))
+        print(f"✓ Learned estimate for 100 pages: {reloaded.estimate(100, 5000000):.2f}s")
+        assert abs(reloaded.estimate(100, 5000000) - 10.0) < 0.5
+
+def test_duplicate_files():
+    """Test that byte-identical PDFs map to the first copy."""
+    print("\nDuplicate files:")
+    with tempfile.TemporaryDirectory() as pdf_dir:
+        paths = [Path(pdf_dir) / name for name in ("a.pdf", "b.pdf", "c.pdf")]
+        paths[0].write_bytes(b"%PDF-1.4 same")
+        paths[1].write_bytes(b"%PDF-1.4 other")
+        paths[2].write_bytes(b"%PDF-1.4 same")
+        
+        duplicates = exact_duplicates(paths)
+        print(f"✓ {{{', '.join(f'{k.name}: {v.name}' for k, v in duplicates.items())}}}")
+        assert duplicates == {paths[2]: paths[0]}
+
+def test_running_lines():
+    """Test that repeated page headers and footers are dropped before classification."""
+    pages = []
+    for number in range(1, 6):
+        lines = [TextLine("Annual Report 2024", number, (72, 30, 300, 40), 9.0),
+                 TextLine(f"Section {number} body text that only appears once.", number,
+                          (72, 300, 500, 311), 11.0),
+                 TextLine(f"Page {number} of 5", number, (280, 760, 330, 770), 9.0)]
+        if number == 1:
+            lines.insert(0, TextLine("Annual Report 2024", 1, (72, 90, 400, 120), 24.0))
+        pages.append(PageModel(number, 612, 792, lines, Counter({11.0: 100})))
+    document = ParsedDocument("/tmp/report.pdf", pages)
+    
+    running = find_running_lines(document)
+    kept = [line.text for line in iter_content_lines(document)]
+    print(f"\nRunning lines: {len(running)} of 16 lines dropped")
+    assert len(running) == 10
+    assert kept[0] == "Annual Report 2024"  # The title, set large, is not a running header
+    assert not any(text.startswith("Page") for text in kept)
+    print(f"✓ Kept {len(kept)} lines")
+
+def test_evaluation_scoring():
+    """Test heading matching against 0-based expected pages and the Pareto front."""
+    expected = [{"level": "H1", "text": "Introduction", "page": 0},
+                {"level": "H2", "text": "Scope", "page": 1}]
+    predicted = [{"level": "H1", "text": "Introduction ", "page": 1},
+                 {"level": "H1", "text": "Scope", "page": 2},
+                 {"level": "H2", "text": "Scope", "page": 5}]
+    matched, right_level = match_headings(predicted, expected)
+    print(f"\nEvaluation: {matched} matched, {right_level} at the right level")
+    assert (matched, right_level) == (2, 1)
+    
+    def scored(name, f1, ms):
+        return Score(Config('full', name, 'patterns', False), f1, f1, f1, 1.0, 1.0, ms, None)
+    
+    scores = mark_pareto([scored('fast', 0.5, 100), scored('good', 0.8, 400), scored('slow', 0.5, 600)])
+    assert [s.pareto for s in scores] == [True, True, False]
+    assert fastest_meeting(scores, 0.7).config.backend == 'good'
+    print("✓ Pareto front: " + ", ".join(s.config.backend for s in scores if s.pareto))
+
+def test_synthetic_corpus():
+    """Test that the synthetic corpus is deterministic and matches its ground truth."""
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        first = Path(corpus_dir) / "first"
+        second = Path(corpus_dir) / "second"
+        manifest = generate_corpus(first, 2, (4, 6), seed=7, multi_column_share=0.0)
+        generate_corpus(second, 1, (4, 6), seed=7, multi_column_share=0.0)
+        
+        pdf_file = first / "pdfs" / "doc00000.pdf"
+        assert pdf_file.read_bytes() == (second / "pdfs" / "doc00000.pdf").read_bytes()
+        assert [count_pages(first / "pdfs" / entry["file"]) for entry in manifest] == \
+            [entry["pages"] for entry in manifest]
+        
+        with open(first / "outputs" / "doc00000.json", encoding="utf-8") as f:
+            truth = json.load(f)
+        document = parse_pdf(str(pdf_file))
+        lines = {(line.text, line.page - 1) for line in document.iter_lines()}
+        found = sum((heading["text"], heading["page"]) in lines for heading in truth["outline"])
+        print(f"\nSynthetic corpus: {manifest[0]['pages']} pages, {found}/{len(truth['outline'])} "
+              f"ground-truth headings found as lines")
+        assert found == len(truth["outline"])
+        assert len(find_running_lines(document)) == 2 * manifest[0]["pages"]
+
+def test_text_normalization():
+    """Test that ligatures, odd spaces and soft hyphens normalize in one pass."""
+    extractor = PDFOutlineExtractor()
+    
+    line = normalize_line("\ufb01nal\u00a0 Re\u00adport\t2024 ")
+    print(f"\nNormalized line: {line.normalized!r} ({line.word_count} words)")
+    assert line.normalized == "final Report 2024"
+    assert line.lower == "final report 2024"
+    assert line.words == ["final", "Report", "2024"]
+    assert line.normalized[slice(*line.spans[1])] == "Report"
+    
+    block = normalize_block("  Intro\u2003text\n\n\u200bNext  para ")
+    assert block.normalized == "Intro text\n\nNext para"
+    
+    for text in ("1. Introduction", "2.1 Background", "Page 3", "Overview of the Approach"):
+        assert extractor.detect_heading_level(text) == extractor.detect_heading_level(normalize_line(text))
+    print("✓ Headings detected the same from raw and normalized text")
+
+def test_output_writer():
+    """Test that queued outputs land atomically and failures are reported."""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = {"title": "Caf\u00e9 report", "outline": [{"level": "H1", "text": "Intro", "page": 1}]}
+        with OutputWriter(queue_size=2, batch_size=3) as writer:
+            for i in range(10):
+                writer.submit(Path(tmp) / f"file{i:02d}.json", output)
+            writer.submit(Path(tmp) / "broken.json", {"title": object()})
+        
+        names = sorted(os.listdir(tmp))
+        print(f"\nOutput writer: {writer.written} written, {len(writer.failures)} failed")
+        assert names == [f"file{i:02d}.json" for i in range(10)]
+        with open(Path(tmp) / "file07.json", encoding="utf-8") as f:
+            text = f.read()
+        assert text == json.dumps(output, indent=2, ensure_ascii=False)
+        assert [Path(failure.path).name for failure in writer.failures] == ["broken.json"]
+        
+        with OutputWriter(compact=True, fsync=False) as writer:
+            writer.submit(Path(tmp) / "file00.json", output)
+        with open(Path(tmp) / "file00.json", encoding="utf-8") as f:
+            text = f.read()
+        assert json.loads(text) == output and "\n" not in text
+        print("✓ Outputs replaced atomically, compact and indented")
+
 def test_level_sorting():
     """Test the level sorting logic."""
     extractor = PDFOutlineExtractor()
@@ -83,7 +535,25 @@ if __name__ == "__main__":
     
     test_heading_detection()
     test_title_extraction()
+    test_title_font_ranking()
+    test_overprinted_title()
+    test_quick_mode_font_scan()
+    test_heading_lines()
     test_output_validation()
+    test_batch_validation()
+    test_document_store()
+    test_profiling()
+    test_backend_selection()
+    test_region_masking()
+    test_scanned_page_detection()
+    test_deferred_ocr()
+    test_batch_scheduling()
+    test_duplicate_files()
+    test_running_lines()
+    test_evaluation_scoring()
+    test_synthetic_corpus()
+    test_text_normalization()
+    test_output_writer()
     test_level_sorting()
     
     print("\n=== Test completed ===") 
\ No newline at end of file
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Optional embedding reranker for Challenge 1b
+Re-scores the top keyword/TF-IDF candidates with a small local spaCy model
+(CPU only, no network). Embeddings are stored in a content-addressed on-disk
+cache, a memory-mapped float16 matrix, so repeat runs over the same
+documents skip the model entirely.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+from pathlib import Path
+from typing import List, Dict, Optional, Iterable
+import numpy as np
+
+try:
+    import spacy
+except ImportError:
+    spacy = None
+
+DEFAULT_MODEL = "en_core_web_sm"
+
+# Number of top-ranked candidates that are embedded and reranked
+RERANK_TOP_N = 20
+
+# Share of the final score taken by the embedding similarity
+RERANK_WEIGHT = 0.5
+
+# Candidate text beyond this many characters does not change its embedding much
+RERANK_MAX_CHARS = 2000
+
+# Cache location unless one is passed explicitly
+CACHE_DIR_ENV = "EMBEDDING_CACHE_DIR"
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "persona_embeddings"
+
+
+class EmbeddingCache:
+    """Content-addressed embeddings in memory-mapped float16 matrices.
+
+    Every model and embedding width has its own pair of files:
+    ``index-{model}-{dim}.json`` lists the content hash of every row of
+    ``embeddings-{model}-{dim}.f16``. Switching models therefore never
+    discards another model's rows. New rows are appended to the matrix
+    file, so existing rows never move and the index is the only file that
+    is rewritten. Rows the index does not list (left by a crash) are
+    truncated away before appending. A cache opens the most recently
+    written width of its model.
+    """
+
+    INDEX_PREFIX = "index-"
+    MATRIX_PREFIX = "embeddings-"
+
+    def __init__(self, cache_dir: Path, model_name: str):
+        self.cache_dir = Path(cache_dir)
+        self.model_name = model_name
+        self.dim = 0
+        self._rows: Dict[str, int] = {}
+        self._matrix: Optional[np.memmap] = None
+        self._load(self._latest_dim())
+
+    @property
+    def _stem(self) -> str:
+        return re.sub(r'[^\w.-]', '_', self.model_name)
+
+    @property
+    def index_path(self) -> Path:
+        return self.cache_dir / f"{self.INDEX_PREFIX}{self._stem}-{self.dim}.json"
+
+    @property
+    def matrix_path(self) -> Path:
+        return self.cache_dir / f"{self.MATRIX_PREFIX}{self._stem}-{self.dim}.f16"
+
+    def _latest_dim(self) -> int:
+        """Width of this model's most recently written index (0 if there is none)."""
+        prefix = f"{self.INDEX_PREFIX}{self._stem}-"
+        latest, latest_mtime = 0, -1
+        try:
+            entries = list(os.scandir(self.cache_dir))
+        except OSError:
+            return 0
+        for entry in entries:
+            width = entry.name[len(prefix):-len('.json')]
+            if not (entry.name.startswith(prefix) and entry.name.endswith('.json') and width.isdigit()):
+                continue
+            try:
+                mtime = entry.stat().st_mtime_ns
+            except OSError:
+                continue
+            if mtime > latest_mtime:
+                latest, latest_mtime = int(width), mtime
+        return latest
+
+    def _load(self, dim: int):
+        self.dim = dim
+        self._rows = {}
+        self._matrix = None
+        if not dim:
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+        if index.get('model') != self.model_name or index.get('dim') != dim:
+            return
+
+        keys = index.get('keys', [])
+        # Rows whose index entry was written but whose data is incomplete are dropped
+        matrix_path = self.matrix_path
+        available = matrix_path.stat().st_size // (2 * dim) if matrix_path.exists() else 0
+        keys = keys[:available]
+        self._rows = {key: row for row, key in enumerate(keys)}
+        self._map(len(keys))
+
+    def _map(self, rows: int):
+        if rows:
+            self._matrix = np.memmap(self.matrix_path, dtype=np.float16,
+                                     mode='r', shape=(rows, self.dim))
+        else:
+            self._matrix = None
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode('utf-8')).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        row = self._rows.get(key)
+        if row is None or self._matrix is None:
+            return None
+        return np.asarray(self._matrix[row], dtype=np.float32)
+
+    def put_many(self, keys: List[str], vectors: np.ndarray):
+        """Append new embeddings (rows of ``vectors``) under their content keys."""
+        if not len(keys):
+            return
+        dim = int(vectors.shape[1])
+        if dim != self.dim:
+            # Rows of another width live in that width's own files
+            self._load(dim)
+        new = [(key, vector) for key, vector in zip(keys, vectors) if key not in self._rows]
+        if not new:
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._matrix = None
+        with open(self.matrix_path, 'ab') as f:
+            # New rows must start right after the indexed ones
+            f.truncate(2 * self.dim * len(self._rows))
+            f.write(np.asarray([vector for _, vector in new], dtype=np.float16).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        for key, _ in new:
+            self._rows[key] = len(self._rows)
+        keys_in_order = sorted(self._rows, key=self._rows.get)
+
+        index_path = self.index_path
+        temp_path = index_path.with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'model': self.model_name, 'dim': self.dim, 'keys': keys_in_order}, f)
+        os.replace(temp_path, index_path)
+        self._map(len(keys_in_order))
+
+
+class EmbeddingReranker:
+    """Rerank candidate sections by embedding similarity to the persona/job query."""
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, cache_dir: Optional[str] = None,
+                 top_n: int = RERANK_TOP_N, weight: float = RERANK_WEIGHT):
+        self.model_name = model_name
+        self.top_n = top_n
+        self.weight = weight
+        self.cache = EmbeddingCache(
+            Path(cache_dir or os.environ.get(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR), model_name
+        )
+        self._nlp = None
+        self._load_failed = spacy is None
+
+    def _model(self):
+        """The spaCy pipeline, loaded once; only tok2vec is needed for vectors."""
+        if self._nlp is None and not self._load_failed:
+            try:
+                self._nlp = spacy.load(self.model_name,
+                                       exclude=['tagger', 'parser', 'attribute_ruler',
+                                                'lemmatizer', 'ner'])
+            except Exception as e:
+                print(f"Embedding reranker disabled, cannot load {self.model_name}: {e}")
+                self._load_failed = True
+        return self._nlp
+
+    @property
+    def available(self) -> bool:
+        return self._model() is not None
+
+    def embed(self, texts: Iterable[str]) -> np.ndarray:
+        """L2-normalised embeddings of ``texts``, computing only uncached ones."""
+        texts = [text[:RERANK_MAX_CHARS] for text in texts]
+        keys = [self.cache.key(text) for text in texts]
+        vectors: List[Optional[np.ndarray]] = [self.cache.get(key) for key in keys]
+
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            nlp = self._model()
+            if nlp is None:
+                raise RuntimeError(f"embedding model {self.model_name} is not available")
+            computed = np.array([doc.vector for doc in nlp.pipe(texts[i] for i in missing)],
+                                dtype=np.float32)
+            norms = np.linalg.norm(computed, axis=1, keepdims=True)
+            computed /= np.where(norms == 0, 1, norms)
+            self.cache.put_many([keys[i] for i in missing], computed)
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+
+        return np.vstack(vectors) if vectors else np.zeros((0, self.cache.dim), dtype=np.float32)
+
+    def rerank(self, query: str, candidates: List[Dict], text_key: str = 'text',
+               score_key: str = 'relevance_score', deadline: Optional[float] = None) -> List[Dict]:
+        """Blend keyword scores of the top candidates with embedding similarity.
+
+        ``candidates`` must be sorted by ``score_key``. Only the first
+        ``top_n`` are reranked; the list is returned unchanged if the model is
+        unavailable or ``deadline`` (a ``time.time()`` value) has passed.
+        """
+        head = candidates[:self.top_n]
+        if len(head) < 2 or (deadline is not None and time.time() >= deadline):
+            return candidates
+        texts = [query] + [candidate[text_key] for candidate in head]
+        if not self.is_cached(texts) and not self.available:
+            return candidates
+
+        embeddings = self.embed(texts)
+        similarities = np.clip(embeddings[1:] @ embeddings[0], 0.0, 1.0)
+        top_score = max(candidate[score_key] for candidate in head) or 1.0
+
+        reranked = []
+        for candidate, similarity in zip(head, similarities):
+            blended = ((1 - self.weight) * candidate[score_key] / top_score +
+                       self.weight * float(similarity))
+            reranked.append({**candidate, score_key: blended})
+        reranked.sort(key=lambda candidate: candidate[score_key], reverse=True)
+
+        # Candidates below the reranked window keep their order after it
+        return reranked + candidates[self.top_n:]
+
+    def is_cached(self, texts: Iterable[str]) -> bool:
+        """Whether the embeddings of all ``texts`` are already cached."""
+        return all(self.cache.get(self.cache.key(text[:RERANK_MAX_CHARS])) is not None
+                   for text in texts)
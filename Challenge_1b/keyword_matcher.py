@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Multi-pattern keyword matching for Challenge 1b
+An Aho-Corasick automaton over all persona and job vocabularies that finds
+every keyword hit in a single pass over the text.
+"""
+
+from collections import defaultdict
+from typing import List, Dict, Set, Tuple, Iterator, Hashable
+
+try:
+    import ahocorasick  # pyahocorasick, optional C implementation
+except ImportError:
+    ahocorasick = None
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton mapping keywords to one or more labels.
+
+    Keywords are matched case-sensitively, so callers pass lowercased text
+    (as the analyzer already does). With ``word_boundary`` set, a hit only
+    counts when it is not embedded in a longer alphanumeric token.
+    """
+
+    def __init__(self, word_boundary: bool = False):
+        self.word_boundary = word_boundary
+        self._labels: Dict[str, Set[Hashable]] = defaultdict(set)
+        self._built = False
+        # Pure-Python automaton state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+        self._native = None
+
+    def add(self, keyword: str, label: Hashable):
+        """Register ``keyword`` under ``label``; must be called before build()."""
+        if self._built:
+            raise RuntimeError("cannot add keywords after build()")
+        if keyword:
+            self._labels[keyword].add(label)
+
+    def add_all(self, keywords: Dict[Hashable, List[str]]):
+        """Register every keyword of a {label: [keywords]} mapping."""
+        for label, words in keywords.items():
+            for keyword in words:
+                self.add(keyword, label)
+
+    def build(self) -> "KeywordAutomaton":
+        """Compile the automaton (trie plus failure links)."""
+        if ahocorasick is not None:
+            self._native = ahocorasick.Automaton()
+            for keyword in self._labels:
+                self._native.add_word(keyword, keyword)
+            if self._labels:
+                self._native.make_automaton()
+            else:
+                self._native = None
+        else:
+            self._build_python()
+        self._built = True
+        return self
+
+    def _build_python(self):
+        for keyword in self._labels:
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][char] = next_state
+                state = next_state
+            self._output[state].append(keyword)
+
+        # Breadth-first pass to set failure links and merge outputs. Each state's
+        # transition table also inherits the one of its failure state, turning
+        # the automaton into a DFA that never walks failure links while matching.
+        children = [list(transitions.items()) for transitions in self._goto]
+        queue = list(self._goto[0].values())
+        for state in queue:
+            self._goto[state] = {**self._goto[0], **self._goto[state]}
+        for state in queue:
+            for char, next_state in children[state]:
+                queue.append(next_state)
+                fallback = self._goto[self._fail[state]].get(char, 0) if state else 0
+                self._fail[next_state] = fallback
+                self._output[next_state].extend(self._output[fallback])
+                inherited = dict(self._goto[fallback])
+                inherited.update(self._goto[next_state])
+                self._goto[next_state] = inherited
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """Yield (end_index, keyword) for every hit in one pass over ``text``."""
+        if not self._built:
+            self.build()
+
+        if self._native is not None:
+            matches = self._native.iter(text)
+        elif self._labels:
+            matches = self._iter_python(text)
+        else:
+            matches = iter(())
+
+        for end, keyword in matches:
+            if not self.word_boundary or self._on_boundary(text, end - len(keyword) + 1, end):
+                yield end, keyword
+
+    def _iter_python(self, text: str) -> Iterator[Tuple[int, str]]:
+        goto, output = self._goto, self._output
+        state = 0
+        for index, char in enumerate(text):
+            state = goto[state].get(char, 0)
+            if output[state]:
+                for keyword in output[state]:
+                    yield index, keyword
+
+    @staticmethod
+    def _on_boundary(text: str, start: int, end: int) -> bool:
+        before = text[start - 1] if start > 0 else ' '
+        after = text[end + 1] if end + 1 < len(text) else ' '
+        return not before.isalnum() and not after.isalnum()
+
+    def matched_keywords(self, text: str) -> Set[str]:
+        """Distinct keywords present in ``text``."""
+        return {keyword for _, keyword in self.iter_matches(text)}
+
+    def label_hits(self, text: str) -> Dict[Hashable, Set[str]]:
+        """Distinct keywords present in ``text``, grouped by label."""
+        hits: Dict[Hashable, Set[str]] = defaultdict(set)
+        for keyword in self.matched_keywords(text):
+            for label in self._labels[keyword]:
+                hits[label].add(keyword)
+        return hits
+
+    def count_by_label(self, text: str) -> Dict[Hashable, int]:
+        """Number of distinct keywords present in ``text`` per label."""
+        return {label: len(keywords) for label, keywords in self.label_hits(text).items()}
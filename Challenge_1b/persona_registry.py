@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Data-driven persona registry for Challenge 1b
+Loads personas (identification cues, keywords and job patterns) from a JSON
+config and precomputes their term vectors, so identifying a persona is one
+nearest-vector lookup and section scoring is a dot product over a single
+keyword pass, however many personas are registered.
+"""
+
+import os
+import json
+import math
+from pathlib import Path
+from typing import List, Dict, Optional, Iterator, NamedTuple
+import numpy as np
+
+from keyword_matcher import KeywordAutomaton
+
+DEFAULT_REGISTRY_PATH = Path(__file__).resolve().parent / "personas.json"
+
+# Environment variable pointing at an alternative registry file
+REGISTRY_PATH_ENV = "PERSONA_REGISTRY"
+
+
+class PersonaProfile(NamedTuple):
+    """One persona as declared in the registry file."""
+    name: str
+    label: str
+    cues: List[str]          # Identify the persona from the role text
+    job_cues: List[str]      # Identify the persona from the job text
+    keywords: List[str]      # Score sections for the persona
+    job_patterns: List[str]  # Score sections when the job text also mentions them
+
+
+class PersonaRegistry:
+    """Personas with precomputed term vectors over one shared vocabulary."""
+
+    def __init__(self, profiles: List[PersonaProfile], word_boundary: bool = False):
+        if not profiles:
+            raise ValueError("persona registry is empty")
+        # Matching runs on lowercased text, so every term is lowercased here
+        profiles = [profile._replace(**{field: [term.lower() for term in getattr(profile, field) if term]
+                                        for field in ('cues', 'job_cues', 'keywords', 'job_patterns')})
+                    for profile in profiles]
+
+        self.profiles = {profile.name: profile for profile in profiles}
+        self.names = [profile.name for profile in profiles]
+        self._row = {name: row for row, name in enumerate(self.names)}
+
+        # Shared vocabulary: every cue, keyword and job pattern of every persona
+        terms = []
+        for profile in profiles:
+            terms.extend(profile.cues + profile.job_cues + profile.keywords + profile.job_patterns)
+        self.terms = list(dict.fromkeys(terms))
+        self.term_index = {term: column for column, term in enumerate(self.terms)}
+
+        self.cue_matrix = self._matrix(lambda p: p.cues, idf=True)
+        self.job_cue_matrix = self._matrix(lambda p: p.job_cues, idf=True)
+        self.keyword_matrix = self._matrix(lambda p: p.keywords)
+        self.job_pattern_matrix = self._matrix(lambda p: p.job_patterns)
+
+        # One automaton over the whole vocabulary, labelled by term column
+        self.matcher = KeywordAutomaton(word_boundary=word_boundary)
+        for term, column in self.term_index.items():
+            self.matcher.add(term, column)
+        self.matcher.build()
+
+    @classmethod
+    def load(cls, path: Optional[str] = None, word_boundary: bool = False) -> "PersonaRegistry":
+        """Load the registry from ``path``, $PERSONA_REGISTRY or the bundled file."""
+        registry_path = Path(path or os.environ.get(REGISTRY_PATH_ENV) or DEFAULT_REGISTRY_PATH)
+        with open(registry_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+
+        profiles = [
+            PersonaProfile(
+                name=entry['name'],
+                label=entry.get('label', entry['name']),
+                cues=entry.get('cues', []),
+                job_cues=entry.get('job_cues', []),
+                keywords=entry.get('keywords', []),
+                job_patterns=entry.get('job_patterns', []),
+            )
+            for entry in config.get('personas', [])
+        ]
+        return cls(profiles, word_boundary=word_boundary)
+
+    def __iter__(self) -> Iterator[PersonaProfile]:
+        return iter(self.profiles.values())
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _matrix(self, field, idf: bool = False) -> np.ndarray:
+        """Persona x term matrix of one field (binary, or weighted by persona IDF)."""
+        matrix = np.zeros((len(self.names), len(self.terms)), dtype=np.float32)
+        for row, name in enumerate(self.names):
+            for term in field(self.profiles[name]):
+                matrix[row, self.term_index[term]] = 1.0
+        if idf:
+            document_frequency = matrix.sum(axis=0)
+            weights = np.array([
+                math.log((1 + len(self.names)) / (1 + df)) + 1.0 for df in document_frequency
+            ], dtype=np.float32)
+            matrix *= weights
+        return matrix
+
+    def row(self, persona_type: str) -> Optional[int]:
+        """Matrix row of a persona, or None for unknown personas such as 'general'."""
+        return self._row.get(persona_type)
+
+    def term_hits(self, text_lower: str) -> np.ndarray:
+        """Binary vector of the vocabulary terms found in ``text_lower`` (one pass)."""
+        hits = np.zeros(len(self.terms), dtype=np.float32)
+        columns = list(self.matcher.label_hits(text_lower))
+        if columns:
+            hits[columns] = 1.0
+        return hits
+
+    def identify(self, persona: str, job: str) -> str:
+        """Nearest persona for a role and job description.
+
+        The role text is matched against the identification cues first; the
+        job text is only consulted when the role matches nothing. Ties go to
+        the persona listed first in the registry.
+        """
+        for matrix, text in ((self.cue_matrix, persona), (self.job_cue_matrix, job)):
+            scores = matrix @ self.term_hits(text.lower())
+            if scores.max() > 0:
+                return self.names[int(np.argmax(scores))]
+        return 'general'
+
+    def hit_counts(self, hits: np.ndarray) -> Dict[str, int]:
+        """Distinct keyword hits per persona for a term-hit vector."""
+        counts = self.keyword_matrix @ hits
+        return {name: int(count) for name, count in zip(self.names, counts)}
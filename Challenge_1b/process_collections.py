@@ -5,14 +5,14 @@ Extracts relevant sections from document collections based on specific personas
 """
 
 import os
+import sys
 import json
+import argparse
 import re
 import time
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, NamedTuple
 from collections import defaultdict
-import PyPDF2
-import pdfplumber
 from jsonschema import validate
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
@@ -21,6 +21,28 @@ import nltk
 from nltk.corpus import stopwords
 from nltk.tokenize import sent_tokenize, word_tokenize
 
+# The shared parsing core lives in ../common and the outline extractor in
+# ../Challenge_1a locally; in Docker both are copied next to this script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "Challenge_1a"))
+from common.document_parser import (
+    ParsedDocument, TextLine, load_document, read_bookmarks, resolve_io_dirs, discover_files,
+    set_document_store, set_backend_policy, set_region_masking, set_ocr_deferred, finish_ocr,
+    write_backend_log, backend_policy, region_masking
+)
+from common.document_store import SECTION_RECORDS_KEY, update_stored_document
+from common.profiling import DocumentProfiler, profiled
+from common.dedup import sketch, collapse_near_duplicates
+from common.running_lines import iter_content_lines, page_content_lines
+from common.output_writer import OutputWriter
+from common.search_index import IndexedSection, SearchIndex, open_search_index
+from common.text_normalization import NormalizedText, normalize_block, normalize_line
+from process_pdfs import PDFOutlineExtractor
+from persona_registry import PersonaRegistry
+from embedding_reranker import EmbeddingReranker
+from collection_loader import CollectionWarning, LoadedCollection, load_collection
+from result_cache import ResultCache, result_key
+
 # Download required NLTK data
 try:
     nltk.data.find('tokenizers/punkt')
@@ -32,11 +54,65 @@ try:
 except LookupError:
     nltk.download('stopwords', quiet=True)
 
+# Every collection must be processed within this many seconds
+COLLECTION_TIME_BUDGET = 60.0
+
+# Sentences kept per summarized section in subsection_analysis
+SUMMARY_SENTENCES = 3
+
+# Identifies the segmentation stored with parsed documents; change it whenever
+# segment_document() would produce different sections for the same lines
+SEGMENTATION_TAG = "outline-v3"
+
+# Identifies the analysis behind cached results; change it whenever the same
+# collection and query would produce a different output
+ANALYZER_VERSION = "2"
+
+# Sentence boundaries for when the punkt model is unavailable
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+(?=[^a-z\s])')
+
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+_SECTION_BREAK = re.compile(r'\n\s*\n|\n\s*[A-Z][A-Z\s]{2,}\n')
+_LIST_ITEM = re.compile(r'\n(?=\s*(?:[•\-\*o]|\d+[.)])\s)')
+_CONTENT_WORD = re.compile(r'[a-z]{3,}')
+
+# Section shapes that add to the query-independent score
+_HEADING_LIKE = re.compile(r'^[A-Z][A-Z\s]{2,}$')
+_NUMBERED_ITEM = re.compile(r'^\d+\.')
+_BULLET_ITEM = re.compile(r'^[•\-\*]')
+
+# Characters dropped from refined text, and refined text that is only a page number
+_NOISE_CHARS = re.compile(r'[^\w\s\.\,\;\:\!\?\-\(\)]')
+_PAGE_NUMBER = re.compile(r'\d+\s*')
+
+class Section(NamedTuple):
+    """A document section: the text under one heading, possibly spanning pages."""
+    text: str
+    page_number: int
+    document: str
+    title: str
+    end_page: int
+    normalized: Optional[NormalizedText] = None  # Of title + '\n' + text, set by segment_document
+
+
 class PersonaDocumentAnalyzer:
     """Advanced persona-driven document analysis system."""
     
-    def __init__(self):
+    def __init__(self, word_boundary: bool = False, registry_path: Optional[str] = None,
+                 time_budget: float = COLLECTION_TIME_BUDGET,
+                 reranker: Optional[EmbeddingReranker] = None,
+                 search_index: Optional[SearchIndex] = None,
+                 result_cache: Optional[ResultCache] = None):
         self.stop_words = set(stopwords.words('english'))
+        self.time_budget = time_budget
+        # Optional embedding rerank of the top keyword candidates
+        self.reranker = reranker
+        # Optional global keyword index that every segmented document is added to
+        self.search_index = search_index
+        # Optional cache of whole outputs for repeated collection/persona/job queries
+        self.result_cache = result_cache
+        self.word_boundary = word_boundary
+        self.outline_extractor = PDFOutlineExtractor()
         self.vectorizer = TfidfVectorizer(
             max_features=1000,
             stop_words='english',
@@ -44,200 +120,316 @@ class PersonaDocumentAnalyzer:
             min_df=2
         )
         
-        # Persona-specific keywords and patterns
-        self.persona_keywords = {
-            'travel_planner': [
-                'travel', 'trip', 'vacation', 'tour', 'itinerary', 'booking', 'hotel', 'restaurant',
-                'attraction', 'activity', 'transport', 'budget', 'planning', 'schedule', 'day',
-                'group', 'friends', 'college', 'student', 'accommodation', 'dining', 'sightseeing'
-            ],
-            'hr_professional': [
-                'form', 'onboarding', 'compliance', 'employee', 'hr', 'human resources', 'policy',
-                'procedure', 'document', 'signature', 'fill', 'complete', 'submit', 'approval',
-                'workflow', 'automation', 'digital', 'electronic', 'management', 'tracking'
-            ],
-            'food_contractor': [
-                'recipe', 'cooking', 'food', 'meal', 'dinner', 'buffet', 'vegetarian', 'corporate',
-                'catering', 'menu', 'ingredient', 'preparation', 'serving', 'quantity', 'portion',
-                'dietary', 'restriction', 'allergy', 'nutrition', 'presentation', 'service'
-            ],
-            'researcher': [
-                'research', 'study', 'analysis', 'methodology', 'data', 'results', 'conclusion',
-                'literature', 'review', 'paper', 'publication', 'experiment', 'hypothesis',
-                'finding', 'evidence', 'statistical', 'benchmark', 'performance', 'evaluation'
-            ],
-            'student': [
-                'study', 'learn', 'education', 'course', 'exam', 'test', 'assignment', 'homework',
-                'concept', 'theory', 'practice', 'exercise', 'review', 'preparation', 'grade',
-                'academic', 'curriculum', 'syllabus', 'textbook', 'lecture', 'tutorial'
-            ],
-            'analyst': [
-                'analysis', 'report', 'data', 'trend', 'financial', 'market', 'performance',
-                'revenue', 'investment', 'strategy', 'business', 'corporate', 'annual', 'quarterly',
-                'metrics', 'kpi', 'forecast', 'projection', 'comparison', 'benchmark'
+        # Personas, their vocabularies and precomputed term vectors
+        self.registry = PersonaRegistry.load(registry_path, word_boundary=word_boundary)
+        self.persona_keywords = {profile.name: profile.keywords for profile in self.registry}
+        self._job_hits_cache = {}
+        self._registry_digest = result_key({'profiles': [list(profile) for profile in self.registry]})
+    
+    def extract_text_from_pdf(self, pdf_path: str,
+                              document: Optional[ParsedDocument] = None) -> List[Section]:
+        """Extract heading-delimited sections from PDF.
+        
+        An already parsed ``document`` (e.g. from the outline extractor) is
+        reused instead of parsing the file again.
+        """
+        if document is None:
+            document = load_document(pdf_path)
+        return self.segment_document(document)
+    
+    def segment_document(self, document: ParsedDocument) -> List[Section]:
+        """Split a document into sections along its outline.
+        
+        Embedded bookmarks are used when present, otherwise the headings found
+        by ``PDFOutlineExtractor``. The segmentation is cached on the document
+        so every query over the same parse reuses it, and saved with the
+        document when a document store is configured.
+        """
+        if 'sections' in document.cache:
+            return document.cache['sections']
+        
+        tag, records = document.cache.get(SECTION_RECORDS_KEY, ('', []))
+        if tag == SEGMENTATION_TAG:
+            sections = [self._normalized_section(Section(text, page_number, document.path, title, end_page))
+                        for title, text, page_number, end_page in records]
+            document.cache['sections'] = sections
+            return sections
+        
+        # Running headers and footers would otherwise split and repeat in sections
+        lines = list(iter_content_lines(document))
+        heading_indices = self._bookmark_heading_indices(document, lines)
+        if not heading_indices:
+            # Labels such as "Ingredients:" introduce content inside a section
+            heading_indices = [
+                index for index, _ in self.outline_extractor.find_heading_lines(lines)
+                if not lines[index].text.rstrip().endswith(':')
             ]
-        }
-        
-        # Job-specific patterns
-        self.job_patterns = {
-            'travel_planning': ['plan', 'trip', 'itinerary', 'schedule', 'booking', 'accommodation'],
-            'form_creation': ['create', 'form', 'fillable', 'digital', 'automation', 'workflow'],
-            'catering': ['prepare', 'menu', 'buffet', 'catering', 'service', 'quantity'],
-            'research': ['review', 'literature', 'methodology', 'analysis', 'findings'],
-            'study': ['study', 'learn', 'prepare', 'exam', 'concept', 'practice'],
-            'analysis': ['analyze', 'report', 'trend', 'performance', 'financial', 'market']
-        }
-    
-    def extract_text_from_pdf(self, pdf_path: str) -> List[Tuple[str, int, str]]:
-        """Extract text with page numbers and sections from PDF."""
-        text_sections = []
-        
-        try:
-            with pdfplumber.open(pdf_path) as pdf:
-                for page_num, page in enumerate(pdf.pages, 1):
-                    # Extract text
-                    text = page.extract_text()
-                    if text:
-                        # Split into sections (paragraphs)
-                        sections = self._split_into_sections(text)
-                        for section in sections:
-                            if section.strip():
-                                text_sections.append((section.strip(), page_num, pdf_path))
-        except Exception as e:
-            print(f"Error extracting text from {pdf_path}: {e}")
-            # Fallback to PyPDF2
-            return self._extract_text_pypdf2(pdf_path)
         
-        return text_sections
+        if heading_indices:
+            sections = self._sections_from_headings(document, lines, heading_indices)
+        else:
+            sections = self._sections_from_paragraphs(document)
+        sections = [self._normalized_section(section) for section in sections]
+        
+        document.cache['sections'] = sections
+        document.cache[SECTION_RECORDS_KEY] = (SEGMENTATION_TAG, [
+            (section.title, section.text, section.page_number, section.end_page)
+            for section in sections
+        ])
+        update_stored_document(document)
+        return sections
     
-    def _extract_text_pypdf2(self, pdf_path: str) -> List[Tuple[str, int, str]]:
-        """Fallback text extraction using PyPDF2."""
-        text_sections = []
-        
-        try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                for page_num, page in enumerate(pdf_reader.pages, 1):
-                    text = page.extract_text()
-                    if text:
-                        sections = self._split_into_sections(text)
-                        for section in sections:
-                            if section.strip():
-                                text_sections.append((section.strip(), page_num, pdf_path))
-        except Exception as e:
-            print(f"Error with PyPDF2 extraction: {e}")
-        
-        return text_sections
+    def _bookmark_heading_indices(self, document: ParsedDocument, lines: List[TextLine]) -> List[int]:
+        """Map embedded bookmarks onto the lines carrying their titles.
+        
+        Bookmarks whose title is not found on their page are skipped; with
+        fewer than two matches the heading detector is used instead.
+        """
+        bookmarks = read_bookmarks(document.path)
+        if len(bookmarks) < 2:
+            return []
+        
+        first_line_of_page = {}
+        for index, line in enumerate(lines):
+            first_line_of_page.setdefault(line.page, index)
+        
+        indices = set()
+        for title, page_num, _ in bookmarks:
+            key = self._normalize_heading(title)[:40]
+            if not key:
+                continue
+            for index in range(first_line_of_page.get(page_num, len(lines)), len(lines)):
+                if lines[index].page != page_num:
+                    break
+                if lines[index].normalized.lower.startswith(key):
+                    indices.add(index)
+                    break
+        
+        return sorted(indices) if len(indices) >= 2 else []
+    
+    def _normalize_heading(self, text: str) -> str:
+        return normalize_line(text).lower
+    
+    def _normalized_section(self, section: Section) -> Section:
+        """``section`` with the normalized form every scoring stage reuses."""
+        return section._replace(normalized=normalize_block(section.title + '\n' + section.text))
+    
+    def _scoring_text(self, section: Section) -> NormalizedText:
+        return section.normalized or normalize_block(section.title + '\n' + section.text)
+    
+    def _sections_from_headings(self, document: ParsedDocument, lines: List[TextLine],
+                                heading_indices: List[int]) -> List[Section]:
+        """Build one section per heading, running until the next heading."""
+        sections = []
+        boundaries = sorted(set(heading_indices))
+        
+        # Text before the first heading forms an untitled preamble
+        if boundaries[0] > 0:
+            preamble = self._join_lines(lines[:boundaries[0]])
+            if preamble:
+                sections.append(Section(preamble, lines[0].page, document.path,
+                                        self._extract_section_title(preamble),
+                                        lines[boundaries[0] - 1].page))
+        
+        start = 0
+        while start < len(boundaries):
+            heading_index = boundaries[start]
+            # A heading directly followed by another heading is a parent: its
+            # section absorbs the child headings until real body text appears
+            end = start + 1
+            while end < len(boundaries) and boundaries[end] == boundaries[end - 1] + 1:
+                end += 1
+            next_index = boundaries[end] if end < len(boundaries) else len(lines)
+            
+            body_lines = lines[heading_index + 1:next_index]
+            body = self._join_lines(body_lines)
+            if body:
+                sections.append(Section(body, lines[heading_index].page, document.path,
+                                        lines[heading_index].text.strip(),
+                                        body_lines[-1].page))
+            start = end
+        
+        return sections
+    
+    def _join_lines(self, lines: List[TextLine]) -> str:
+        """Join lines back into text, keeping paragraph breaks."""
+        parts = []
+        for line in lines:
+            if line.paragraph_start and parts:
+                parts.append('')
+            parts.append(line.text)
+        return '\n'.join(parts).strip()
+    
+    def _sections_from_paragraphs(self, document: ParsedDocument) -> List[Section]:
+        """Fallback segmentation for documents without any detectable outline."""
+        sections = []
+        for page in document.pages:
+            # Split into sections (paragraphs)
+            page_text = self._join_lines(page_content_lines(document, page))
+            for text in self._split_into_sections(page_text):
+                if text.strip():
+                    sections.append(Section(text.strip(), page.number, document.path,
+                                            self._extract_section_title(text), page.number))
+        return sections
     
     def _split_into_sections(self, text: str) -> List[str]:
         """Split text into meaningful sections."""
         # Split by double newlines or section markers
-        sections = re.split(r'\n\s*\n|\n\s*[A-Z][A-Z\s]{2,}\n', text)
+        sections = _SECTION_BREAK.split(text)
         return [s.strip() for s in sections if s.strip()]
     
     def identify_persona_type(self, persona: str, job: str) -> str:
         """Identify the type of persona based on role and job description."""
-        persona_lower = persona.lower()
-        job_lower = job.lower()
-        
-        # Check for specific persona types
-        if any(word in persona_lower for word in ['travel', 'planner', 'trip']):
-            return 'travel_planner'
-        elif any(word in persona_lower for word in ['hr', 'human resources', 'professional']):
-            return 'hr_professional'
-        elif any(word in persona_lower for word in ['food', 'catering', 'contractor']):
-            return 'food_contractor'
-        elif any(word in persona_lower for word in ['researcher', 'phd', 'academic']):
-            return 'researcher'
-        elif any(word in persona_lower for word in ['student', 'undergraduate', 'college']):
-            return 'student'
-        elif any(word in persona_lower for word in ['analyst', 'investment', 'financial']):
-            return 'analyst'
-        
-        # Fallback based on job description
-        if any(word in job_lower for word in ['trip', 'travel', 'vacation']):
-            return 'travel_planner'
-        elif any(word in job_lower for word in ['form', 'onboarding', 'compliance']):
-            return 'hr_professional'
-        elif any(word in job_lower for word in ['menu', 'buffet', 'catering']):
-            return 'food_contractor'
-        elif any(word in job_lower for word in ['research', 'literature', 'review']):
-            return 'researcher'
-        elif any(word in job_lower for word in ['study', 'learn', 'exam']):
-            return 'student'
-        elif any(word in job_lower for word in ['analyze', 'report', 'financial']):
-            return 'analyst'
-        
-        return 'general'
+        return self.registry.identify(persona, job)
+    
+    def persona_hit_counts(self, text: str) -> Dict[str, int]:
+        """Number of distinct persona keywords found in ``text`` for every persona."""
+        return self.registry.hit_counts(self.registry.term_hits(text.lower()))
+    
+    def _job_hits(self, job_description: str) -> np.ndarray:
+        """Term hits of the job description, computed once per job."""
+        hits = self._job_hits_cache.get(job_description)
+        if hits is None:
+            hits = self.registry.term_hits(job_description.lower())
+            self._job_hits_cache[job_description] = hits
+        return hits
     
     def calculate_relevance_score(self, text: str, persona_type: str, job_description: str) -> float:
         """Calculate relevance score for a text section."""
-        text_lower = text.lower()
-        job_lower = job_description.lower()
-        
-        # Get relevant keywords
-        persona_keywords = self.persona_keywords.get(persona_type, [])
-        
-        # Calculate keyword matches
-        keyword_score = sum(1 for keyword in persona_keywords if keyword in text_lower)
-        
-        # Calculate job-specific relevance
-        job_score = sum(1 for pattern in self.job_patterns.get(persona_type, []) 
-                       if pattern in job_lower and pattern in text_lower)
+        text_hits, base_score = self._section_features(normalize_block(text))
+        return float(text_hits @ self._scoring_weights(persona_type, job_description)) + base_score
+    
+    def _scoring_weights(self, persona_type: str, job_description: str) -> np.ndarray:
+        """Term weights of one persona/job query for relevance scoring.
+        
+        A section's keyword and job scores are linear in its term hits, so the
+        query-dependent part of its score is ``text_hits @ weights``.
+        """
+        weights = np.zeros(len(self.registry.terms), dtype=np.float64)
+        row = self.registry.row(persona_type)
+        if row is not None:
+            # Keyword matches (0.4) and job-specific relevance (0.3): the
+            # persona's job patterns that the job description also mentions
+            weights += 0.4 * self.registry.keyword_matrix[row]
+            weights += 0.3 * self.registry.job_pattern_matrix[row] * self._job_hits(job_description)
+        return weights
+    
+    def _section_features(self, text: NormalizedText) -> Tuple[np.ndarray, float]:
+        """Term hits of a section and the query-independent part of its score."""
+        # Single pass over the text for the whole persona vocabulary
+        text_hits = self.registry.term_hits(text.lower)
         
         # Calculate text length score (prefer medium-length sections)
-        length_score = min(len(text.split()) / 50, 1.0)  # Normalize to 0-1
+        length_score = min(text.word_count / 50, 1.0)  # Normalize to 0-1
         
         # Calculate section importance (headings, lists, etc.)
         importance_score = 0
-        if re.search(r'^[A-Z][A-Z\s]{2,}$', text[:50]):  # Heading-like text
+        if _HEADING_LIKE.search(text.normalized[:50]):  # Heading-like text
             importance_score += 0.3
-        if re.search(r'^\d+\.', text):  # Numbered list
+        if _NUMBERED_ITEM.search(text.normalized):  # Numbered list
             importance_score += 0.2
-        if re.search(r'^[•\-\*]', text):  # Bullet points
+        if _BULLET_ITEM.search(text.normalized):  # Bullet points
             importance_score += 0.2
         
-        # Combine scores
-        total_score = (keyword_score * 0.4 + 
-                      job_score * 0.3 + 
-                      length_score * 0.2 + 
-                      importance_score * 0.1)
-        
-        return total_score
+        return text_hits, length_score * 0.2 + importance_score * 0.1
     
-    def extract_sections(self, text_sections: List[Tuple[str, int, str]], 
+    def extract_sections(self, text_sections: List[Section], 
                         persona_type: str, job_description: str, 
-                        max_sections: int = 10) -> List[Dict]:
-        """Extract and rank relevant sections."""
+                        max_sections: int = 10,
+                        deadline: Optional[float] = None) -> List[Dict]:
+        """Extract and rank relevant sections.
+        
+        With a reranker configured, the top keyword candidates are reordered
+        by embedding similarity to the persona/job query, unless ``deadline``
+        has already passed.
+        """
+        weights = self._scoring_weights(persona_type, job_description)
+        scores = []
+        for section in text_sections:
+            text_hits, base_score = self._section_features(self._scoring_text(section))
+            scores.append(float(text_hits @ weights) + base_score)
+        return self._rank_sections(text_sections, scores, persona_type, job_description,
+                                   max_sections, deadline)
+    
+    def _rank_sections(self, text_sections: List[Section], scores, persona_type: str,
+                       job_description: str, max_sections: int = 10,
+                       deadline: Optional[float] = None) -> List[Dict]:
+        """Rank sections by precomputed relevance scores into the output format."""
         scored_sections = []
         
-        for text, page_num, doc_path in text_sections:
-            relevance_score = self.calculate_relevance_score(text, persona_type, job_description)
-            
+        for section, relevance_score in zip(text_sections, scores):
+            # Rounding keeps equal scores tied whichever way they were summed
+            relevance_score = round(float(relevance_score), 9)
             if relevance_score > 0.1:  # Minimum relevance threshold
                 scored_sections.append({
-                    'text': text,
-                    'page_number': page_num,
-                    'document': os.path.basename(doc_path),
-                    'relevance_score': relevance_score
+                    'title': section.title,
+                    'page_number': section.page_number,
+                    'document': os.path.basename(section.document),
+                    'relevance_score': relevance_score,
+                    'text': section.title + '\n' + section.text
                 })
         
         # Sort by relevance score and take top sections
         scored_sections.sort(key=lambda x: x['relevance_score'], reverse=True)
         
+        if self.reranker is not None:
+            profile = self.registry.profiles.get(persona_type)
+            query = f"{profile.label if profile else ''} {job_description}".strip()
+            scored_sections = self.reranker.rerank(query, scored_sections, deadline=deadline)
+        
         # Create final output format
         extracted_sections = []
         for i, section in enumerate(scored_sections[:max_sections], 1):
             extracted_sections.append({
                 'document': section['document'],
-                'section_title': self._extract_section_title(section['text']),
+                'section_title': section['title'],
                 'importance_rank': i,
                 'page_number': section['page_number']
             })
         
         return extracted_sections
     
+    def index_sections(self, path: str, fingerprint: str, text_sections: List[Section]):
+        """Add a document's sections to the search index unless already indexed."""
+        if self.search_index is None:
+            return
+        key = str(Path(path).resolve())
+        if not self.search_index.is_indexed(key, fingerprint):
+            self.search_index.add_document(key, fingerprint, [
+                IndexedSection(section.page_number, section.title, section.text)
+                for section in text_sections
+            ])
+    
+    def collapse_duplicate_sections(self, text_sections: List[Section]) -> List[Section]:
+        """Drop sections that nearly repeat an earlier one (e.g. in re-exported PDFs)."""
+        sketches = [sketch(self._scoring_text(section).lower) for section in text_sections]
+        representatives = collapse_near_duplicates(sketches)
+        kept = [section for index, section in enumerate(text_sections)
+                if representatives[index] == index]
+        if len(kept) < len(text_sections):
+            print(f"Collapsed {len(text_sections) - len(kept)} near-duplicate section(s)")
+        return kept
+    
+    def score_queries(self, text_sections: List[Section],
+                      queries: List[Tuple[str, str]]) -> np.ndarray:
+        """Relevance scores of every section for every (persona_type, job) query.
+        
+        Returns a sections x queries matrix computed as one product of the
+        sections' term hits with the queries' term weights, plus each
+        section's query-independent score.
+        """
+        if not text_sections:
+            return np.zeros((0, len(queries)), dtype=np.float64)
+        
+        features = [self._section_features(self._scoring_text(section)) for section in text_sections]
+        hits = np.vstack([text_hits for text_hits, _ in features])
+        base = np.array([base_score for _, base_score in features], dtype=np.float64)
+        weights = np.column_stack([
+            self._scoring_weights(persona_type, job) for persona_type, job in queries
+        ]) if queries else np.zeros((hits.shape[1], 0), dtype=np.float64)
+        
+        return hits @ weights + base[:, None]
+    
     def _extract_section_title(self, text: str) -> str:
         """Extract a meaningful title from section text."""
         lines = text.split('\n')
@@ -258,113 +450,315 @@ class PersonaDocumentAnalyzer:
         
         return "Section"
     
-    def analyze_subsections(self, text_sections: List[Tuple[str, int, str]], 
-                           extracted_sections: List[Dict]) -> List[Dict]:
-        """Analyze subsections for detailed content extraction."""
+    def analyze_subsections(self, text_sections: List[Section], 
+                           extracted_sections: List[Dict],
+                           persona_type: str = 'general', job_description: str = '',
+                           deadline: Optional[float] = None,
+                           max_sentences: int = SUMMARY_SENTENCES) -> List[Dict]:
+        """Summarize the top-ranked sections with their most relevant sentences.
+        
+        Sections are summarized in rank order until ``deadline`` (a
+        ``time.time()`` value) passes; the remaining sections fall back to
+        their leading sentences, so a slow collection still returns on time.
+        """
         subsection_analysis = []
         
-        # Get page numbers of extracted sections
-        relevant_pages = {section['page_number'] for section in extracted_sections}
+        sections_by_key = {}
+        for section in text_sections:
+            key = (os.path.basename(section.document), section.page_number, section.title)
+            sections_by_key.setdefault(key, section)
         
-        for text, page_num, doc_path in text_sections:
-            if page_num in relevant_pages:
-                # Refine text by removing common noise
-                refined_text = self._refine_text(text)
-                
-                if len(refined_text) > 50:  # Minimum meaningful length
-                    subsection_analysis.append({
-                        'document': os.path.basename(doc_path),
-                        'refined_text': refined_text,
-                        'page_number': page_num
-                    })
+        query_vector = self._query_vector(persona_type, job_description)
+        query_terms = self._content_words(job_description.lower())
+        
+        for extracted in extracted_sections:
+            section = sections_by_key.get(
+                (extracted['document'], extracted['page_number'], extracted['section_title'])
+            )
+            if section is None:
+                continue
+            
+            sentences = self._split_sentences(section.text)
+            if deadline is None or time.time() < deadline:
+                selected = self._rank_sentences(sentences, query_vector, query_terms, max_sentences)
+            else:
+                selected = sentences[:max_sentences]
+            
+            # Refine text by removing common noise
+            refined_text = self._refine_text(' '.join(selected))
+            
+            if len(refined_text) > 50:  # Minimum meaningful length
+                subsection_analysis.append({
+                    'document': extracted['document'],
+                    'refined_text': refined_text,
+                    'page_number': section.page_number
+                })
         
         return subsection_analysis[:20]  # Limit to 20 subsections
     
+    def _query_vector(self, persona_type: str, job_description: str) -> np.ndarray:
+        """Term weights of the persona/job query over the registry vocabulary."""
+        job_hits = self._job_hits(job_description)
+        row = self.registry.row(persona_type)
+        if row is None:
+            return job_hits
+        # Same weighting as calculate_relevance_score: persona keywords, plus
+        # the persona's job patterns that the job description mentions
+        return (0.4 * self.registry.keyword_matrix[row] +
+                0.3 * self.registry.job_pattern_matrix[row] * job_hits +
+                0.3 * job_hits)
+    
+    def _content_words(self, lower_text: str) -> set:
+        """Non-stopword words of at least three letters in already lowercased text."""
+        return {word for word in _CONTENT_WORD.findall(lower_text) if word not in self.stop_words}
+    
+    def _split_sentences(self, text: str) -> List[str]:
+        """Split section text into sentences; list items count as sentences."""
+        sentences = []
+        for paragraph in _PARAGRAPH_BREAK.split(text):
+            # Bullets and numbered items stay separate even without punctuation
+            for item in _LIST_ITEM.split(paragraph):
+                item = ' '.join(item.split())
+                if not item:
+                    continue
+                try:
+                    sentences.extend(sent_tokenize(item))
+                except LookupError:
+                    sentences.extend(_SENTENCE_BOUNDARY.split(item))
+        return [sentence for sentence in sentences if sentence.strip()]
+    
+    def _rank_sentences(self, sentences: List[str], query_vector: np.ndarray,
+                        query_terms: set, max_sentences: int) -> List[str]:
+        """The ``max_sentences`` best sentences for the query, in document order."""
+        if len(sentences) <= max_sentences:
+            return sentences
+        
+        scores = []
+        for index, sentence in enumerate(sentences):
+            lower = sentence.lower()
+            words = self._content_words(lower)
+            score = float(query_vector @ self.registry.term_hits(lower))
+            score += 0.2 * len(words & query_terms)
+            # Prefer informative sentences and, on ties, earlier ones
+            score += 0.1 * min(len(words) / 15, 1.0)
+            scores.append((score, -index))
+        
+        best = sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True)[:max_sentences]
+        return [sentences[i] for i in sorted(best)]
+    
     def _refine_text(self, text: str) -> str:
         """Refine text by removing noise and improving readability."""
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove common PDF artifacts
-        text = re.sub(r'[^\w\s\.\,\;\:\!\?\-\(\)]', '', text)
+        # Remove excessive whitespace, then common PDF artifacts
+        text = _NOISE_CHARS.sub('', ' '.join(text.split()))
         
-        # Remove page numbers and headers
-        text = re.sub(r'^\d+\s*$', '', text, flags=re.MULTILINE)
+        # With the line breaks gone, a page number can only be the whole text
+        if _PAGE_NUMBER.fullmatch(text):
+            return ''
         
-        # Clean up
-        text = text.strip()
-        
-        return text
+        return text.strip()
     
     def process_collection(self, input_json_path: str) -> Dict:
         """Process a document collection based on persona and job requirements."""
+        # Load input configuration
+        with open(input_json_path, 'r', encoding='utf-8') as f:
+            input_config = json.load(f)
+        
+        return self.process_collection_batch(input_json_path, [read_query(input_config)])[0]
+    
+    def process_collection_batch(self, input_json_path: str,
+                                 queries: List[Tuple[str, str]]) -> List[Dict]:
+        """Answer several (persona, job) queries over one document collection.
+        
+        The collection is parsed and segmented once, and every section is
+        scored for all queries in a single sections x queries matrix product.
+        All queries share the collection's time budget, however many there are.
+        Returns one output per query, in the ``process_collection`` format.
+        With a result cache, queries answered before over the same document
+        contents are returned from it with a fresh timestamp.
+        """
         start_time = time.time()
         
         # Load input configuration
         with open(input_json_path, 'r', encoding='utf-8') as f:
             input_config = json.load(f)
-        
-        # Extract configuration
         documents = input_config.get('documents', [])
-        persona = input_config.get('persona', {}).get('role', '')
-        job_to_be_done = input_config.get('job_to_be_done', {}).get('task', '')
-        
-        # Identify persona type
-        persona_type = self.identify_persona_type(persona, job_to_be_done)
         
-        # Extract text from all documents
-        all_text_sections = []
-        input_dir = Path(input_json_path).parent / "PDFs"
+        # Resolve and fingerprint all documents
+        collection = load_collection(documents, Path(input_json_path).parent / "PDFs")
+        
+        outputs: List[Optional[Dict]] = [None] * len(queries)
+        keys = []
+        if self.result_cache is not None:
+            keys = [self._result_key(documents, collection, persona, job) for persona, job in queries]
+            for index, ((persona, job), key) in enumerate(zip(queries, keys)):
+                cached = self.result_cache.get(key)
+                if cached is not None:
+                    outputs[index] = self._fresh_output(cached, persona, job)
+        
+        missing = [index for index, output in enumerate(outputs) if output is None]
+        if len(missing) < len(queries):
+            print(f"Answered {len(queries) - len(missing)} of {len(queries)} quer"
+                  f"{'y' if len(queries) == 1 else 'ies'} from the result cache")
+        if missing:
+            deadline = start_time + self.time_budget
+            analyzed = self._analyze_collection(documents, collection, [queries[index] for index in missing],
+                                                deadline)
+            # Outputs cut short by the time budget are not worth repeating
+            cacheable = self.result_cache is not None and time.time() < deadline
+            for index, output in zip(missing, analyzed):
+                outputs[index] = output
+                if cacheable:
+                    self.result_cache.put(keys[index], output)
         
-        for doc_info in documents:
-            doc_path = input_dir / doc_info['filename']
-            if doc_path.exists():
-                text_sections = self.extract_text_from_pdf(str(doc_path))
-                all_text_sections.extend(text_sections)
-        
-        # Extract relevant sections
-        extracted_sections = self.extract_sections(
-            all_text_sections, persona_type, job_to_be_done
-        )
+        processing_time = time.time() - start_time
+        if len(queries) == 1:
+            print(f"Processed collection in {processing_time:.2f} seconds")
+        else:
+            print(f"Processed collection for {len(queries)} queries in {processing_time:.2f} seconds")
         
-        # Analyze subsections
-        subsection_analysis = self.analyze_subsections(
-            all_text_sections, extracted_sections
+        return outputs
+    
+    def _result_key(self, documents: List[Dict], collection: LoadedCollection,
+                    persona: str, job: str) -> str:
+        """Result cache key: document contents, normalized query and everything else that shapes the output."""
+        digests = {document.filename: document.sha256 for document in collection.documents}
+        return result_key({
+            'version': ANALYZER_VERSION,
+            'segmentation': SEGMENTATION_TAG,
+            'registry': self._registry_digest,
+            'word_boundary': self.word_boundary,
+            'reranker': ([self.reranker.model_name, self.reranker.top_n, self.reranker.weight]
+                         if self.reranker is not None else None),
+            'backend': backend_policy(),
+            'mask_regions': region_masking(),
+            # Missing or unreadable documents have no digest and show up as warnings
+            'documents': [[doc.get('filename', ''), doc.get('title', ''), digests.get(doc.get('filename', ''))]
+                          for doc in documents],
+            'persona': normalize_line(persona).lower,
+            'job': normalize_line(job).lower,
+        })
+    
+    def _fresh_output(self, cached: Dict, persona: str, job_to_be_done: str) -> Dict:
+        """A cached output as if just produced for this (possibly differently spelled) query."""
+        metadata = dict(cached['metadata'], persona=persona, job_to_be_done=job_to_be_done,
+                        processing_timestamp=time.strftime('%Y-%m-%dT%H:%M:%S.%f'))
+        return dict(cached, metadata=metadata)
+    
+    def _analyze_collection(self, documents: List[Dict], collection: LoadedCollection,
+                            queries: List[Tuple[str, str]], deadline: float) -> List[Dict]:
+        """Outputs of ``queries`` over a loaded collection, parsing it once."""
+        # Extract text largest first; sections are kept in the input order
+        warnings = list(collection.warnings)
+        sections_by_position = {}
+        parsed_by_digest = {}
+        parsed = []
+        
+        for document in collection.parse_order:
+            # Identical files under another name add nothing but repeats
+            original = parsed_by_digest.setdefault(document.sha256, document)
+            if original is not document:
+                warnings.append(CollectionWarning(document.filename, 'duplicate',
+                                                  f'identical to {original.filename}'))
+                continue
+            parsed.append((document, load_document(document.path)))
+        
+        # Scanned pages of the whole collection are waited for once
+        finish_ocr()
+        for document, parsed_document in parsed:
+            text_sections = self.extract_text_from_pdf(document.path, parsed_document)
+            if not text_sections:
+                warnings.append(CollectionWarning(document.filename, 'no_text',
+                                                  'no text could be extracted'))
+            sections_by_position[document.position] = text_sections
+            self.index_sections(document.path, document.sha256, text_sections)
+        
+        all_text_sections = self.collapse_duplicate_sections([
+            section for position in sorted(sections_by_position)
+            for section in sections_by_position[position]
+        ])
+        for warning in warnings:
+            print(f"Warning: {warning.filename or 'document'}: {warning.kind} ({warning.message})")
+        
+        # Identify persona types and score all queries at once
+        persona_types = [self.identify_persona_type(persona, job) for persona, job in queries]
+        scores = self.score_queries(
+            all_text_sections, [(persona_type, job) for persona_type, (_, job) in zip(persona_types, queries)]
         )
         
-        # Create output
-        output = {
-            'metadata': {
-                'input_documents': [doc['filename'] for doc in documents],
+        outputs = []
+        for column, ((persona, job_to_be_done), persona_type) in enumerate(zip(queries, persona_types)):
+            # Extract relevant sections
+            extracted_sections = self._rank_sections(
+                all_text_sections, scores[:, column], persona_type, job_to_be_done, deadline=deadline
+            )
+            
+            # Analyze subsections
+            subsection_analysis = self.analyze_subsections(
+                all_text_sections, extracted_sections, persona_type, job_to_be_done, deadline
+            )
+            
+            # Create output
+            metadata = {
+                'input_documents': [doc.get('filename', '') for doc in documents],
                 'persona': persona,
                 'job_to_be_done': job_to_be_done,
                 'processing_timestamp': time.strftime('%Y-%m-%dT%H:%M:%S.%f')
-            },
-            'extracted_sections': extracted_sections,
-            'subsection_analysis': subsection_analysis
-        }
-        
-        processing_time = time.time() - start_time
-        print(f"Processed collection in {processing_time:.2f} seconds")
+            }
+            if warnings:
+                metadata['warnings'] = [warning.to_dict() for warning in warnings]
+            outputs.append({
+                'metadata': metadata,
+                'extracted_sections': extracted_sections,
+                'subsection_analysis': subsection_analysis
+            })
         
-        return output
+        return outputs
 
-def process_collections():
-    """Main processing function for document collections."""
+def read_query(entry: Dict) -> Tuple[str, str]:
+    """(persona role, job task) of an input configuration or query entry."""
+    return (entry.get('persona', {}).get('role', ''),
+            entry.get('job_to_be_done', {}).get('task', ''))
+
+def process_collections(rerank: bool = False, embedding_cache: Optional[str] = None,
+                        rerank_top_n: int = 20, store_dir: Optional[str] = None,
+                        profile_every: int = 0, profile_threshold: Optional[float] = None,
+                        backend: Optional[str] = None, backend_log: Optional[str] = None,
+                        mask_regions: bool = False, index_dir: Optional[str] = None,
+                        compact_json: bool = False, result_cache: bool = True,
+                        result_cache_dir: Optional[str] = None):
+    """Main processing function for document collections.
+    
+    Outputs are written by a background thread with atomic renames (see
+    ``common/output_writer.py``); ``compact_json`` drops their indentation.
+    Repeated collection/persona/job queries are answered from a result
+    cache (see ``result_cache.py``), kept on disk in ``result_cache_dir``
+    (default: $RESULT_CACHE_DIR) or else in memory for this run only.
+    """
     print("Starting persona-driven document analysis...")
     
+    if store_dir:
+        set_document_store(store_dir)
+    if backend:
+        set_backend_policy(backend)
+    if mask_regions:
+        set_region_masking(True)
+    # Scanned pages are recognised while the rest of their collection parses
+    set_ocr_deferred(True)
+    
     # Initialize analyzer
-    analyzer = PersonaDocumentAnalyzer()
+    reranker = EmbeddingReranker(cache_dir=embedding_cache, top_n=rerank_top_n) if rerank else None
+    search_index = open_search_index(index_dir)
+    cache = ResultCache(result_cache_dir) if result_cache else None
+    analyzer = PersonaDocumentAnalyzer(reranker=reranker, search_index=search_index, result_cache=cache)
     
     # Get input and output directories - handle both Docker and local environments
-    input_dir = Path("/app/input") if Path("/app/input").exists() else Path("./input")
-    output_dir = Path("/app/output") if Path("/app/output").exists() else Path("./output")
+    input_dir, output_dir = resolve_io_dirs()
     
     # Create output directory if it doesn't exist
     output_dir.mkdir(parents=True, exist_ok=True)
     
     # Find all input JSON files
-    input_files = list(input_dir.glob("*.json"))
+    input_files = discover_files(input_dir, "*.json")
     
     if not input_files:
         print("No input JSON files found")
@@ -372,25 +766,91 @@ def process_collections():
     
     print(f"Found {len(input_files)} input files to process")
     
+    profiler = None
+    if profile_every or profile_threshold is not None:
+        profiler = DocumentProfiler(output_dir, every=profile_every, threshold=profile_threshold)
+    
+    writer = OutputWriter(compact=compact_json)
+    
     # Process each input file
     for input_file in input_files:
         try:
             print(f"Processing {input_file.name}...")
             
-            # Process collection
-            result = analyzer.process_collection(str(input_file))
-            
-            # Create output JSON file
-            output_file = output_dir / f"{input_file.stem}_output.json"
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(result, f, indent=2, ensure_ascii=False)
-            
-            print(f"✓ Processed {input_file.name} -> {output_file.name}")
+            with profiled(profiler, input_file.stem):
+                with open(input_file, 'r', encoding='utf-8') as f:
+                    input_config = json.load(f)
+                
+                # A "queries" list asks several persona/job variations of one collection
+                if input_config.get('queries'):
+                    queries = [read_query(entry) for entry in input_config['queries']]
+                    results = analyzer.process_collection_batch(str(input_file), queries)
+                    output_names = [f"{input_file.stem}_output_{i}.json" for i in range(1, len(results) + 1)]
+                else:
+                    results = [analyzer.process_collection(str(input_file))]
+                    output_names = [f"{input_file.stem}_output.json"]
+                
+                # Create output JSON files
+                for result, output_name in zip(results, output_names):
+                    output_file = output_dir / output_name
+                    writer.submit(output_file, result)
+                
+                print(f"✓ Processed {input_file.name} -> {output_file.name}")
             
         except Exception as e:
             print(f"✗ Error processing {input_file.name}: {e}")
     
+    writer.close()
+    if cache is not None and cache.hits:
+        print(f"Result cache: {cache.hits} hit(s), {cache.misses} miss(es)")
+    if profiler is not None:
+        profiler.print_summary()
+    if backend_log:
+        write_backend_log(backend_log)
+    if search_index is not None:
+        search_index.close()
+    
     print("Collection processing completed!")
 
 if __name__ == "__main__":
-    process_collections() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Persona-driven analysis of document collections")
+    parser.add_argument("--rerank", action="store_true",
+                        help="rerank the top candidates with the local spaCy model (en_core_web_sm)")
+    parser.add_argument("--embedding-cache", metavar="DIR",
+                        help="embedding cache directory (default: $EMBEDDING_CACHE_DIR or "
+                             "~/.cache/persona_embeddings)")
+    parser.add_argument("--rerank-top-n", type=int, default=20,
+                        help="number of top candidates to rerank (default: 20)")
+    parser.add_argument("--store", metavar="DIR",
+                        help="keep parsed documents and sections in DIR and reuse them on "
+                             "later runs (default: $DOCUMENT_STORE_DIR)")
+    parser.add_argument("--profile-every", type=int, default=0, metavar="N",
+                        help="profile every Nth collection, writing <name>.collapsed next to the outputs")
+    parser.add_argument("--profile-threshold", type=float, metavar="SECONDS",
+                        help="profile collections that take at least SECONDS")
+    parser.add_argument("--backend", choices=["auto", "pdfplumber", "pypdf2"],
+                        help="extraction backend (default: $PDF_BACKEND or auto, chosen per PDF)")
+    parser.add_argument("--backend-log", metavar="PATH",
+                        help="write backend decisions and timings as JSON lines to PATH")
+    parser.add_argument("--mask-regions", action="store_true",
+                        help="leave the text of tables and figures out of sections "
+                             "(default: $PDF_MASK_REGIONS)")
+    parser.add_argument("--index", metavar="DIR",
+                        help="add every document's sections to the keyword search index in DIR "
+                             "(default: $SEARCH_INDEX_DIR)")
+    parser.add_argument("--compact-json", action="store_true",
+                        help="write outputs without indentation")
+    parser.add_argument("--result-cache", metavar="DIR",
+                        help="keep results of collection/persona/job queries in DIR and answer "
+                             "repeats from it (default: $RESULT_CACHE_DIR, else memory only)")
+    parser.add_argument("--no-result-cache", action="store_true",
+                        help="always run the full analysis")
+    args = parser.parse_args()
+    
+    process_collections(rerank=args.rerank, embedding_cache=args.embedding_cache,
+                        rerank_top_n=args.rerank_top_n, store_dir=args.store,
+                        profile_every=args.profile_every, profile_threshold=args.profile_threshold,
+                        backend=args.backend, backend_log=args.backend_log,
+                        mask_regions=args.mask_regions, index_dir=args.index,
+                        compact_json=args.compact_json, result_cache=not args.no_result_cache,
+                        result_cache_dir=args.result_cache)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Result cache for Challenge 1b
+Repeated (collection, persona, job) requests reuse an earlier analysis
+instead of running the pipeline again. Results are stored under a key over
+the content hashes of the collection's documents, the normalized query and
+the analyzer version, so changing any listed PDF changes the key and a
+stale result is never served. A bounded in-memory LRU answers repeats
+within a process; an optional on-disk tier (one JSON file per key) shares
+results across runs. Entries of both tiers expire after a TTL.
+"""
+
+import os
+import json
+import time
+import hashlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Any
+
+# On-disk tier location unless one is passed explicitly; without either, results stay in memory
+CACHE_DIR_ENV = "RESULT_CACHE_DIR"
+
+# Seconds a result is served for; 0 keeps results until their key changes
+RESULT_TTL_ENV = "RESULT_CACHE_TTL"
+DEFAULT_TTL = 24 * 3600.0
+
+# Results kept in memory, least recently used dropped first
+DEFAULT_MEMORY_ENTRIES = 128
+
+
+def result_key(parts: Dict[str, Any]) -> str:
+    """Stable key over JSON-serializable ``parts`` (order of dict keys does not matter)."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """In-memory LRU of analysis results with an optional on-disk tier.
+
+    ``get`` returns the stored result itself; callers copy what they change.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, ttl: Optional[float] = None,
+                 max_entries: int = DEFAULT_MEMORY_ENTRIES):
+        cache_dir = cache_dir or os.environ.get(CACHE_DIR_ENV)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.ttl = ttl if ttl is not None else float(os.environ.get(RESULT_TTL_ENV, DEFAULT_TTL))
+        self.max_entries = max(max_entries, 1)
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (stored_at, result)
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl > 0 and time.time() - stored_at > self.ttl
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry = self._memory.get(key)
+        if entry is not None and self._expired(entry[0]):
+            del self._memory[key]
+            entry = None
+        if entry is None and self.cache_dir is not None:
+            entry = self._load(key)
+            if entry is not None:
+                self._remember(key, entry)
+
+        if entry is None:
+            self.misses += 1
+            return None
+        self._memory.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, result: Dict):
+        entry = (time.time(), result)
+        self._remember(key, entry)
+        if self.cache_dir is not None:
+            self._store(key, entry)
+
+    def _remember(self, key: str, entry: tuple):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[tuple]:
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            entry = (float(stored['stored_at']), stored['result'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if self._expired(entry[0]):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            return None
+        return entry
+
+    def _store(self, key: str, entry: tuple):
+        path = self._path(key)
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            # Serialized first, so a result that is not JSON never reaches the disk
+            payload = json.dumps({'stored_at': entry[0], 'result': entry[1]}, ensure_ascii=False)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Could not cache result {path.name}: {e}")
+            try:
+                temp_path.unlink()
+            except OSError:
+                pass
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Test script for Challenge 1b solution components
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+from pathlib import Path
+import numpy as np
+import PyPDF2
+from keyword_matcher import KeywordAutomaton
+from persona_registry import PersonaRegistry, PersonaProfile
+from process_collections import PersonaDocumentAnalyzer, Section
+from embedding_reranker import EmbeddingCache, EmbeddingReranker
+from collection_loader import load_collection
+from result_cache import ResultCache
+from common.dedup import sketch, similarity
+from common.search_index import SearchIndex, IndexedSection
+from common.synthetic_corpus import generate_document
+
+def test_keyword_automaton():
+    """Test single-pass multi-keyword matching against plain substring checks."""
+    vocabularies = {
+        'travel_planner': ['travel', 'trip', 'hotel', 'day'],
+        'hr_professional': ['form', 'hr', 'human resources'],
+    }
+    automaton = KeywordAutomaton()
+    automaton.add_all(vocabularies)
+    automaton.build()
+    
+    text = "book a hotel for the trip; fill the form through human resources today"
+    counts = automaton.count_by_label(text)
+    
+    print("Testing keyword automaton...")
+    for label, keywords in vocabularies.items():
+        expected = sum(1 for keyword in keywords if keyword in text)
+        status = "✓" if counts.get(label, 0) == expected else "✗"
+        print(f"{status} {label}: {counts.get(label, 0)} (expected: {expected})")
+        assert counts.get(label, 0) == expected
+    
+    # Word boundaries drop "hr" inside "through" and "day" inside "today"
+    bounded = KeywordAutomaton(word_boundary=True)
+    bounded.add_all(vocabularies)
+    bounded.build()
+    assert bounded.label_hits(text)['hr_professional'] == {'form', 'human resources'}
+    assert bounded.label_hits(text)['travel_planner'] == {'hotel', 'trip'}
+
+def test_persona_registry():
+    """Test persona identification and scoring from the bundled registry."""
+    registry = PersonaRegistry.load()
+    
+    test_cases = [
+        ("Travel Planner", "Plan a trip", "travel_planner"),
+        ("HR Professional", "Create forms", "hr_professional"),
+        ("Food Contractor", "Prepare buffet", "food_contractor"),
+        ("Manager", "Plan vacation", "travel_planner"),
+        ("Unknown", "Unknown task", "general"),
+    ]
+    
+    print("\nTesting persona registry...")
+    for persona, job, expected in test_cases:
+        result = registry.identify(persona, job)
+        status = "✓" if result == expected else "✗"
+        print(f"{status} '{persona}' + '{job}' -> {result} (expected: {expected})")
+        assert result == expected
+    
+    hits = registry.term_hits("hotel booking for the group trip")
+    assert registry.hit_counts(hits)['travel_planner'] == 4
+    
+    # Adding personas does not change how existing ones are identified
+    extra = [PersonaProfile(f"persona_{i}", f"Persona {i}", [f"role{i}"], [], [f"term{i}"], [])
+             for i in range(40)]
+    larger = PersonaRegistry(list(registry) + extra)
+    assert larger.identify("Travel Planner", "Plan a trip") == "travel_planner"
+    assert larger.identify("Role7 lead", "anything") == "persona_7"
+    
+    # Profiles built in code may use any case
+    mixed = PersonaRegistry([PersonaProfile("auditor", "Auditor", ["Auditor"], ["Audit"], ["Ledger", "Fiscal Year"], [])])
+    assert mixed.identify("Senior AUDITOR", "") == "auditor"
+    assert mixed.hit_counts(mixed.term_hits("the ledger for the fiscal year"))["auditor"] == 2
+
+def test_subsection_summaries():
+    """Test sentence-level summaries and the time budget fallback."""
+    analyzer = PersonaDocumentAnalyzer()
+    text = ("The region has a long and varied history of trade along the coast. "
+            "Local markets open early on weekdays and close at noon. "
+            "Book a hotel near the old harbour for easy access to restaurants. "
+            "The climate is mild for most of the year with warm summers.\n\n"
+            "• Plan one day for the coastal trip by train with your group of friends")
+    sections = [Section(text, 2, "/tmp/guide.pdf", "Where to Stay", 2)]
+    extracted = [{'document': 'guide.pdf', 'section_title': 'Where to Stay',
+                  'importance_rank': 1, 'page_number': 2}]
+    
+    print("\nTesting subsection summaries...")
+    summary = analyzer.analyze_subsections(sections, extracted, 'travel_planner',
+                                           'Plan a trip for a group of friends', max_sentences=2)
+    refined = summary[0]['refined_text']
+    print(f"✓ Summary: {refined}")
+    assert refined.startswith("Book a hotel") and "group of friends" in refined
+    
+    # Past the deadline sections keep their leading sentences instead
+    late = analyzer.analyze_subsections(sections, extracted, 'travel_planner',
+                                        'Plan a trip for a group of friends',
+                                        deadline=0, max_sentences=2)
+    assert late[0]['refined_text'].startswith("The region has")
+
+def test_batch_queries():
+    """Test that batch scoring matches scoring each query on its own."""
+    analyzer = PersonaDocumentAnalyzer()
+    sections = [
+        Section("Book a hotel and plan each day of the trip with friends.", 1, "/tmp/a.pdf", "Planning", 1),
+        Section("Fill and sign the onboarding form, then submit it for approval.", 2, "/tmp/a.pdf", "Forms", 2),
+        Section("A vegetarian buffet menu with gluten-free recipes for dinner.", 3, "/tmp/b.pdf", "Menu", 3),
+    ]
+    queries = [("travel_planner", "Plan a trip for friends"),
+               ("hr_professional", "Create fillable forms for onboarding"),
+               ("food_contractor", "Prepare a vegetarian buffet")]
+    
+    print("\nTesting batch queries...")
+    scores = analyzer.score_queries(sections, queries)
+    assert scores.shape == (len(sections), len(queries))
+    for column, (persona_type, job) in enumerate(queries):
+        single = [analyzer.calculate_relevance_score(s.title + '\n' + s.text, persona_type, job)
+                  for s in sections]
+        assert np.allclose(scores[:, column], single)
+        best = sections[int(np.argmax(scores[:, column]))].title
+        print(f"✓ {persona_type}: best section '{best}'")
+        assert best == sections[column].title
+
+def test_collection_loader():
+    """Test concurrent document resolution and structured warnings."""
+    print("\nTesting collection loader...")
+    with tempfile.TemporaryDirectory() as pdf_dir:
+        pdf_dir = Path(pdf_dir)
+        (pdf_dir / "small.pdf").write_bytes(b"%PDF-1.4\n" + b"x" * 10)
+        (pdf_dir / "Large.pdf").write_bytes(b"%PDF-1.7\n" + b"x" * 1000)
+        (pdf_dir / "empty.pdf").write_bytes(b"")
+        (pdf_dir / "notes.pdf").write_bytes(b"plain text")
+        (pdf_dir / "annex").mkdir()
+        (pdf_dir / "annex" / "extra.pdf").write_bytes(b"%PDF-1.4\n" + b"x" * 100)
+        
+        documents = [{"filename": name, "title": name} for name in
+                     ["small.pdf", "large.pdf", "empty.pdf", "notes.pdf", "gone.pdf", "annex/extra.pdf"]]
+        collection = load_collection(documents, pdf_dir)
+        
+        assert [d.filename for d in collection.documents] == ["small.pdf", "large.pdf", "annex/extra.pdf"]
+        assert [d.filename for d in collection.parse_order] == ["large.pdf", "annex/extra.pdf", "small.pdf"]
+        assert collection.documents[1].path.endswith("Large.pdf")
+        assert len(collection.documents[0].sha256) == 64
+        kinds = {w.filename: w.kind for w in collection.warnings}
+        print(f"✓ Warnings: {kinds}")
+        assert kinds == {"empty.pdf": "empty", "notes.pdf": "not_pdf", "gone.pdf": "missing"}
+
+def test_near_duplicate_sections():
+    """Test that re-exported copies of a section collapse onto the first one."""
+    print("\nTesting near-duplicate sections...")
+    text = ("Nice is known for its pebble beaches, the Promenade des Anglais and a "
+            "lively old town with markets selling flowers, olives and fresh fish every morning.")
+    sections = [
+        Section(text, 1, "/tmp/guide.pdf", "Nice", 1),
+        Section("Tax forms must be signed by the employee before the end of the month.", 2,
+                "/tmp/guide.pdf", "Forms", 2),
+        Section(text.replace("every morning", "each morning"), 4, "/tmp/guide_v2.pdf", "Nice", 4),
+    ]
+    print(f"  similarity of copies: {similarity(sketch(sections[0].text), sketch(sections[2].text)):.2f}")
+    
+    kept = PersonaDocumentAnalyzer().collapse_duplicate_sections(sections)
+    print(f"✓ Kept {[s.document for s in kept]}")
+    assert kept == sections[:2]
+
+def test_embedding_rerank_cache():
+    """Test the on-disk embedding cache and reranking from cached embeddings."""
+    print("\nTesting embedding cache...")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        texts = ["plan a coastal trip", "hotels near the harbour", "tax forms for employees"]
+        vectors = np.array([[1, 0, 0], [0.8, 0.6, 0], [0, 0, 1]], dtype=np.float32)
+        
+        cache = EmbeddingCache(cache_dir, "test-model")
+        cache.put_many([cache.key(text) for text in texts], vectors)
+        cache.put_many([cache.key(texts[0])], vectors[:1])  # Already cached, not appended
+        
+        reopened = EmbeddingCache(cache_dir, "test-model")
+        assert len(reopened) == 3
+        assert np.allclose(reopened.get(reopened.key(texts[1])), vectors[1], atol=1e-3)
+        assert EmbeddingCache(cache_dir, "other-model").get(reopened.key(texts[1])) is None
+        print("✓ Embeddings survive a reopen and are keyed by model and content")
+        
+        # An orphan row from an interrupted write does not shift later rows
+        with open(reopened.matrix_path, "ab") as f:
+            f.write(np.full(3, 9, dtype=np.float16).tobytes())
+        orphaned = EmbeddingCache(cache_dir, "test-model")
+        orphaned.put_many([orphaned.key("extra")], vectors[2:])
+        assert np.allclose(EmbeddingCache(cache_dir, "test-model").get(orphaned.key("extra")), vectors[2])
+        
+        # Alternating models (and widths) keep each other's rows
+        with tempfile.TemporaryDirectory() as switch_dir:
+            EmbeddingCache(switch_dir, "model-a").put_many(["x", "y"], vectors[:2])
+            EmbeddingCache(switch_dir, "model-b").put_many(["x"], vectors[2:])
+            EmbeddingCache(switch_dir, "model-a").put_many(["z"], vectors[2:])
+            EmbeddingCache(switch_dir, "model-b").put_many(["w"], vectors[:1, :2])
+            model_a = EmbeddingCache(switch_dir, "model-a")
+            assert len(model_a) == 3 and np.allclose(model_a.get("x"), vectors[0])
+            model_b = EmbeddingCache(switch_dir, "model-b")
+            assert model_b.dim == 2 and np.allclose(model_b.get("w"), vectors[0, :2])
+            model_b.put_many(["v"], vectors[1:2])
+            assert np.allclose(model_b.get("x"), vectors[2]) and len(model_b) == 2
+            assert len(os.listdir(switch_dir)) == 6
+        print("✓ Orphan rows are never returned; every model and width keeps its own cache")
+        
+        # Every text is cached, so reranking needs no model at all
+        reranker = EmbeddingReranker(model_name="test-model", cache_dir=cache_dir, weight=0.8)
+        candidates = [{'text': texts[2], 'relevance_score': 1.0},
+                      {'text': texts[1], 'relevance_score': 0.9}]
+        reranked = reranker.rerank(texts[0], candidates)
+        assert [c['text'] for c in reranked] == [texts[1], texts[2]]
+        print("✓ Cached embeddings rerank candidates")
+        
+        # Past the deadline the keyword order is kept
+        assert reranker.rerank(texts[0], candidates, deadline=0) == candidates
+
+def test_search_index():
+    """Test BM25 search across flushed and merged segments, with re-indexed documents."""
+    print("\nTesting search index...")
+    with tempfile.TemporaryDirectory() as index_dir:
+        index = SearchIndex(index_dir, flush_sections=4, merge_factor=2, background_merge=False)
+        for number in range(6):
+            index.add_document(f"/docs/guide{number}.pdf", "v1", [
+                IndexedSection(1, "Beaches", f"Guide {number}: beaches, coves and sailing along the coast."),
+                IndexedSection(2, "Markets", f"Guide {number}: markets sell olives, cheese and flowers."),
+            ])
+        index.add_document("/docs/food.pdf", "v1", [
+            IndexedSection(3, "Cheese Tasting", "Cheese tasting: goat cheese, cheese boards and local cheese."),
+        ])
+        index.flush()
+        
+        hits = index.search("cheese tasting", limit=3)
+        print(f"  {index.stats()['segments']} segment(s); top hit {hits[0].title} ({hits[0].score:.2f})")
+        assert (hits[0].document, hits[0].page, hits[0].title) == ("/docs/food.pdf", 3, "Cheese Tasting")
+        
+        # A changed document replaces its old sections
+        assert index.is_indexed("/docs/food.pdf", "v1")
+        index.add_document("/docs/food.pdf", "v2", [IndexedSection(5, "Wine", "Wine regions and vineyards.")])
+        index.flush()
+        assert not any(hit.document == "/docs/food.pdf" for hit in index.search("cheese tasting"))
+        assert index.stats()['sections'] == 13  # The replaced section no longer counts
+        
+        index.merge()
+        reopened = SearchIndex(index_dir)
+        stats = reopened.stats()
+        assert (stats['segments'], stats['sections'], stats['documents']) == (1, 13, 7)
+        assert [hit.page for hit in reopened.search("vineyards")] == [5]
+        print(f"✓ {stats['sections']} live sections in one segment after merging")
+        reopened.close()
+        index.close()
+
+def test_bookmark_sections():
+    """Test that bookmarks split sections only where their titles are found."""
+    print("\nTesting bookmark sections...")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        truth, _ = generate_document(tmp / "plain.pdf", 4, seed="bookmarks", multi_column_share=0, table_rate=0)
+        writer = PyPDF2.PdfWriter()
+        writer.append(str(tmp / "plain.pdf"))
+        chapters = [heading for heading in truth["outline"] if heading["level"] == "H1"]
+        for heading in chapters:
+            writer.add_outline_item(heading["text"], heading["page"])
+        writer.add_outline_item("Appendix Z", 3)  # Not on that page
+        with open(tmp / "marked.pdf", "wb") as f:
+            writer.write(f)
+        
+        sections = PersonaDocumentAnalyzer().extract_text_from_pdf(str(tmp / "marked.pdf"))
+        titles = [section.title for section in sections]
+        print(f"✓ Sections: {titles}")
+        assert titles[1:] == [heading["text"] for heading in chapters]
+
+def test_result_cache():
+    """Test that repeated queries are served from the cache until a PDF changes."""
+    print("\nTesting result cache...")
+    memory = ResultCache(max_entries=2, ttl=0.05)
+    for key in ("a", "b", "c"):
+        memory.put(key, {"key": key})
+    assert memory.get("a") is None and memory.get("c") == {"key": "c"}
+    time.sleep(0.1)
+    assert memory.get("c") is None
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        ResultCache(cache_dir).put("bad", {"value": object()})
+        assert os.listdir(cache_dir) == []  # Nothing half-written is left behind
+    
+    source = Path(__file__).parent / "Collection 1" / "PDFs" / "South of France - Traditions and Culture.pdf"
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / "PDFs").mkdir()
+        pdf_path = tmp / "PDFs" / "culture.pdf"
+        pdf_path.write_bytes(source.read_bytes())
+        input_path = tmp / "input.json"
+        input_path.write_text(json.dumps({"documents": [{"filename": "culture.pdf", "title": "Culture"}]}))
+        query = ("Travel Planner", "Plan a trip of 4 days for a group of 10 college friends.")
+        
+        analyzer = PersonaDocumentAnalyzer(result_cache=ResultCache(tmp / "cache"))
+        first = analyzer.process_collection_batch(str(input_path), [query])[0]
+        respelled = ("travel  planner", query[1].upper())
+        second = analyzer.process_collection_batch(str(input_path), [respelled])[0]
+        assert analyzer.result_cache.hits == 1
+        assert second["extracted_sections"] == first["extracted_sections"]
+        assert second["subsection_analysis"] == first["subsection_analysis"]
+        assert second["metadata"]["persona"] == "travel  planner"
+        
+        # A new process finds the result on disk
+        restarted = PersonaDocumentAnalyzer(result_cache=ResultCache(tmp / "cache"))
+        restarted.process_collection_batch(str(input_path), [query])
+        assert restarted.result_cache.hits == 1
+        
+        # A byte-identical copy adds nothing but is reported
+        (tmp / "PDFs" / "copy.pdf").write_bytes(pdf_path.read_bytes())
+        input_path.write_text(json.dumps({"documents": [{"filename": "culture.pdf", "title": "Culture"},
+                                                        {"filename": "copy.pdf", "title": "Copy"}]}))
+        with_copy = restarted.process_collection_batch(str(input_path), [query])[0]
+        assert with_copy["metadata"]["warnings"] == [
+            {"filename": "copy.pdf", "kind": "duplicate", "message": "identical to culture.pdf"}]
+        assert with_copy["extracted_sections"] == first["extracted_sections"]
+        
+        # Any change to a listed PDF invalidates it
+        with open(pdf_path, "ab") as f:
+            f.write(b"\n% edited\n")
+        restarted.process_collection_batch(str(input_path), [query])
+        print(f"✓ {restarted.result_cache.hits} hit(s), {restarted.result_cache.misses} miss(es) after an edit")
+        assert restarted.result_cache.misses == 2
+
+def test_docker_image_files():
+    """Test that the entrypoint imports from only the files the Dockerfile copies."""
+    print("\nTesting Docker image layout...")
+    root = Path(__file__).resolve().parent.parent
+    dockerfile = (Path(__file__).parent / "Dockerfile").read_text().replace("\\\n", " ")
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Path(tmp) / "app"
+        for line in dockerfile.splitlines():
+            parts = line.split()
+            if not parts or parts[0] != "COPY":
+                continue
+            *sources, destination = parts[1:]
+            target = app / destination
+            for source in sources:
+                if (root / source).is_dir():
+                    shutil.copytree(root / source, target, dirs_exist_ok=True)
+                else:
+                    target.mkdir(parents=True, exist_ok=True)
+                    shutil.copy(root / source, target)
+        
+        env = {key: value for key, value in os.environ.items() if key != "PYTHONPATH"}
+        result = subprocess.run([sys.executable, "-c", "import process_collections"], cwd=app,
+                                env=env, capture_output=True, text=True)
+        print(f"{'✓' if result.returncode == 0 else '✗'} process_collections imports in the image layout")
+        assert result.returncode == 0, result.stderr.strip().splitlines()[-1]
+
+if __name__ == "__main__":
+    print("=== Challenge 1b Solution Test ===\n")
+    
+    test_keyword_automaton()
+    test_persona_registry()
+    test_subsection_summaries()
+    test_batch_queries()
+    test_collection_loader()
+    test_near_duplicate_sections()
+    test_embedding_rerank_cache()
+    test_search_index()
+    test_bookmark_sections()
+    test_result_cache()
+    test_docker_image_files()
+    
+    print("\n=== Test completed ===")
@@ -0,0 +1,3 @@
+"""
+Shared document-processing core for Challenge 1a and Challenge 1b.
+"""
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Per-document extraction backend selection
+Samples the raw content streams of the first pages to estimate layout
+complexity (font sizes, bold fonts, text columns, glyph-level positioning)
+and picks the cheapest backend that still gives the extractors what they
+use: PyPDF2 text for plain single-column documents, pdfplumber layout for
+everything else.
+"""
+
+import re
+import time
+from collections import Counter
+from typing import List, Dict, Optional, NamedTuple
+import PyPDF2
+
+BACKENDS = ('pdfplumber', 'pypdf2')
+AUTO = 'auto'
+
+# Pages sampled per document
+SAMPLE_PAGES = 2
+
+# A font size or text column must carry this share of the sampled text to count
+SIGNIFICANT_SHARE = 0.05
+
+# Text-showing operators averaging fewer bytes than this position single
+# glyphs or words, which PyPDF2 tends to glue together or split apart
+MIN_BYTES_PER_SHOW = 4.0
+
+# Line starts closer than this fraction of the page width are one text column
+COLUMN_GAP_RATIO = 0.25
+
+# Tokens needed to follow the text position and font size of shown text
+_NUM = rb'[-+]?(?:\d+\.?\d*|\.\d+)'
+_LAYOUT_TOKEN = re.compile(
+    rb'(?P<tf>' + _NUM + rb')\s+Tf\b'
+    rb'|(?P<tm>(?:' + _NUM + rb'\s+){6})Tm\b'
+    rb'|(?P<td>' + _NUM + rb'\s+' + _NUM + rb')\s+T[dD]\b'
+    rb'|(?P<show>\((?:\\.|[^\\)])*\)|<[0-9A-Fa-f\s]*>)\s*(?:Tj|\'|")'
+    rb'|(?P<array>\[(?:\\.|[^\\\]])*\])\s*TJ'
+)
+
+
+class LayoutFeatures(NamedTuple):
+    pages: int                 # Pages sampled
+    text_bytes: int            # Bytes of shown text
+    font_sizes: int            # Distinct significant font sizes
+    bold: bool                 # Any bold/black/heavy font on the sampled pages
+    columns: int               # Estimated text columns
+    bytes_per_show: float      # Average bytes per text-showing operator
+
+
+class BackendDecision(NamedTuple):
+    path: str
+    backend: str
+    reason: str
+    features: Optional[LayoutFeatures]
+    sample_seconds: float
+    parse_seconds: float = 0.0  # Filled in once the document has been parsed
+
+    def to_dict(self) -> Dict:
+        record = self._asdict()
+        record['features'] = self.features._asdict() if self.features else None
+        return record
+
+
+def sample_layout_features(pdf_path: str, sample_pages: int = SAMPLE_PAGES) -> LayoutFeatures:
+    """Layout features of the first ``sample_pages`` pages from their content streams."""
+    sizes = Counter()
+    starts = Counter()
+    text_bytes = 0
+    shows = 0
+    bold = False
+    sampled = 0
+
+    with open(pdf_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        for page in pdf_reader.pages[:sample_pages]:
+            sampled += 1
+            width = float(page.mediabox.width) or 612.0
+            bold = bold or _has_bold_font(page)
+            data = page_content_bytes(page)
+
+            font_size, scale_x, scale_y = 0.0, 1.0, 1.0
+            x = y = 0.0
+            last_position = None
+            for match in _LAYOUT_TOKEN.finditer(data):
+                if match.group('tf'):
+                    font_size = float(match.group('tf'))
+                elif match.group('tm'):
+                    a, _, _, d, x, y = (float(v) for v in match.group('tm').split())
+                    scale_x, scale_y = abs(a) or 1.0, abs(d) or 1.0
+                elif match.group('td'):
+                    tx, ty = (float(v) for v in match.group('td').split())
+                    x += tx * scale_x
+                    y += ty * scale_y
+                else:
+                    shown = len(match.group(0))
+                    text_bytes += shown
+                    shows += 1
+                    sizes[round(abs(font_size * scale_y), 1)] += shown
+                    if (x, y) != last_position:
+                        # A new line or run starts here; bucket its left edge
+                        starts[round(x / width, 2)] += shown
+                        last_position = (x, y)
+
+    return LayoutFeatures(
+        pages=sampled,
+        text_bytes=text_bytes,
+        font_sizes=sum(1 for count in sizes.values() if count >= SIGNIFICANT_SHARE * text_bytes),
+        bold=bold,
+        columns=_estimate_columns(starts, text_bytes),
+        bytes_per_show=text_bytes / shows if shows else 0.0,
+    )
+
+
+def page_content_bytes(page) -> bytes:
+    """Decoded content stream of a page, joining pages split over several streams."""
+    contents = page.get_contents()
+    if contents is None:
+        return b''
+    if isinstance(contents, PyPDF2.generic.ArrayObject):
+        return b'\n'.join(part.get_object().get_data() for part in contents)
+    return contents.get_data()
+
+
+def _has_bold_font(page) -> bool:
+    try:
+        fonts = page['/Resources']['/Font']
+        names = [str(fonts[key].get_object().get('/BaseFont', '')) for key in fonts]
+    except Exception:
+        return False
+    return any(weight in name.lower() for name in names for weight in ('bold', 'black', 'heavy'))
+
+
+def _estimate_columns(starts: Counter, text_bytes: int) -> int:
+    """Number of left edges, far enough apart, that each start a share of the text."""
+    edges: List[float] = []
+    for position, count in sorted(starts.items(), key=lambda item: -item[1]):
+        if count < SIGNIFICANT_SHARE * 3 * text_bytes:
+            break
+        if all(abs(position - edge) >= COLUMN_GAP_RATIO for edge in edges):
+            edges.append(position)
+    return max(len(edges), 1)
+
+
+def choose_backend(pdf_path: str, forced: Optional[str] = None,
+                   sample_pages: int = SAMPLE_PAGES) -> BackendDecision:
+    """Pick the extraction backend for one document.
+
+    ``forced`` ('pdfplumber' or 'pypdf2') skips sampling. Otherwise PyPDF2
+    is chosen only for single-column text in one font size without bold
+    fonts, where pdfplumber's positions and fonts would not change what the
+    extractors find.
+    """
+    if forced in BACKENDS:
+        return BackendDecision(str(pdf_path), forced, 'forced', None, 0.0)
+
+    start = time.perf_counter()
+    try:
+        features = sample_layout_features(pdf_path, sample_pages)
+    except Exception as e:
+        return BackendDecision(str(pdf_path), 'pdfplumber', f'sampling failed: {e}', None,
+                               time.perf_counter() - start)
+    elapsed = time.perf_counter() - start
+
+    if not features.text_bytes:
+        reason, backend = 'no text in sampled pages', 'pdfplumber'
+    elif features.columns > 1:
+        reason, backend = f'{features.columns} text columns', 'pdfplumber'
+    elif features.bytes_per_show < MIN_BYTES_PER_SHOW:
+        reason, backend = 'glyph-positioned text', 'pdfplumber'
+    elif features.font_sizes > 1 or features.bold:
+        reason, backend = 'font sizes or weights mark headings', 'pdfplumber'
+    else:
+        reason, backend = 'plain single-column text', 'pypdf2'
+
+    return BackendDecision(str(pdf_path), backend, reason, features, elapsed)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Duplicate and near-duplicate detection shared by both challenges
+Exact duplicates are found by content hash so they are parsed only once.
+Near-duplicates are found with one-permutation MinHash sketches of word
+shingles and an LSH band index, cheap enough in pure Python to sketch every
+section of a collection.
+"""
+
+import re
+import zlib
+import hashlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional, Iterable
+
+# Buckets per sketch; similarity estimates are accurate to about 1/sqrt(NUM_BUCKETS)
+NUM_BUCKETS = 64
+
+# Words per shingle
+SHINGLE_SIZE = 3
+
+# Estimated Jaccard similarity above which two texts count as near-duplicates
+NEAR_DUPLICATE_THRESHOLD = 0.8
+
+# LSH: bands of rows; pairs above ~(1/BANDS)^(1/ROWS) similarity become candidates
+LSH_BANDS = 16
+LSH_ROWS = NUM_BUCKETS // LSH_BANDS
+
+# Marks a sketch bucket no shingle hashed into
+EMPTY = 0xFFFFFFFF
+
+_WORD = re.compile(r'\w+')
+
+Sketch = Tuple[int, ...]
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def exact_duplicates(paths: Iterable[Path], max_workers: int = 8) -> Dict[Path, Path]:
+    """Map every file whose content repeats an earlier file to that first file."""
+    paths = list(paths)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        digests = list(pool.map(_safe_digest, paths))
+
+    first_by_digest: Dict[str, Path] = {}
+    duplicates = {}
+    for path, digest in zip(paths, digests):
+        if digest is None:
+            continue
+        original = first_by_digest.setdefault(digest, path)
+        if original != path:
+            duplicates[path] = original
+    return duplicates
+
+
+def _safe_digest(path: Path) -> Optional[str]:
+    try:
+        return file_digest(str(path))
+    except OSError:
+        return None
+
+
+def sketch(text: str, shingle_size: int = SHINGLE_SIZE) -> Sketch:
+    """One-permutation MinHash sketch of the word shingles of ``text``.
+
+    Every shingle is hashed once; the low bits choose a bucket and the
+    remaining bits compete for that bucket's minimum.
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) < shingle_size:
+        words = words + [''] * (shingle_size - len(words)) if words else []
+    minima = [EMPTY] * NUM_BUCKETS
+    for i in range(len(words) - shingle_size + 1):
+        value = zlib.crc32(' '.join(words[i:i + shingle_size]).encode('utf-8'))
+        bucket = value % NUM_BUCKETS
+        rest = value // NUM_BUCKETS
+        if rest < minima[bucket]:
+            minima[bucket] = rest
+    return tuple(minima)
+
+
+def similarity(a: Sketch, b: Sketch) -> float:
+    """Estimated Jaccard similarity of the texts behind two sketches."""
+    matches = 0
+    used = 0
+    for x, y in zip(a, b):
+        if x == EMPTY and y == EMPTY:
+            continue
+        used += 1
+        if x == y:
+            matches += 1
+    return matches / used if used else 0.0
+
+
+def collapse_near_duplicates(sketches: List[Sketch],
+                             threshold: float = NEAR_DUPLICATE_THRESHOLD) -> List[int]:
+    """Index of the item each item duplicates (itself for first occurrences).
+
+    Items are taken in order, so the earliest of a group of near-duplicates
+    is kept; candidates come from the LSH band index rather than all pairs.
+    """
+    bands: Dict[Tuple[int, Tuple[int, ...]], List[int]] = defaultdict(list)
+    representative = []
+
+    for index, item in enumerate(sketches):
+        keys = [(band, item[band * LSH_ROWS:(band + 1) * LSH_ROWS]) for band in range(LSH_BANDS)]
+        keys = [key for key in keys if any(value != EMPTY for value in key[1])]
+
+        candidates = sorted({kept for key in keys for kept in bands.get(key, ())})
+        match = next((kept for kept in candidates
+                      if similarity(item, sketches[kept]) >= threshold), None)
+        if match is None:
+            representative.append(index)
+            for key in keys:
+                bands[key].append(index)
+        else:
+            representative.append(match)
+
+    return representative
@@ -0,0 +1,644 @@
+#!/usr/bin/env python3
+"""
+Shared PDF parsing core for Challenge 1a and Challenge 1b
+Parses a PDF once into a page model (lines with bbox, font stats and paragraph
+breaks) that both the outline extractor and the persona analyzer consume.
+"""
+
+import os
+import re
+import json
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from dataclasses import dataclass, field
+from functools import cached_property
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional, Iterator, Iterable, Any
+import PyPDF2
+import pdfplumber
+
+from common.backend_selector import AUTO, BACKENDS, BackendDecision, choose_backend, page_content_bytes
+from common.region_mask import Region, find_regions, mask_words
+from common.ocr import is_scanned_page, ocr_available, ocr_timeout, submit_page
+from common.text_normalization import NormalizedText, normalize_line
+
+# Words whose tops are within this many points belong to the same line
+LINE_Y_TOLERANCE = 5
+
+# A vertical gap larger than this fraction of the font size starts a new paragraph
+PARAGRAPH_GAP_RATIO = 0.8
+
+# Number of parsed documents kept by load_document()
+DOCUMENT_CACHE_SIZE = 32
+
+# Directory where load_document() keeps parses across runs (see document_store)
+DOCUMENT_STORE_ENV = "DOCUMENT_STORE_DIR"
+
+# Backend policy for full parses: 'auto' (per-document choice), 'pdfplumber' or 'pypdf2'
+PDF_BACKEND_ENV = "PDF_BACKEND"
+
+# Set to 1 to mask table and figure regions out of line building (see region_mask)
+MASK_REGIONS_ENV = "PDF_MASK_REGIONS"
+
+# Glyphs repeated within this many points of an identical glyph are fake-bold overprint
+OVERPRINT_TOLERANCE = 1.0
+
+# Key under ParsedDocument.cache holding {page number: [masked regions]}
+REGION_MASKS_KEY = 'region_masks'
+
+
+@dataclass
+class TextLine:
+    """A single line of text with its layout and font statistics."""
+    text: str
+    page: int
+    bbox: Optional[Tuple[float, float, float, float]] = None  # (x0, top, x1, bottom)
+    font_size: float = 0.0
+    font_name: str = ''
+    paragraph_start: bool = False
+
+    @property
+    def top(self) -> float:
+        return self.bbox[1] if self.bbox else 0.0
+
+    @property
+    def is_bold(self) -> bool:
+        return 'bold' in self.font_name.lower()
+
+    @cached_property
+    def normalized(self) -> NormalizedText:
+        """Normalized, lowercased and tokenized text, computed once per line."""
+        return normalize_line(self.text)
+
+
+@dataclass
+class PageModel:
+    """All lines of one page in reading order."""
+    number: int
+    width: float = 0.0
+    height: float = 0.0
+    lines: List[TextLine] = field(default_factory=list)
+    font_histogram: Counter = field(default_factory=Counter)  # font size -> char count
+    backend: str = 'pdfplumber'
+    masked_regions: List[Region] = field(default_factory=list)  # Tables/figures left out of lines
+    needs_ocr: bool = False  # Scanned page whose text has not been recognised
+
+    @property
+    def body_font_size(self) -> float:
+        """Font size carrying the most characters on the page (0 if unknown)."""
+        return self.font_histogram.most_common(1)[0][0] if self.font_histogram else 0.0
+
+    @property
+    def text(self) -> str:
+        """Page text with a blank line before every paragraph."""
+        parts = []
+        for line in self.lines:
+            if line.paragraph_start and parts:
+                parts.append('')
+            parts.append(line.text)
+        return '\n'.join(parts)
+
+
+@dataclass
+class ParsedDocument:
+    """A parsed PDF shared by every stage that needs its content."""
+    path: str
+    pages: List[PageModel] = field(default_factory=list)
+    backend: str = 'pdfplumber'
+    # Derived artifacts (segmentations, masks, ...) cached with the document
+    cache: Dict[str, Any] = field(default_factory=dict)
+    # File in the document store this parse was saved to or loaded from
+    store_path: Optional[str] = None
+    # Scanned pages still being recognised: page index -> OCR future (see finish_ocr)
+    pending_ocr: Dict[int, Any] = field(default_factory=dict, repr=False)
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+    def iter_lines(self) -> Iterator[TextLine]:
+        for page in self.pages:
+            yield from page.lines
+
+    @property
+    def font_histogram(self) -> Counter:
+        histogram = Counter()
+        for page in self.pages:
+            histogram.update(page.font_histogram)
+        return histogram
+
+    @property
+    def body_font_size(self) -> float:
+        histogram = self.font_histogram
+        return histogram.most_common(1)[0][0] if histogram else 0.0
+
+
+def iter_pages(pdf_path: str, pages: Optional[Iterable[int]] = None,
+               backend: str = 'pdfplumber', mask_regions: bool = False) -> Iterator[PageModel]:
+    """Lazily parse a PDF page by page.
+
+    ``pages`` optionally restricts parsing to the given 1-based page numbers.
+    pdfplumber is used first; if it fails, the remaining pages come from the
+    PyPDF2 fallback so callers always get whatever text can be recovered.
+    With ``backend='pypdf2'`` only PyPDF2 text is extracted, falling back to
+    pdfplumber if that yields nothing. ``mask_regions`` drops the words of
+    table and figure regions from pdfplumber pages. Pages without words but
+    covered by images come back empty with ``needs_ocr`` set.
+    """
+    selected = sorted(set(pages)) if pages is not None else None
+    last_page = 0
+
+    if backend == 'pypdf2':
+        # Pages are held back until one has text, so a pass that finds none
+        # can be replaced by pdfplumber without yielding a page twice
+        held: Optional[List[PageModel]] = []
+        for model in _iter_pages_pypdf2(pdf_path, selected):
+            if held is None:
+                yield model
+            elif model.lines:
+                yield from held
+                yield model
+                held = None
+            else:
+                held.append(model)
+        if held is None:
+            return
+
+    try:
+        with pdfplumber.open(pdf_path, pages=selected) as pdf:
+            for page in pdf.pages:
+                model = _page_model_from_pdfplumber(page, mask_regions)
+                model.needs_ocr = not model.lines and is_scanned_page(page)
+                last_page = model.number
+                yield model
+        return
+    except GeneratorExit:
+        raise
+    except Exception as e:
+        print(f"Error extracting text from {pdf_path}: {e}")
+
+    # Fallback to PyPDF2 for whatever pdfplumber did not deliver
+    remaining = None if selected is None else [p for p in selected if p > last_page]
+    for model in _iter_pages_pypdf2(pdf_path, remaining):
+        if model.number > last_page:
+            yield model
+
+
+def parse_pdf(pdf_path: str, pages: Optional[Iterable[int]] = None,
+              backend: Optional[str] = None, mask_regions: Optional[bool] = None,
+              defer_ocr: bool = False) -> ParsedDocument:
+    """Parse a PDF (or a subset of its pages) into a ParsedDocument.
+
+    ``backend`` defaults to the configured policy. Under 'auto', full parses
+    pick their backend per document (see ``backend_selector``); the decision
+    and its timings are kept in ``document.cache['backend_decision']``.
+    ``mask_regions`` defaults to the configured setting; masking needs
+    pdfplumber layout, so it overrides an automatic choice of PyPDF2. The
+    masked regions are kept in ``document.cache[REGION_MASKS_KEY]``.
+    Scanned pages are sent to the OCR pool as soon as they are found and
+    merged back in page order once the text pages are done. With
+    ``defer_ocr`` the document is returned without waiting for them; they
+    stay in ``document.pending_ocr`` until merged by ``finish_ocr``.
+    """
+    policy = backend or backend_policy()
+    masking = region_masking() if mask_regions is None else mask_regions
+    decision = None
+    if pages is None:
+        if masking and policy == AUTO:
+            decision = BackendDecision(str(pdf_path), 'pdfplumber', 'region masking', None, 0.0)
+        else:
+            decision = choose_backend(str(pdf_path), forced=None if policy == AUTO else policy)
+        chosen = decision.backend
+    else:
+        chosen = policy if policy in BACKENDS else 'pdfplumber'
+
+    start = time.perf_counter()
+    document = ParsedDocument(path=str(pdf_path))
+    ocr_futures = {}
+    for page in iter_pages(str(pdf_path), pages, backend=chosen, mask_regions=masking):
+        if page.backend != 'pdfplumber':
+            document.backend = page.backend
+        if page.needs_ocr and ocr_available():
+            ocr_futures[len(document.pages)] = submit_page(str(pdf_path), page.number)
+        document.pages.append(page)
+    if defer_ocr:
+        document.pending_ocr = ocr_futures
+    else:
+        _merge_ocr_pages(document, ocr_futures, time.monotonic() + ocr_timeout())
+        _report_scanned_pages(document)
+    if masking:
+        document.cache[REGION_MASKS_KEY] = {page.number: page.masked_regions
+                                            for page in document.pages if page.masked_regions}
+
+    if decision is not None:
+        decision = decision._replace(parse_seconds=time.perf_counter() - start)
+        document.cache['backend_decision'] = decision
+        _backend_decisions.append(decision)
+        if decision.reason not in ('forced', 'region masking'):
+            print(f"Backend {decision.backend} for {document.name}: {decision.reason} "
+                  f"(sampled in {decision.sample_seconds * 1000:.0f} ms, "
+                  f"parsed in {decision.parse_seconds * 1000:.0f} ms)")
+    return document
+
+
+def _merge_ocr_pages(document: ParsedDocument, futures: Dict[int, Any], deadline: float) -> bool:
+    """Put recognised pages in place, waiting until ``deadline`` (monotonic) at most.
+
+    Returns whether any page was replaced.
+    """
+    merged = False
+    for index, future in futures.items():
+        try:
+            page = future.result(timeout=max(deadline - time.monotonic(), 0.0))
+        except FuturesTimeoutError:
+            future.cancel()
+            print(f"OCR of {document.name} page {document.pages[index].number} timed out")
+            continue
+        except Exception as e:
+            print(f"OCR of {document.name} page {document.pages[index].number} failed: {e}")
+            continue
+        document.pages[index] = page
+        document.backend = page.backend
+        merged = True
+    return merged
+
+
+def _report_scanned_pages(document: ParsedDocument):
+    scanned = [page.number for page in document.pages if page.needs_ocr]
+    if scanned:
+        hint = "" if ocr_available() else " (install pytesseract and tesseract-ocr to recognise them)"
+        print(f"{document.name}: no text for scanned page(s) {scanned}{hint}")
+
+
+_backend_policy: Optional[str] = None
+_backend_decisions: List[BackendDecision] = []
+_region_masking: Optional[bool] = None
+
+
+def set_backend_policy(policy: Optional[str]):
+    """Use ``policy`` ('auto', 'pdfplumber' or 'pypdf2') for full parses."""
+    global _backend_policy
+    if policy is not None and policy != AUTO and policy not in BACKENDS:
+        raise ValueError(f"unknown PDF backend: {policy}")
+    _backend_policy = policy
+
+
+def backend_policy() -> str:
+    return _backend_policy or os.environ.get(PDF_BACKEND_ENV) or AUTO
+
+
+def set_region_masking(enabled: Optional[bool]):
+    """Mask table and figure regions in full parses (None falls back to $PDF_MASK_REGIONS)."""
+    global _region_masking
+    _region_masking = enabled
+
+
+def region_masking() -> bool:
+    if _region_masking is not None:
+        return _region_masking
+    return os.environ.get(MASK_REGIONS_ENV, '') not in ('', '0')
+
+
+def backend_decisions() -> List[BackendDecision]:
+    """Backend decisions made by this process so far."""
+    return list(_backend_decisions)
+
+
+def record_backend_decisions(decisions: Iterable[BackendDecision]):
+    """Add decisions made elsewhere (e.g. in a worker process) to this process's log."""
+    _backend_decisions.extend(decisions)
+
+
+def write_backend_log(path: str):
+    """Write every backend decision of this process as JSON lines, for tuning."""
+    with open(path, 'w', encoding='utf-8') as f:
+        for decision in _backend_decisions:
+            f.write(json.dumps(decision.to_dict()) + '\n')
+
+
+_document_cache: "OrderedDict[Tuple[str, int, int, bool, str], ParsedDocument]" = OrderedDict()
+_document_store_dir: Optional[str] = None
+_ocr_deferred = False
+# Parses returned by load_document() whose OCR pages are still pending, with their cache keys
+_awaiting_ocr: List[Tuple[Tuple[str, int, int, bool, str], ParsedDocument]] = []
+
+
+def set_document_store(store_dir: Optional[str]):
+    """Keep parses in ``store_dir`` across runs (None falls back to $DOCUMENT_STORE_DIR)."""
+    global _document_store_dir
+    _document_store_dir = str(store_dir) if store_dir else None
+
+
+def document_store_dir() -> Optional[str]:
+    return _document_store_dir or os.environ.get(DOCUMENT_STORE_ENV) or None
+
+
+def set_ocr_deferred(enabled: bool):
+    """Let load_document() return parses before their scanned pages are recognised.
+
+    The pages are merged by ``finish_ocr``, which the caller must run once
+    its batch has been parsed.
+    """
+    global _ocr_deferred
+    _ocr_deferred = enabled
+
+
+def load_document(pdf_path: str) -> ParsedDocument:
+    """Parse a full PDF, reusing an earlier parse of the same unchanged file.
+
+    Results are kept in a small process-wide LRU keyed by path, size, mtime,
+    masking and backend policy, so a PDF parsed for its outline can feed
+    persona ranking without a second parse. With a document store configured,
+    parses also survive the process and are read back from their
+    memory-mapped files.
+    """
+    resolved = Path(pdf_path).resolve()
+    stat = resolved.stat()
+    masking = region_masking()
+    policy = backend_policy()
+    key = (str(resolved), stat.st_size, stat.st_mtime_ns, masking, policy)
+
+    document = _document_cache.get(key)
+    if document is not None:
+        _document_cache.move_to_end(key)
+        return document
+
+    store_dir = document_store_dir()
+    document = None
+    if store_dir:
+        from common.document_store import load_stored_document, store_document
+        document = load_stored_document(str(pdf_path), store_dir, stat, masked=masking, backend=policy)
+    if document is None:
+        document = parse_pdf(str(pdf_path), defer_ocr=_ocr_deferred)
+        if document.pending_ocr:
+            _awaiting_ocr.append((key, document))
+        # Pages still waiting for OCR should be retried on a later run
+        elif store_dir and not any(page.needs_ocr for page in document.pages):
+            store_document(document, store_dir, stat, masked=masking, backend=policy)
+
+    _document_cache[key] = document
+    while len(_document_cache) > DOCUMENT_CACHE_SIZE:
+        _document_cache.popitem(last=False)
+    return document
+
+
+def clear_document_cache():
+    """Drop all cached parses."""
+    _document_cache.clear()
+
+
+def finish_ocr() -> List[ParsedDocument]:
+    """Merge the OCR pages of every parse load_document() returned early.
+
+    All pending pages share one OCR timeout, so a batch waits for its
+    scanned pages once instead of once per document. Segmentations and
+    other artifacts derived from the text pages alone are dropped, and
+    completed parses are saved to the document store. Returns the
+    documents that received recognised pages.
+    """
+    if not _awaiting_ocr:
+        return []
+    deadline = time.monotonic() + ocr_timeout()
+    store_dir = document_store_dir()
+    finished = []
+    while _awaiting_ocr:
+        key, document = _awaiting_ocr.pop(0)
+        futures, document.pending_ocr = document.pending_ocr, {}
+        if _merge_ocr_pages(document, futures, deadline):
+            document.cache = {name: value for name, value in document.cache.items()
+                              if name in ('backend_decision', REGION_MASKS_KEY)}
+            finished.append(document)
+        _report_scanned_pages(document)
+        if store_dir and not any(page.needs_ocr for page in document.pages):
+            from common.document_store import store_document
+            stat = os.stat(key[0])
+            # A file changed since it was parsed is parsed again next time
+            if (stat.st_size, stat.st_mtime_ns) == key[1:3]:
+                store_document(document, store_dir, stat, masked=key[3], backend=key[4])
+    return finished
+
+
+def _without_overprinted_chars(page):
+    """``page`` without glyphs drawn again over an identical earlier glyph.
+
+    Fake-bold text repeats every character at (nearly) the same spot, which
+    would otherwise read as "RRRRFFFFPPPP". Matches pdfplumber's
+    ``dedupe_chars`` at its default tolerance, at a fraction of its cost.
+    """
+    tolerance = OVERPRINT_TOLERANCE
+    kept = {}
+    duplicates = set()
+    for char in page.chars:
+        if char['text'].isspace():
+            continue
+        x0, top = char['x0'], char['top']
+        cell = (round(x0 / tolerance), round(top / tolerance))
+        identity = (char['text'], char.get('fontname'), round(float(char.get('size', 0)), 1))
+        overprinted = False
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for other in kept.get((identity, cell[0] + dx, cell[1] + dy), ()):
+                    if abs(other['x0'] - x0) <= tolerance and abs(other['top'] - top) <= tolerance:
+                        overprinted = True
+        if overprinted:
+            duplicates.add(id(char))
+        else:
+            kept.setdefault((identity,) + cell, []).append(char)
+    if not duplicates:
+        return page
+    return page.filter(lambda obj: id(obj) not in duplicates)
+
+
+def _page_model_from_pdfplumber(page, mask_regions: bool = False) -> PageModel:
+    """Build the page model from pdfplumber words."""
+    page = _without_overprinted_chars(page)
+    words = page.extract_words(extra_attrs=['size', 'fontname'])
+    model = PageModel(number=page.page_number, width=float(page.width), height=float(page.height))
+
+    word_lines = cluster_words_by_top(words)
+    if mask_regions:
+        model.masked_regions = find_regions(page, word_lines)
+        sizes = Counter()
+        for word in words:
+            sizes[round(float(word.get('size', 0)), 1)] += len(word['text'])
+        body_size = sizes.most_common(1)[0][0] if sizes else 0.0
+        word_lines = [mask_words(line_words, model.masked_regions, body_size) for line_words in word_lines]
+
+    previous = None
+    for line_words in word_lines:
+        text = ' '.join(w['text'] for w in line_words).strip()
+        if not text:
+            continue
+
+        sizes = Counter()
+        fonts = Counter()
+        for word in line_words:
+            size = round(float(word.get('size', 0)), 1)
+            sizes[size] += len(word['text'])
+            fonts[word.get('fontname', '')] += len(word['text'])
+        model.font_histogram.update(sizes)
+
+        line = TextLine(
+            text=text,
+            page=model.number,
+            bbox=(min(w['x0'] for w in line_words), min(w['top'] for w in line_words),
+                  max(w['x1'] for w in line_words), max(w['bottom'] for w in line_words)),
+            font_size=max(sizes),
+            font_name=fonts.most_common(1)[0][0],
+        )
+        line.paragraph_start = previous is None or _starts_paragraph(previous, line)
+        model.lines.append(line)
+        previous = line
+
+    return model
+
+
+def _starts_paragraph(previous: TextLine, line: TextLine) -> bool:
+    """Whether ``line`` opens a new paragraph after ``previous``."""
+    if abs(line.font_size - previous.font_size) >= 1.0 or line.is_bold != previous.is_bold:
+        return True
+    gap = line.bbox[1] - previous.bbox[3]
+    return gap > PARAGRAPH_GAP_RATIO * max(line.font_size, previous.font_size, 1.0)
+
+
+def cluster_words_by_top(words: List[Dict], y_tolerance: float = LINE_Y_TOLERANCE) -> List[List[Dict]]:
+    """Cluster words into lines in reading order (top to bottom, left to right)."""
+    lines = []
+    current_line = []
+    current_y = None
+
+    for word in sorted(words, key=lambda w: (w['top'], w['x0'])):
+        if current_y is not None and abs(word['top'] - current_y) > y_tolerance:
+            lines.append(sorted(current_line, key=lambda w: w['x0']))
+            current_line = []
+            current_y = None
+        if current_y is None:
+            current_y = word['top']
+        current_line.append(word)
+
+    if current_line:
+        lines.append(sorted(current_line, key=lambda w: w['x0']))
+
+    return lines
+
+
+def _iter_pages_pypdf2(pdf_path: str, pages: Optional[List[int]] = None) -> Iterator[PageModel]:
+    """Fallback page model from PyPDF2 text (no positions or fonts)."""
+    try:
+        with open(pdf_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            page_numbers = pages if pages is not None else range(1, len(pdf_reader.pages) + 1)
+
+            for page_num in page_numbers:
+                page = pdf_reader.pages[page_num - 1]
+                model = PageModel(number=page_num, backend='pypdf2')
+                paragraph_start = True
+                for raw_line in (page.extract_text() or '').split('\n'):
+                    if not raw_line.strip():
+                        paragraph_start = True
+                        continue
+                    model.lines.append(TextLine(text=raw_line.strip(), page=page_num,
+                                                paragraph_start=paragraph_start))
+                    paragraph_start = False
+                yield model
+    except Exception as e:
+        print(f"Error with PyPDF2 extraction: {e}")
+
+
+def read_bookmarks(pdf_path: str) -> List[Tuple[str, int, int]]:
+    """Embedded bookmarks as (title, 1-based page, depth) in document order."""
+    bookmarks = []
+
+    def walk(items, depth):
+        for item in items:
+            if isinstance(item, list):
+                walk(item, depth + 1)
+                continue
+            try:
+                page_num = pdf_reader.get_destination_page_number(item) + 1
+            except Exception:
+                continue
+            title = str(item.title).strip()
+            if title:
+                bookmarks.append((title, page_num, depth))
+
+    try:
+        with open(pdf_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            walk(pdf_reader.outline, 0)
+    except Exception as e:
+        print(f"Error reading bookmarks from {pdf_path}: {e}")
+
+    return bookmarks
+
+
+# Tokens of a page content stream needed to track the effective font size of
+# shown text: "<size> Tf", the vertical scale of "a b c d e f Tm", and the
+# string operands of Tj/TJ/'/" text-showing operators.
+_NUM = rb'[-+]?(?:\d+\.?\d*|\.\d+)'
+_CONTENT_STREAM_TOKEN = re.compile(
+    rb'(?P<tf>' + _NUM + rb')\s+Tf\b'
+    rb'|(?:' + _NUM + rb'\s+){3}(?P<tm>' + _NUM + rb')\s+(?:' + _NUM + rb'\s+){2}Tm\b'
+    rb'|(?:\((?:\\.|[^\\)])*\)|<[0-9A-Fa-f\s]*>)\s*(?:Tj|\'|")'
+    rb'|\[(?:\\.|[^\\\]])*\]\s*TJ'
+    rb'|(?P<bt>(?<![\w/])BT\b)'
+)
+
+
+def scan_page_font_sizes(pdf_path: str) -> Dict[int, Counter]:
+    """Build a per-page histogram of shown-text bytes by effective font size.
+
+    This reads the raw content streams with PyPDF2 and only tracks the
+    ``Tf``/``Tm`` operators around text-showing operators, which is far
+    cheaper than having pdfplumber interpret every char on the page.
+    Pages whose text lives in form XObjects come back with an empty
+    histogram.
+    """
+    histograms = {}
+
+    try:
+        with open(pdf_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            for page_num, page in enumerate(pdf_reader.pages, 1):
+                try:
+                    data = page_content_bytes(page)
+                except Exception:
+                    data = b''
+                histograms[page_num] = font_histogram_from_stream(data)
+    except Exception as e:
+        print(f"Error scanning fonts in {pdf_path}: {e}")
+
+    return histograms
+
+
+def font_histogram_from_stream(data: bytes) -> Counter:
+    """Histogram of text-showing bytes by font size for one content stream."""
+    histogram = Counter()
+    font_size = 0.0
+    scale = 1.0
+
+    for match in _CONTENT_STREAM_TOKEN.finditer(data):
+        if match.group('tf'):
+            font_size = float(match.group('tf'))
+        elif match.group('bt'):
+            # Every text object starts from the identity text matrix; the font persists
+            scale = 1.0
+        elif match.group('tm'):
+            scale = abs(float(match.group('tm'))) or 1.0
+        else:
+            histogram[round(abs(font_size * scale), 1)] += len(match.group(0))
+
+    return histogram
+
+
+def resolve_io_dirs() -> Tuple[Path, Path]:
+    """Input and output directories for both Docker (/app) and local runs."""
+    input_dir = Path("/app/input") if Path("/app/input").exists() else Path("./input")
+    output_dir = Path("/app/output") if Path("/app/output").exists() else Path("./output")
+    return input_dir, output_dir
+
+
+def discover_files(input_dir: Path, pattern: str) -> List[Path]:
+    """Files in ``input_dir`` matching ``pattern`` in a stable order."""
+    return sorted(Path(input_dir).glob(pattern))
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Compact on-disk format for parsed documents
+Stores a ParsedDocument as fixed-width columns (pages, lines with bboxes and
+fonts, font histograms, sections, masked table and figure regions) followed
+by one UTF-8 text blob. Reading
+memory-maps the file and exposes every column as a memoryview, so nothing is
+copied until lines are turned back into TextLine objects.
+
+Layout (native byte order, recorded in the header):
+
+    header    struct HEADER_FORMAT
+    pages     number u32, width f32, height f32, first_line u32, first_bin u32, backend u32
+    lines     page_index u32, x0/top/x1/bottom f32 (NaN without bbox),
+              font_size f32, font_id u32, flags u32, text_offset u32, text_length u32
+    bins      font_size f32, chars u32              (font histogram entries)
+    sections  page u32, end_page u32, title_offset u32, title_length u32,
+              text_offset u32, text_length u32
+    fonts     offset u32, length u32                (font names)
+    regions   page_index u32, x0/top/x1/bottom f32  (masked regions)
+    blob      UTF-8 section tag, then text of lines, section titles and
+              texts, and font names
+"""
+
+import os
+import sys
+import math
+import mmap
+import struct
+import hashlib
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional
+
+from common.document_parser import ParsedDocument, PageModel, TextLine, REGION_MASKS_KEY
+
+MAGIC = b'PDOC'
+FORMAT_VERSION = 2
+FILE_SUFFIX = '.pdoc'
+
+# magic, version, little-endian flag, source size, source mtime_ns,
+# pages, lines, bins, sections, fonts, regions, section tag length, blob length
+HEADER_FORMAT = '<4sHHqqIIIIIIII'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+PAGE_COLUMNS = (('number', 'I'), ('width', 'f'), ('height', 'f'),
+                ('first_line', 'I'), ('first_bin', 'I'), ('backend', 'I'))
+LINE_COLUMNS = (('page_index', 'I'), ('x0', 'f'), ('top', 'f'), ('x1', 'f'), ('bottom', 'f'),
+                ('font_size', 'f'), ('font_id', 'I'), ('flags', 'I'),
+                ('text_offset', 'I'), ('text_length', 'I'))
+BIN_COLUMNS = (('size', 'f'), ('chars', 'I'))
+SECTION_COLUMNS = (('page', 'I'), ('end_page', 'I'), ('title_offset', 'I'), ('title_length', 'I'),
+                   ('text_offset', 'I'), ('text_length', 'I'))
+FONT_COLUMNS = (('offset', 'I'), ('length', 'I'))
+REGION_COLUMNS = (('page_index', 'I'), ('x0', 'f'), ('top', 'f'), ('x1', 'f'), ('bottom', 'f'))
+
+BACKENDS = ('pdfplumber', 'pypdf2', 'ocr')
+FLAG_PARAGRAPH_START = 1
+
+# Key under ParsedDocument.cache holding (tag, [(title, text, page, end_page)]).
+# The tag names the segmentation that produced the records, so a reader can
+# tell whether stored sections are still valid for its own segmentation.
+SECTION_RECORDS_KEY = 'section_records'
+
+
+class _Writer:
+    """Accumulates columns and the text blob of one document."""
+
+    def __init__(self):
+        self.columns: Dict[str, array] = {}
+        self.blob = bytearray()
+
+    def column(self, group: str, name: str, typecode: str) -> array:
+        return self.columns.setdefault(f'{group}.{name}', array(typecode))
+
+    def text(self, value: str) -> Tuple[int, int]:
+        data = value.encode('utf-8')
+        offset = len(self.blob)
+        self.blob += data
+        return offset, len(data)
+
+
+def save_document(document: ParsedDocument, path: str,
+                  source_stat: Optional[os.stat_result] = None) -> str:
+    """Write ``document`` to ``path`` atomically and return the path.
+
+    ``source_stat`` (the PDF's stat) is recorded so stale files can be
+    detected; section records in ``document.cache`` are stored as well.
+    """
+    writer = _Writer()
+    section_tag, records = document.cache.get(SECTION_RECORDS_KEY, ('', []))
+    writer.text(section_tag)
+    font_ids: Dict[str, int] = {}
+    line_count = 0
+    bin_count = 0
+    region_count = 0
+
+    for page in document.pages:
+        writer.column('pages', 'number', 'I').append(page.number)
+        writer.column('pages', 'width', 'f').append(page.width)
+        writer.column('pages', 'height', 'f').append(page.height)
+        writer.column('pages', 'first_line', 'I').append(line_count)
+        writer.column('pages', 'first_bin', 'I').append(bin_count)
+        writer.column('pages', 'backend', 'I').append(
+            BACKENDS.index(page.backend) if page.backend in BACKENDS else 0
+        )
+
+        for line in page.lines:
+            bbox = line.bbox or (math.nan,) * 4
+            writer.column('lines', 'page_index', 'I').append(len(writer.columns['pages.number']) - 1)
+            for name, value in zip(('x0', 'top', 'x1', 'bottom'), bbox):
+                writer.column('lines', name, 'f').append(value)
+            writer.column('lines', 'font_size', 'f').append(line.font_size)
+            writer.column('lines', 'font_id', 'I').append(
+                font_ids.setdefault(line.font_name, len(font_ids))
+            )
+            writer.column('lines', 'flags', 'I').append(
+                FLAG_PARAGRAPH_START if line.paragraph_start else 0
+            )
+            offset, length = writer.text(line.text)
+            writer.column('lines', 'text_offset', 'I').append(offset)
+            writer.column('lines', 'text_length', 'I').append(length)
+            line_count += 1
+
+        for size, chars in sorted(page.font_histogram.items()):
+            writer.column('bins', 'size', 'f').append(size)
+            writer.column('bins', 'chars', 'I').append(chars)
+            bin_count += 1
+
+        for region in page.masked_regions:
+            writer.column('regions', 'page_index', 'I').append(len(writer.columns['pages.number']) - 1)
+            for name, value in zip(('x0', 'top', 'x1', 'bottom'), region):
+                writer.column('regions', name, 'f').append(value)
+            region_count += 1
+
+    for title, text, page_number, end_page in records:
+        writer.column('sections', 'page', 'I').append(page_number)
+        writer.column('sections', 'end_page', 'I').append(end_page)
+        for prefix, value in (('title', title), ('text', text)):
+            offset, length = writer.text(value)
+            writer.column('sections', f'{prefix}_offset', 'I').append(offset)
+            writer.column('sections', f'{prefix}_length', 'I').append(length)
+
+    for font_name in sorted(font_ids, key=font_ids.get):
+        offset, length = writer.text(font_name)
+        writer.column('fonts', 'offset', 'I').append(offset)
+        writer.column('fonts', 'length', 'I').append(length)
+
+    header = struct.pack(
+        HEADER_FORMAT, MAGIC, FORMAT_VERSION, sys.byteorder == 'little',
+        source_stat.st_size if source_stat else -1,
+        source_stat.st_mtime_ns if source_stat else -1,
+        len(document.pages), line_count, bin_count, len(records), len(font_ids), region_count,
+        len(section_tag.encode('utf-8')), len(writer.blob)
+    )
+
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(header)
+        for group, columns in _LAYOUT:
+            for name, typecode in columns:
+                f.write(writer.columns.get(f'{group}.{name}', array(typecode)).tobytes())
+        f.write(writer.blob)
+    os.replace(temp_path, path)
+    return path
+
+
+_LAYOUT = (('pages', PAGE_COLUMNS), ('lines', LINE_COLUMNS), ('bins', BIN_COLUMNS),
+           ('sections', SECTION_COLUMNS), ('fonts', FONT_COLUMNS), ('regions', REGION_COLUMNS))
+
+
+class StoredDocument:
+    """A memory-mapped document file with zero-copy column access.
+
+    ``columns['lines.font_size']`` and friends are memoryviews into the
+    mapping; ``line_text(i)`` decodes a single line from the blob.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        (magic, version, little_endian, self.source_size, self.source_mtime_ns,
+         pages, lines, bins, sections, fonts, regions, tag_length,
+         blob_length) = struct.unpack_from(HEADER_FORMAT, view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} document file")
+        if bool(little_endian) != (sys.byteorder == 'little'):
+            raise ValueError(f"{path} was written with a different byte order")
+
+        counts = {'pages': pages, 'lines': lines, 'bins': bins, 'sections': sections, 'fonts': fonts,
+                  'regions': regions}
+        self.counts = counts
+        self.columns: Dict[str, memoryview] = {}
+        offset = HEADER_SIZE
+        for group, columns in _LAYOUT:
+            for name, typecode in columns:
+                size = counts[group] * 4
+                self.columns[f'{group}.{name}'] = view[offset:offset + size].cast(typecode)
+                offset += size
+        self._blob = view[offset:offset + blob_length]
+        if len(self._blob) != blob_length:
+            raise ValueError(f"{path} is truncated")
+        self.section_tag = self._text(0, tag_length)
+        self._view = view
+
+    def close(self):
+        for column in self.columns.values():
+            column.release()
+        self.columns.clear()
+        self._blob.release()
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self) -> "StoredDocument":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def is_current(self, stat: os.stat_result) -> bool:
+        """Whether the file was written for a PDF with this size and mtime."""
+        return self.source_size == stat.st_size and self.source_mtime_ns == stat.st_mtime_ns
+
+    def _text(self, offset: int, length: int) -> str:
+        return str(self._blob[offset:offset + length], 'utf-8')
+
+    def line_text(self, index: int) -> str:
+        return self._text(self.columns['lines.text_offset'][index],
+                          self.columns['lines.text_length'][index])
+
+    def section_records(self) -> List[Tuple[str, str, int, int]]:
+        """Stored (title, text, page, end_page) section records."""
+        c = self.columns
+        return [
+            (self._text(c['sections.title_offset'][i], c['sections.title_length'][i]),
+             self._text(c['sections.text_offset'][i], c['sections.text_length'][i]),
+             c['sections.page'][i], c['sections.end_page'][i])
+            for i in range(self.counts['sections'])
+        ]
+
+    def to_parsed_document(self, source_path: str) -> ParsedDocument:
+        """Materialise the page model for code that works on TextLine objects."""
+        c = self.columns
+        fonts = [self._text(c['fonts.offset'][i], c['fonts.length'][i])
+                 for i in range(self.counts['fonts'])]
+        document = ParsedDocument(path=str(source_path))
+
+        for p in range(self.counts['pages']):
+            first_line = c['pages.first_line'][p]
+            last_line = c['pages.first_line'][p + 1] if p + 1 < self.counts['pages'] else self.counts['lines']
+            first_bin = c['pages.first_bin'][p]
+            last_bin = c['pages.first_bin'][p + 1] if p + 1 < self.counts['pages'] else self.counts['bins']
+
+            page = PageModel(number=c['pages.number'][p], width=c['pages.width'][p],
+                             height=c['pages.height'][p], backend=BACKENDS[c['pages.backend'][p]])
+            page.font_histogram = Counter({
+                round(c['bins.size'][b], 1): c['bins.chars'][b] for b in range(first_bin, last_bin)
+            })
+            for i in range(first_line, last_line):
+                x0 = c['lines.x0'][i]
+                bbox = None if math.isnan(x0) else (
+                    x0, c['lines.top'][i], c['lines.x1'][i], c['lines.bottom'][i]
+                )
+                page.lines.append(TextLine(
+                    text=self.line_text(i),
+                    page=page.number,
+                    bbox=bbox,
+                    font_size=round(c['lines.font_size'][i], 1),
+                    font_name=fonts[c['lines.font_id'][i]],
+                    paragraph_start=bool(c['lines.flags'][i] & FLAG_PARAGRAPH_START),
+                ))
+            if page.backend != 'pdfplumber':
+                document.backend = page.backend
+            document.pages.append(page)
+
+        for r in range(self.counts['regions']):
+            document.pages[c['regions.page_index'][r]].masked_regions.append(
+                (c['regions.x0'][r], c['regions.top'][r], c['regions.x1'][r], c['regions.bottom'][r])
+            )
+        if self.counts['regions']:
+            document.cache[REGION_MASKS_KEY] = {page.number: page.masked_regions
+                                                for page in document.pages if page.masked_regions}
+        if self.counts['sections']:
+            document.cache[SECTION_RECORDS_KEY] = (self.section_tag, self.section_records())
+        return document
+
+
+def open_document(path: str) -> StoredDocument:
+    """Memory-map a document file written by save_document()."""
+    return StoredDocument(path)
+
+
+def stored_document_path(pdf_path: str, store_dir: str, masked: bool = False,
+                         backend: str = 'auto') -> Path:
+    """Document file for ``pdf_path`` inside ``store_dir``.
+
+    Parses with table and figure regions masked, or with a forced backend,
+    have different lines, so they get a file of their own.
+    """
+    resolved = str(Path(pdf_path).resolve())
+    digest = hashlib.sha1(resolved.encode('utf-8')).hexdigest()[:12]
+    variant = ('-masked' if masked else '') + ('' if backend == 'auto' else f'-{backend}')
+    return Path(store_dir) / f"{Path(pdf_path).stem}-{digest}{variant}{FILE_SUFFIX}"
+
+
+def load_stored_document(pdf_path: str, store_dir: str, stat: os.stat_result,
+                         masked: bool = False, backend: str = 'auto') -> Optional[ParsedDocument]:
+    """The stored parse of ``pdf_path``, or None if missing, stale or unreadable."""
+    path = stored_document_path(pdf_path, store_dir, masked, backend)
+    if not path.exists():
+        return None
+    try:
+        with open_document(str(path)) as stored:
+            if not stored.is_current(stat):
+                return None
+            document = stored.to_parsed_document(pdf_path)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Ignoring unreadable document file {path}: {e}")
+        return None
+    if masked:
+        # Like a fresh masked parse, which records its regions even when there are none
+        document.cache.setdefault(REGION_MASKS_KEY, {})
+    document.store_path = str(path)
+    return document
+
+
+def store_document(document: ParsedDocument, store_dir: str, stat: os.stat_result,
+                   masked: bool = False, backend: str = 'auto') -> Optional[str]:
+    """Save a fresh parse into ``store_dir``; failures only cost the reuse."""
+    path = stored_document_path(document.path, store_dir, masked, backend)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        document.store_path = save_document(document, str(path), stat)
+    except OSError as e:
+        print(f"Could not store parsed document {path}: {e}")
+        return None
+    return document.store_path
+
+
+def update_stored_document(document: ParsedDocument):
+    """Rewrite the stored file of ``document``, e.g. after adding section records."""
+    if not document.store_path:
+        return
+    try:
+        stat = os.stat(document.path)
+        save_document(document, document.store_path, stat)
+    except OSError as e:
+        print(f"Could not update stored document {document.store_path}: {e}")
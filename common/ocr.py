@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Scanned-page detection and OCR
+Pages without a text layer but covered by images are recognised while
+pdfplumber builds the page model and handed to a small, bounded pool of OCR
+worker processes (tesseract via pytesseract), so text pages keep flowing
+through the fast path meanwhile. OCR is optional: without pytesseract and
+the tesseract binary, scanned pages are reported and stay empty.
+"""
+
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import List, Dict, Optional
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+# Images must cover this share of a wordless page for it to count as scanned
+SCANNED_IMAGE_SHARE = 0.3
+
+# Rendering resolution for OCR (dots per inch)
+OCR_RESOLUTION = 200
+
+# OCR worker processes; rendering and recognition are CPU bound
+OCR_WORKERS_ENV = "OCR_WORKERS"
+DEFAULT_OCR_WORKERS = 2
+
+# Seconds a document (or a batch, see finish_ocr) waits for its OCR pages before keeping them empty
+OCR_TIMEOUT_ENV = "OCR_TIMEOUT"
+DEFAULT_OCR_TIMEOUT = 30.0
+
+# Words recognised with less confidence than this (0-100) are dropped
+MIN_WORD_CONFIDENCE = 30
+
+_available: Optional[bool] = None
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def is_scanned_page(page) -> bool:
+    """Whether a pdfplumber page that produced no words is mostly image."""
+    page_area = float(page.width) * float(page.height)
+    if not page_area:
+        return False
+    image_area = sum(max(float(image['x1']) - float(image['x0']), 0.0) *
+                     max(float(image['bottom']) - float(image['top']), 0.0)
+                     for image in page.images)
+    return image_area >= SCANNED_IMAGE_SHARE * page_area
+
+
+def ocr_available() -> bool:
+    """Whether pytesseract and the tesseract binary can be used (checked once)."""
+    global _available
+    if _available is None:
+        try:
+            pytesseract.get_tesseract_version()
+            _available = True
+        except Exception:
+            _available = False
+    return _available
+
+
+def ocr_timeout() -> float:
+    return float(os.environ.get(OCR_TIMEOUT_ENV, DEFAULT_OCR_TIMEOUT))
+
+
+def submit_page(pdf_path: str, page_number: int) -> Future:
+    """Queue one page for OCR in the shared worker pool."""
+    global _pool
+    if _pool is None:
+        workers = int(os.environ.get(OCR_WORKERS_ENV, DEFAULT_OCR_WORKERS))
+        _pool = ProcessPoolExecutor(max_workers=max(1, workers))
+    return _pool.submit(ocr_page, pdf_path, page_number)
+
+
+def ocr_page(pdf_path: str, page_number: int, resolution: int = OCR_RESOLUTION):
+    """Render one page and recognise it into a PageModel with line boxes."""
+    import pdfplumber
+    from common.document_parser import PageModel, TextLine, _starts_paragraph
+
+    with pdfplumber.open(pdf_path, pages=[page_number]) as pdf:
+        page = pdf.pages[0]
+        model = PageModel(number=page_number, width=float(page.width),
+                          height=float(page.height), backend='ocr')
+        image = page.to_image(resolution=resolution).original
+
+    data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+    scale = 72.0 / resolution
+
+    lines: Dict[tuple, List[int]] = {}
+    for i, text in enumerate(data['text']):
+        if text.strip() and float(data['conf'][i]) >= MIN_WORD_CONFIDENCE:
+            key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            lines.setdefault(key, []).append(i)
+
+    previous = None
+    previous_paragraph = None
+    for key, indices in lines.items():
+        text = ' '.join(data['text'][i].strip() for i in indices)
+        x0 = min(data['left'][i] for i in indices) * scale
+        top = min(data['top'][i] for i in indices) * scale
+        x1 = max(data['left'][i] + data['width'][i] for i in indices) * scale
+        bottom = max(data['top'][i] + data['height'][i] for i in indices) * scale
+        # Word boxes span ascenders to descenders, close to the font size
+        font_size = round(max(data['height'][i] for i in indices) * scale, 1)
+        model.font_histogram.update(Counter({font_size: len(text)}))
+
+        line = TextLine(text=text, page=page_number, bbox=(x0, top, x1, bottom), font_size=font_size)
+        line.paragraph_start = (previous is None or key[:2] != previous_paragraph
+                                or _starts_paragraph(previous, line))
+        model.lines.append(line)
+        previous, previous_paragraph = line, key[:2]
+
+    return model
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Background JSON output writer
+Outputs are handed to a writer thread through a bounded queue, so the
+processing loop does not wait on serialization or disk I/O; a full queue
+blocks the producer instead of buffering without limit. Every output is
+written to a temporary file in its target directory and renamed over the
+target, so a crash never leaves a truncated output behind. Files are
+committed in batches: all temporary files of a batch are fsynced, renamed,
+and each directory touched is fsynced once.
+"""
+
+import os
+import json
+import queue
+import threading
+from pathlib import Path
+from typing import List, Tuple, Optional, Any, NamedTuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Outputs waiting for the writer thread before producers block
+DEFAULT_QUEUE_SIZE = 64
+
+# Outputs committed (fsynced and renamed) together at most
+DEFAULT_BATCH_SIZE = 32
+
+# Set to 0 to skip fsync (renames stay atomic, but not durable across a power loss)
+OUTPUT_FSYNC_ENV = "OUTPUT_FSYNC"
+
+TMP_SUFFIX = '.tmp'
+
+_STOP = object()
+
+
+class WriteFailure(NamedTuple):
+    path: str
+    error: str
+
+
+def serialize(data: Any, compact: bool = False) -> bytes:
+    """UTF-8 JSON for ``data``; indented like ``json.dump(indent=2)`` unless ``compact``."""
+    if orjson is not None:
+        return orjson.dumps(data, option=0 if compact else orjson.OPT_INDENT_2)
+    if compact:
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def _fsync_directory(directory: Path):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:  # Directories cannot be opened on every platform
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _discard(path: Path):
+    try:
+        path.unlink()
+    except OSError:
+        pass
+
+
+class OutputWriter:
+    """Writes JSON outputs atomically from a background thread.
+
+    ``submit`` returns once the output is queued; the data must not be
+    modified afterwards. ``close`` (or leaving the ``with`` block) waits
+    until everything queued is on disk. Outputs that could not be written
+    are printed and collected in ``failures``.
+    """
+
+    def __init__(self, compact: bool = False, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 batch_size: int = DEFAULT_BATCH_SIZE, fsync: Optional[bool] = None):
+        self.compact = compact
+        self.batch_size = max(batch_size, 1)
+        self.fsync = fsync if fsync is not None else os.environ.get(OUTPUT_FSYNC_ENV, '1') != '0'
+        self.failures: List[WriteFailure] = []
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max(queue_size, 1))
+        self._sequence = 0
+        self._thread = threading.Thread(target=self._run, name='output-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, path, data: Any):
+        """Queue ``data`` to be written as JSON to ``path``, blocking while the queue is full."""
+        if not self._thread.is_alive():
+            raise RuntimeError("output writer is closed")
+        self._queue.put((Path(path), data))
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            # Whatever else is already queued joins the batch
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stopping = True
+                batch = [item for item in batch if item is not _STOP]
+            self._commit(batch)
+
+    def _commit(self, batch: List[Tuple[Path, Any]]):
+        staged = []
+        for path, data in batch:
+            self._sequence += 1
+            tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{self._sequence}{TMP_SUFFIX}")
+            try:
+                payload = serialize(data, self.compact)
+                with open(tmp_path, 'wb') as f:
+                    f.write(payload)
+                    if self.fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+                staged.append((path, tmp_path))
+            except Exception as e:
+                self._fail(path, e)
+                _discard(tmp_path)
+
+        directories = set()
+        for path, tmp_path in staged:
+            try:
+                os.replace(tmp_path, path)
+                directories.add(path.parent)
+                self.written += 1
+            except OSError as e:
+                self._fail(path, e)
+                _discard(tmp_path)
+        if self.fsync:
+            for directory in directories:
+                _fsync_directory(directory)
+
+    def _fail(self, path: Path, error: Exception):
+        print(f"✗ Could not write {path.name}: {error}")
+        self.failures.append(WriteFailure(str(path), str(error)))
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Opt-in profiling for both challenges
+A low-overhead statistical stack sampler that profiles selected documents
+(every Nth, or those slower than a latency threshold) and writes one
+collapsed-stack file per document, ready for flamegraph.pl or speedscope,
+plus a hot-function summary for the whole batch.
+"""
+
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import List, Tuple, Optional, Iterator
+
+# Seconds between stack samples
+SAMPLE_INTERVAL = 0.005
+
+# Functions listed in the end-of-batch summary
+SUMMARY_TOP_N = 15
+
+COLLAPSED_SUFFIX = ".collapsed"
+
+
+class StackSampler:
+    """Samples the call stack of one thread from a background thread."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._target = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id: Optional[int] = None) -> "StackSampler":
+        self._target = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.samples
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            # A sample taken after stop() was requested shows the sampler being joined
+            if stack and not self._stop.is_set():
+                self.samples[tuple(reversed(stack))] += 1
+
+
+def frame_label(code) -> str:
+    """``function (file.py:line)``; never contains the ';' stack separator."""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ',')
+
+
+def write_collapsed(samples: Counter, path: Path):
+    """Write samples in the collapsed-stack format: ``frame;frame;frame count``."""
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in sorted(samples.items()):
+            f.write(f"{';'.join(stack)} {count}\n")
+
+
+class DocumentProfiler:
+    """Profiles selected documents of a batch.
+
+    With ``every`` set, every Nth document (0, N, 2N, ...) is profiled. With
+    ``threshold`` (seconds) set, every document is sampled and the profile is
+    kept only when it took at least that long. Kept profiles are written to
+    ``output_dir`` as ``<name>.collapsed``.
+    """
+
+    def __init__(self, output_dir: Path, every: int = 0, threshold: Optional[float] = None,
+                 interval: float = SAMPLE_INTERVAL):
+        self.output_dir = Path(output_dir)
+        self.every = every if every > 0 else (0 if threshold is not None else 1)
+        self.threshold = threshold
+        self.interval = interval
+        self.totals: Counter = Counter()
+        self.profiled: List[Tuple[str, float, int]] = []  # (name, seconds, samples)
+        self._index = 0
+
+    def _selected(self, index: int) -> bool:
+        return bool(self.every) and index % self.every == 0
+
+    @contextmanager
+    def document(self, name: str) -> Iterator[None]:
+        """Profile the enclosed processing of one document if it is selected."""
+        index = self._index
+        self._index += 1
+        if not self._selected(index) and self.threshold is None:
+            yield
+            return
+
+        sampler = StackSampler(self.interval).start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            samples = sampler.stop()
+            if self._selected(index) or elapsed >= self.threshold:
+                self._keep(name, elapsed, samples)
+
+    def _keep(self, name: str, elapsed: float, samples: Counter):
+        self.totals.update(samples)
+        self.profiled.append((name, elapsed, sum(samples.values())))
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            write_collapsed(samples, self.output_dir / f"{name}{COLLAPSED_SUFFIX}")
+        except OSError as e:
+            print(f"Could not write profile for {name}: {e}")
+
+    def hot_functions(self, top_n: int = SUMMARY_TOP_N) -> List[Tuple[str, int, int]]:
+        """(function, self samples, total samples) of the hottest functions."""
+        own = Counter()
+        inclusive = Counter()
+        for stack, count in self.totals.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                inclusive[label] += count
+        return [(label, count, inclusive[label]) for label, count in own.most_common(top_n)]
+
+    def summary(self, top_n: int = SUMMARY_TOP_N) -> str:
+        total = sum(self.totals.values())
+        if not total:
+            return "Profiling: no documents profiled"
+
+        lines = [f"Profiling: {len(self.profiled)} document(s), {total} samples "
+                 f"every {self.interval * 1000:.0f} ms"]
+        for name, elapsed, samples in sorted(self.profiled, key=lambda p: -p[1])[:5]:
+            lines.append(f"  {elapsed:7.2f}s  {name} ({samples} samples)")
+        lines.append(f"  {'self %':>7} {'total %':>8}  function")
+        for label, own, inclusive in self.hot_functions(top_n):
+            lines.append(f"  {100 * own / total:6.1f}% {100 * inclusive / total:7.1f}%  {label}")
+        return "\n".join(lines)
+
+    def print_summary(self, top_n: int = SUMMARY_TOP_N):
+        print(self.summary(top_n))
+
+
+def profiled(profiler: Optional[DocumentProfiler], name: str):
+    """``profiler.document(name)``, or a no-op context when profiling is off."""
+    return profiler.document(name) if profiler is not None else nullcontext()
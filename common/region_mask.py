@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Table and figure region detection
+Finds the areas of a pdfplumber page holding tables (ruling-line grids or
+rows of aligned cells) and figures (images), so their words can be masked
+out of line building. Table cells otherwise turn into hundreds of short
+title-case lines that look like headings and bloat the section lists.
+"""
+
+from typing import List, Dict, Tuple
+
+Region = Tuple[float, float, float, float]  # (x0, top, x1, bottom)
+
+# Rulings closer than this many points touch
+RULING_TOLERANCE = 3.0
+
+# Shorter edges are glyph decorations or bullets, not rulings
+MIN_RULING_LENGTH = 10.0
+
+# Parallel rulings closer than this many points bound one cell edge (e.g. a shaded bar)
+MIN_CELL_SIZE = 8.0
+
+# Images smaller than this many square points are icons or bullets
+MIN_FIGURE_AREA = 5000.0
+
+# Regions covering more of the page are frames or backgrounds, never masked
+MAX_REGION_SHARE = 0.6
+
+# A gap wider than this multiple of the font size separates two table cells
+CELL_GAP_RATIO = 1.5
+
+# Rows of aligned cells needed to call a block of text a table
+MIN_GRID_ROWS = 3
+MIN_GRID_CELLS = 3
+
+# Cell edges within this many points of each other are aligned
+ALIGN_TOLERANCE = 3.0
+
+# Words this much larger than the page's body text are headings, even inside a frame
+HEADING_SIZE_RATIO = 1.2
+
+
+def find_regions(page, word_lines: List[List[Dict]]) -> List[Region]:
+    """Table and figure regions of one pdfplumber page.
+
+    ``word_lines`` are the page's words clustered into lines, left to right.
+    """
+    page_area = float(page.width) * float(page.height) or 1.0
+    regions = _ruling_grids(page.edges) + _figures(page.images) + _cell_grids(word_lines)
+
+    # A ruled table is usually also found as a cell grid; keep the outer region
+    kept: List[Region] = []
+    for region in sorted(regions, key=_area, reverse=True):
+        if _area(region) <= MAX_REGION_SHARE * page_area and not any(_encloses(outer, region) for outer in kept):
+            kept.append(region)
+    return kept
+
+
+def mask_words(words: List[Dict], regions: List[Region], body_size: float = 0.0) -> List[Dict]:
+    """Words whose centre lies outside every region, or that are set as headings."""
+    if not regions:
+        return words
+    heading_size = HEADING_SIZE_RATIO * body_size if body_size else float('inf')
+    return [word for word in words
+            if float(word.get('size', 0)) >= heading_size
+            or not any(_contains(region, word) for region in regions)]
+
+
+def _contains(region: Region, word: Dict) -> bool:
+    x = (word['x0'] + word['x1']) / 2
+    y = (word['top'] + word['bottom']) / 2
+    return region[0] <= x <= region[2] and region[1] <= y <= region[3]
+
+
+def _encloses(outer: Region, inner: Region) -> bool:
+    return (outer[0] <= inner[0] and outer[1] <= inner[1]
+            and outer[2] >= inner[2] and outer[3] >= inner[3])
+
+
+def _area(region: Region) -> float:
+    return max(region[2] - region[0], 0.0) * max(region[3] - region[1], 0.0)
+
+
+def _ruling_grids(edges: List[Dict]) -> List[Region]:
+    """Bounding boxes of groups of touching rulings forming at least 2x2 cells.
+
+    Boxes and shaded bars drawn around a heading form a single row of
+    cells, so they are never masked.
+    """
+    rulings = [(float(e['x0']), float(e['top']), float(e['x1']), float(e['bottom']), e['orientation'])
+               for e in edges
+               if max(float(e['x1']) - float(e['x0']), float(e['bottom']) - float(e['top'])) >= MIN_RULING_LENGTH]
+    if not rulings:
+        return []
+
+    # Union-find over rulings whose tolerance-expanded boxes overlap
+    parent = list(range(len(rulings)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    order = sorted(range(len(rulings)), key=lambda i: rulings[i][1])
+    for position, i in enumerate(order):
+        x0, top, x1, bottom, _ = rulings[i]
+        for j in order[position + 1:]:
+            if rulings[j][1] > bottom + RULING_TOLERANCE:
+                break
+            if rulings[j][0] <= x1 + RULING_TOLERANCE and rulings[j][2] >= x0 - RULING_TOLERANCE:
+                parent[find(j)] = find(i)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(rulings)):
+        groups.setdefault(find(i), []).append(i)
+
+    regions = []
+    for members in groups.values():
+        rows = _distinct([rulings[i][1] for i in members if rulings[i][4] == 'h'])
+        columns = _distinct([rulings[i][0] for i in members if rulings[i][4] == 'v'])
+        if rows >= 3 and columns >= 3:
+            regions.append((min(rulings[i][0] for i in members), min(rulings[i][1] for i in members),
+                            max(rulings[i][2] for i in members), max(rulings[i][3] for i in members)))
+    return regions
+
+
+def _distinct(positions: List[float]) -> int:
+    """Number of ruling positions at least MIN_CELL_SIZE apart."""
+    count = 0
+    last = None
+    for position in sorted(positions):
+        if last is None or position - last >= MIN_CELL_SIZE:
+            count += 1
+            last = position
+    return count
+
+
+def _figures(images: List[Dict]) -> List[Region]:
+    regions = []
+    for image in images:
+        region = (float(image['x0']), float(image['top']), float(image['x1']), float(image['bottom']))
+        if _area(region) >= MIN_FIGURE_AREA:
+            regions.append(region)
+    return regions
+
+
+def _cell_grids(word_lines: List[List[Dict]]) -> List[Region]:
+    """Runs of consecutive lines split into aligned cells, as in ruleless tables."""
+    regions = []
+    run: List[List[Dict]] = []
+    previous_edges: List[float] = []
+
+    for line_words in word_lines + [[]]:
+        cells = _split_cells(line_words)
+        edges = [edge for cell in cells for edge in (cell[0]['x0'], cell[-1]['x1'])]
+        aligned = len(cells) >= MIN_GRID_CELLS and (
+            not run or sum(1 for edge in edges
+                           if any(abs(edge - other) <= ALIGN_TOLERANCE for other in previous_edges)) >= 2)
+        if aligned:
+            run.append(line_words)
+        else:
+            if len(run) >= MIN_GRID_ROWS:
+                grid_words = [word for line in run for word in line]
+                regions.append((min(w['x0'] for w in grid_words), min(w['top'] for w in grid_words),
+                                max(w['x1'] for w in grid_words), max(w['bottom'] for w in grid_words)))
+            run = [line_words] if len(cells) >= MIN_GRID_CELLS else []
+        previous_edges = edges
+
+    return regions
+
+
+def _split_cells(line_words: List[Dict]) -> List[List[Dict]]:
+    """Split a line (words sorted left to right) at gaps wider than a cell gap."""
+    cells: List[List[Dict]] = []
+    for word in line_words:
+        size = float(word.get('size', 0)) or 10.0
+        if cells and word['x0'] - cells[-1][-1]['x1'] <= CELL_GAP_RATIO * size:
+            cells[-1].append(word)
+        else:
+            cells.append([word])
+    return cells
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Running header and footer detection
+Lines that repeat at the same height on many pages (running titles, page
+numbers, copyright notices) are indexed once per document by their
+normalized text and vertical band, so both challenges can drop them before
+heading classification and section scoring.
+"""
+
+import re
+from collections import defaultdict
+from typing import List, Dict, Set, Tuple, Iterator, Optional
+
+from common.document_parser import ParsedDocument, PageModel, TextLine
+
+# Vertical bands per page; a line's band is its top as a fraction of the page height
+RUNNING_LINE_BANDS = 40
+
+# Only lines in the top or bottom share of a page can be running lines
+MARGIN_RATIO = 0.12
+
+# Without positions (PyPDF2 pages), this many lines at each end of a page count as margin
+MARGIN_LINES = 2
+
+# A line must repeat on this share of the pages, and on at least MIN_PAGES pages
+MIN_PAGE_SHARE = 0.3
+MIN_PAGES = 3
+
+RUNNING_LINES_KEY = 'running_lines'
+
+_DIGITS = re.compile(r'\d+')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_running_text(text: str) -> str:
+    """Case-folded text with numbers masked, so "Page 3 of 9" matches "Page 4 of 9"."""
+    return _SPACES.sub(' ', _DIGITS.sub('#', text)).strip().lower()
+
+
+def _margin_band(page: PageModel, line: TextLine, index: int) -> Optional[int]:
+    """Band of a line in the page margins, or None for body lines."""
+    if line.bbox and page.height:
+        position = line.top / page.height
+        if MARGIN_RATIO <= position <= 1 - MARGIN_RATIO:
+            return None
+        return int(position * RUNNING_LINE_BANDS)
+    # No positions: count lines from either end of the page instead
+    if index < MARGIN_LINES:
+        return index
+    from_bottom = len(page.lines) - 1 - index
+    if from_bottom < MARGIN_LINES:
+        return RUNNING_LINE_BANDS - from_bottom
+    return None
+
+
+def find_running_lines(document: ParsedDocument) -> Set[Tuple[int, int]]:
+    """(page number, line index) of every running header/footer line.
+
+    All margin lines go into one (normalized text, band) -> pages index in
+    a single pass; a key is running when its pages, merged with those of the
+    neighbouring bands to absorb small shifts, reach the page threshold.
+    Lines on the first page set larger than the body text are kept, since
+    running titles often repeat the document title.
+    """
+    pages_with_text = sum(1 for page in document.pages if page.lines)
+    needed = max(MIN_PAGES, MIN_PAGE_SHARE * pages_with_text)
+    if pages_with_text < needed:
+        return set()
+
+    index: Dict[Tuple[str, int], Set[int]] = defaultdict(set)
+    candidates = []
+    for page in document.pages:
+        for line_index, line in enumerate(page.lines):
+            band = _margin_band(page, line, line_index)
+            if band is None:
+                continue
+            key = normalize_running_text(line.text)
+            if not key:
+                continue
+            index[(key, band)].add(page.number)
+            candidates.append((page, line_index, line, key, band))
+
+    first_page = document.pages[0].number if document.pages else 0
+    body_size = document.body_font_size
+    running = set()
+    for page, line_index, line, key, band in candidates:
+        pages = index[(key, band)] | index.get((key, band - 1), set()) | index.get((key, band + 1), set())
+        if len(pages) < needed:
+            continue
+        if page.number == first_page and body_size and line.font_size > body_size:
+            continue
+        running.add((page.number, line_index))
+
+    return running
+
+
+def running_lines(document: ParsedDocument) -> Set[Tuple[int, int]]:
+    """``find_running_lines`` cached on the document."""
+    if RUNNING_LINES_KEY not in document.cache:
+        document.cache[RUNNING_LINES_KEY] = find_running_lines(document)
+    return document.cache[RUNNING_LINES_KEY]
+
+
+def page_content_lines(document: ParsedDocument, page: PageModel) -> List[TextLine]:
+    """Lines of one page without its running headers and footers."""
+    flagged = running_lines(document)
+    return [line for line_index, line in enumerate(page.lines)
+            if (page.number, line_index) not in flagged]
+
+
+def iter_content_lines(document: ParsedDocument) -> Iterator[TextLine]:
+    """``document.iter_lines()`` without running headers and footers."""
+    for page in document.pages:
+        yield from page_content_lines(document, page)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Cost-model scheduler for document batches
+Estimates the cost of every file from its page count (read from the page
+tree root, without loading the pages) and size, dispatches the most
+expensive files first so a large file cannot start last and set the batch's
+makespan, and caps the pages in flight across workers to stay within a
+memory budget. Measured durations refine the cost model across runs.
+"""
+
+import os
+import json
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import List, Dict, Optional, Callable, Iterator, Iterable, NamedTuple, Any
+import PyPDF2
+
+# Where measured costs are kept between runs
+COST_MODEL_ENV = "SCHEDULER_COST_FILE"
+DEFAULT_COST_MODEL = Path.home() / ".cache" / "pdf_cost_model.json"
+
+# Prior used until enough files have been measured
+DEFAULT_SECONDS_PER_PAGE = 0.08
+DEFAULT_SECONDS_PER_MB = 0.02
+MIN_SAMPLES = 5
+
+# Older measurements lose weight by this factor with every new one
+COST_DECAY = 0.98
+
+# Pages allowed in flight across all workers; a single larger file still runs alone
+MAX_INFLIGHT_PAGES_ENV = "SCHEDULER_MAX_PAGES"
+DEFAULT_MAX_INFLIGHT_PAGES = 1000
+
+
+class Job(NamedTuple):
+    path: Path
+    pages: int
+    size: int          # Bytes
+    estimate: float    # Seconds
+    index: int         # Position in the input order
+
+
+class Completed(NamedTuple):
+    job: Job
+    result: Any
+    seconds: float
+    error: Optional[str] = None
+
+
+def count_pages(path: Path) -> int:
+    """Page count from the page tree root; 0 if the file cannot be read."""
+    try:
+        with open(path, 'rb') as f:
+            reader = PyPDF2.PdfReader(f, strict=False)
+            try:
+                return int(reader.trailer['/Root']['/Pages']['/Count'])
+            except (KeyError, TypeError, ValueError):
+                return len(reader.pages)
+    except Exception:
+        return 0
+
+
+class CostModel:
+    """Least-squares fit of seconds ~ a * pages + b * megabytes.
+
+    Only the decayed sums of the normal equations are kept, so recording a
+    measurement and estimating are both constant time.
+    """
+
+    FIELDS = ('pp', 'pm', 'mm', 'pt', 'mt', 'samples')
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or os.environ.get(COST_MODEL_ENV) or DEFAULT_COST_MODEL)
+        self.sums = dict.fromkeys(self.FIELDS, 0.0)
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                stored = json.load(f)
+            self.sums.update({key: float(stored[key]) for key in self.FIELDS if key in stored})
+        except (OSError, ValueError, TypeError):
+            pass
+
+    def coefficients(self) -> tuple:
+        s = self.sums
+        if s['samples'] >= MIN_SAMPLES:
+            determinant = s['pp'] * s['mm'] - s['pm'] ** 2
+            if abs(determinant) > 1e-9:
+                a = (s['pt'] * s['mm'] - s['mt'] * s['pm']) / determinant
+                b = (s['mt'] * s['pp'] - s['pt'] * s['pm']) / determinant
+                if a >= 0 and b >= 0:
+                    return a, b
+            if s['pp'] > 0:
+                # Size adds nothing the page count does not explain
+                return s['pt'] / s['pp'], 0.0
+        return DEFAULT_SECONDS_PER_PAGE, DEFAULT_SECONDS_PER_MB
+
+    def estimate(self, pages: int, size: int) -> float:
+        a, b = self.coefficients()
+        return a * pages + b * size / 1e6
+
+    def record(self, pages: int, size: int, seconds: float):
+        megabytes = size / 1e6
+        s = self.sums
+        for key in self.FIELDS:
+            s[key] *= COST_DECAY
+        s['pp'] += pages * pages
+        s['pm'] += pages * megabytes
+        s['mm'] += megabytes * megabytes
+        s['pt'] += pages * seconds
+        s['mt'] += megabytes * seconds
+        s['samples'] += 1
+
+    def save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.sums, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save cost model {self.path}: {e}")
+
+
+def plan(paths: Iterable[Path], cost_model: CostModel) -> List[Job]:
+    """Jobs for ``paths``, most expensive first (ties keep the input order)."""
+    jobs = []
+    for index, path in enumerate(paths):
+        pages = count_pages(path)
+        size = os.path.getsize(path)
+        jobs.append(Job(Path(path), pages, size, cost_model.estimate(pages, size), index))
+    return sorted(jobs, key=lambda job: (-job.estimate, job.index))
+
+
+def _timed(run: Callable[[Path], Any], path: Path) -> tuple:
+    start = time.perf_counter()
+    try:
+        return run(path), time.perf_counter() - start, None
+    except Exception as e:
+        return None, time.perf_counter() - start, str(e)
+
+
+def run_batch(paths: Iterable[Path], run: Callable[[Path], Any], workers: int = 1,
+              max_inflight_pages: Optional[int] = None, cost_model: Optional[CostModel] = None,
+              initializer: Optional[Callable] = None, initargs: tuple = ()) -> Iterator[Completed]:
+    """Run ``run(path)`` over a batch, yielding results as they complete.
+
+    With one worker, files run in this process, most expensive first. With
+    more, ``run`` (and ``initializer``) must be picklable; the next file
+    dispatched is the most expensive one that keeps the pages in flight
+    within ``max_inflight_pages``. Measured durations are recorded in the
+    cost model, which is saved at the end.
+    """
+    cost_model = cost_model or CostModel()
+    if max_inflight_pages is None:
+        max_inflight_pages = int(os.environ.get(MAX_INFLIGHT_PAGES_ENV, DEFAULT_MAX_INFLIGHT_PAGES))
+    jobs = plan(paths, cost_model)
+
+    try:
+        if workers <= 1:
+            for job in jobs:
+                result, seconds, error = _timed(run, job.path)
+                if error is None:
+                    cost_model.record(job.pages, job.size, seconds)
+                yield Completed(job, result, seconds, error)
+            return
+
+        pending = deque(jobs)
+        running: Dict[Any, Job] = {}
+        inflight_pages = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+            while pending or running:
+                while pending and len(running) < workers:
+                    job = next((job for job in pending
+                                if not running or inflight_pages + job.pages <= max_inflight_pages), None)
+                    if job is None:
+                        break
+                    pending.remove(job)
+                    running[pool.submit(_timed, run, job.path)] = job
+                    inflight_pages += job.pages
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    inflight_pages -= job.pages
+                    try:
+                        result, seconds, error = future.result()
+                    except Exception as e:  # The worker process died
+                        result, seconds, error = None, 0.0, str(e)
+                    if error is None:
+                        cost_model.record(job.pages, job.size, seconds)
+                    yield Completed(job, result, seconds, error)
+    finally:
+        cost_model.save()
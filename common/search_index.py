@@ -0,0 +1,619 @@
+#!/usr/bin/env python3
+"""
+Global BM25 search index over extracted sections
+Both pipelines can add the sections of every document they process to one
+index directory, which answers keyword queries with ranked (document, page,
+section title) hits without rescanning any PDF.
+
+The index is a set of immutable segment files plus a JSON manifest naming
+the live segments and, for every indexed document, its content fingerprint
+and the segment holding its current sections. Re-adding a document writes
+its sections to a new segment and repoints the manifest, which hides the
+old copy until a merge drops it. New sections are buffered in memory and
+flushed as a segment; once there are more than MERGE_FACTOR segments, the
+smallest are merged in a background thread.
+
+Segment layout (native byte order, recorded in the header):
+
+    header     struct HEADER_FORMAT
+    documents  key_offset u32, key_length u32, first_section u32
+    sections   document u32, page u32, length u32 (tokens),
+               title_offset u32, title_length u32
+    postings   per term: varint (section gap, term frequency) pairs
+    terms      text_offset u32, text_length u32, postings_offset u32,
+               postings_length u32, document frequency u32 (sorted by text)
+    blob       UTF-8 document keys, section titles and terms
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import mmap
+import heapq
+import struct
+import argparse
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional, Iterable, Iterator, NamedTuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Default index directory for both pipelines
+SEARCH_INDEX_ENV = "SEARCH_INDEX_DIR"
+
+MAGIC = b'PIDX'
+FORMAT_VERSION = 1
+SEGMENT_SUFFIX = '.seg'
+MANIFEST_NAME = 'index.json'
+
+# magic, version, little-endian flag, documents, sections, terms,
+# postings length, blob length
+HEADER_FORMAT = '<4sHHIIIII'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+DOCUMENT_COLUMNS = (('key_offset', 'I'), ('key_length', 'I'), ('first_section', 'I'))
+SECTION_COLUMNS = (('document', 'I'), ('page', 'I'), ('length', 'I'),
+                   ('title_offset', 'I'), ('title_length', 'I'))
+TERM_COLUMNS = (('text_offset', 'I'), ('text_length', 'I'), ('postings_offset', 'I'),
+                ('postings_length', 'I'), ('df', 'I'))
+
+# Buffered sections written as one segment
+FLUSH_SECTIONS = 20000
+
+# Segments allowed before the smallest ones are merged
+MERGE_FACTOR = 8
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Query terms found in more than this share of sections barely change the
+# ranking but have the longest posting lists; they are skipped unless every
+# query term is that common
+MAX_DF_SHARE = 0.5
+
+_TOKEN = re.compile(r'[^\W_]+')
+
+
+class IndexedSection(NamedTuple):
+    page: int
+    title: str
+    text: str
+
+
+class Hit(NamedTuple):
+    score: float
+    document: str
+    page: int
+    title: str
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def _encode_varints(values: Iterable[int], out: bytearray):
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+
+def _decode_postings(data) -> Iterator[Tuple[int, int]]:
+    """(section, term frequency) pairs of one varint-delta posting list."""
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+    section = 0
+    for i in range(0, len(values), 2):
+        section += values[i]
+        yield section, values[i + 1]
+
+
+def _encode_postings(postings: Iterable[Tuple[int, int]], start: int = 0) -> Tuple[bytearray, int]:
+    """Varint-delta encoding of increasing (section, tf) pairs; returns (bytes, count)."""
+    out = bytearray()
+    previous = start
+    count = 0
+    for section, tf in postings:
+        _encode_varints((section - previous, tf), out)
+        previous = section
+        count += 1
+    return out, count
+
+
+def _write_segment(path: Path, keys: List[str], first_sections: List[int], sections: Dict[str, array],
+                   title_texts: List[str], terms: Iterator[Tuple[str, bytes, int]]) -> Dict:
+    """Write a segment atomically; ``terms`` yields (term, postings, df) in sorted order.
+
+    Postings are streamed to the file, so a merge never holds them all.
+    """
+    blob = bytearray()
+    columns = {f'{group}.{name}': array(typecode)
+               for group, layout in (('documents', DOCUMENT_COLUMNS), ('terms', TERM_COLUMNS))
+               for name, typecode in layout}
+
+    def text(value: str) -> Tuple[int, int]:
+        data = value.encode('utf-8')
+        offset = len(blob)
+        blob.extend(data)
+        return offset, len(data)
+
+    for key, first_section in zip(keys, first_sections):
+        offset, length = text(key)
+        columns['documents.key_offset'].append(offset)
+        columns['documents.key_length'].append(length)
+        columns['documents.first_section'].append(first_section)
+    title_offsets, title_lengths = array('I'), array('I')
+    for title in title_texts:
+        offset, length = text(title)
+        title_offsets.append(offset)
+        title_lengths.append(length)
+    sections = dict(sections, title_offset=title_offsets, title_length=title_lengths)
+
+    temp_path = path.with_suffix('.tmp')
+    with open(temp_path, 'wb') as f:
+        f.write(bytes(HEADER_SIZE))
+        for name, _ in DOCUMENT_COLUMNS:
+            f.write(columns[f'documents.{name}'].tobytes())
+        for name, _ in SECTION_COLUMNS:
+            f.write(sections[name].tobytes())
+
+        postings_length = 0
+        for term, postings, df in terms:
+            offset, length = text(term)
+            for name, value in zip(('text_offset', 'text_length', 'postings_offset', 'postings_length', 'df'),
+                                   (offset, length, postings_length, len(postings), df)):
+                columns[f'terms.{name}'].append(value)
+            f.write(postings)
+            postings_length += len(postings)
+
+        for name, _ in TERM_COLUMNS:
+            f.write(columns[f'terms.{name}'].tobytes())
+        f.write(blob)
+        f.seek(0)
+        f.write(struct.pack(HEADER_FORMAT, MAGIC, FORMAT_VERSION, sys.byteorder == 'little', len(keys),
+                            len(title_texts), len(columns['terms.df']), postings_length, len(blob)))
+    os.replace(temp_path, path)
+    return {'name': path.name, 'sections': len(title_texts), 'total_length': sum(sections['length'])}
+
+
+class _Segment:
+    """A memory-mapped segment file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.name = path.name
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        (magic, version, little_endian, documents, sections, terms,
+         postings_length, blob_length) = struct.unpack_from(HEADER_FORMAT, view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} segment file")
+        if bool(little_endian) != (sys.byteorder == 'little'):
+            raise ValueError(f"{path} was written with a different byte order")
+
+        self.counts = {'documents': documents, 'sections': sections, 'terms': terms}
+        self.columns: Dict[str, memoryview] = {}
+        offset = HEADER_SIZE
+        for group, layout in (('documents', DOCUMENT_COLUMNS), ('sections', SECTION_COLUMNS)):
+            for name, typecode in layout:
+                self.columns[f'{group}.{name}'] = view[offset:offset + 4 * self.counts[group]].cast(typecode)
+                offset += 4 * self.counts[group]
+        self._postings = view[offset:offset + postings_length]
+        offset += postings_length
+        for name, typecode in TERM_COLUMNS:
+            self.columns[f'terms.{name}'] = view[offset:offset + 4 * terms].cast(typecode)
+            offset += 4 * terms
+        self._blob = view[offset:offset + blob_length]
+        if len(self._blob) != blob_length:
+            raise ValueError(f"{path} is truncated")
+        self.live = bytearray(b'\x01' * documents)
+        self.live_sections = sections
+        self.live_length = 0
+
+    def count_live(self, total_length: int):
+        """Recount the sections and tokens of live documents after ``live`` changed."""
+        first = self.columns['documents.first_section']
+        lengths = self.columns['sections.length']
+        documents, sections = self.counts['documents'], self.counts['sections']
+        self.live_sections, self.live_length = sections, total_length
+        # Replaced documents are usually few, so only their ranges are visited
+        for document in range(documents):
+            if not self.live[document]:
+                end = first[document + 1] if document + 1 < documents else sections
+                self.live_sections -= end - first[document]
+                self.live_length -= sum(lengths[first[document]:end])
+
+    def _text(self, offset: int, length: int) -> str:
+        return str(self._blob[offset:offset + length], 'utf-8')
+
+    def document_key(self, index: int) -> str:
+        return self._text(self.columns['documents.key_offset'][index], self.columns['documents.key_length'][index])
+
+    def title(self, section: int) -> str:
+        return self._text(self.columns['sections.title_offset'][section],
+                          self.columns['sections.title_length'][section])
+
+    def term(self, index: int) -> str:
+        return self._text(self.columns['terms.text_offset'][index], self.columns['terms.text_length'][index])
+
+    def find_term(self, term: str) -> Optional[int]:
+        """Index of ``term`` in the sorted term table (binary search)."""
+        low, high = 0, self.counts['terms']
+        while low < high:
+            middle = (low + high) // 2
+            if self.term(middle) < term:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < self.counts['terms'] and self.term(low) == term else None
+
+    def iter_terms(self, tag: int) -> Iterator[Tuple[str, int, int]]:
+        """(term, ``tag``, term index) in term order, for merging segments."""
+        for index in range(self.counts['terms']):
+            yield self.term(index), tag, index
+
+    def df(self, index: int) -> int:
+        return self.columns['terms.df'][index]
+
+    def postings(self, index: int) -> Iterator[Tuple[int, int]]:
+        offset = self.columns['terms.postings_offset'][index]
+        return _decode_postings(self._postings[offset:offset + self.columns['terms.postings_length'][index]])
+
+    def close(self):
+        for column in self.columns.values():
+            column.release()
+        self._postings.release()
+        self._blob.release()
+        self._mmap.close()
+
+
+class SearchIndex:
+    """Incrementally updated BM25 index stored in ``directory``."""
+
+    def __init__(self, directory: str, flush_sections: int = FLUSH_SECTIONS,
+                 merge_factor: int = MERGE_FACTOR, background_merge: bool = True):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.flush_sections = flush_sections
+        self.merge_factor = merge_factor
+        self.background_merge = background_merge
+        self._lock = threading.RLock()
+        self._merge_thread: Optional[threading.Thread] = None
+        self._segments: List[_Segment] = []
+        self._manifest: Dict = {}
+        self._clear_pending()
+        self.reload()
+
+    # Manifest
+
+    @contextmanager
+    def _locked(self):
+        """Serialise manifest updates across threads and, where possible, processes."""
+        with self._lock:
+            with open(self.directory / '.lock', 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_manifest(self) -> Dict:
+        try:
+            with open(self.directory / MANIFEST_NAME, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'version': FORMAT_VERSION, 'generation': 0, 'segments': [], 'documents': {}}
+
+    def _write_manifest(self, manifest: Dict):
+        temp_path = self.directory / f'{MANIFEST_NAME}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(temp_path, self.directory / MANIFEST_NAME)
+
+    def _next_segment_path(self, manifest: Dict) -> Path:
+        manifest['generation'] += 1
+        return self.directory / f"seg-{manifest['generation']:06d}{SEGMENT_SUFFIX}"
+
+    def reload(self):
+        """Open the segments named by the current manifest."""
+        with self._lock:
+            manifest = self._read_manifest()
+            opened = {segment.name: segment for segment in self._segments}
+            segments = []
+            for entry in manifest['segments']:
+                segment = opened.pop(entry['name'], None)
+                if segment is None:
+                    try:
+                        segment = _Segment(self.directory / entry['name'])
+                    except (OSError, ValueError, struct.error) as e:
+                        print(f"Ignoring unreadable index segment {entry['name']}: {e}")
+                        continue
+                segment.live = bytearray(
+                    manifest['documents'].get(segment.document_key(d), {}).get('segment') == segment.name
+                    for d in range(segment.counts['documents']))
+                segment.count_live(entry['total_length'])
+                segments.append(segment)
+            self._manifest = manifest
+            self._segments = segments
+            for segment in opened.values():
+                segment.close()
+
+    # Writing
+
+    def _clear_pending(self):
+        self._pending_keys: List[str] = []
+        self._pending_fingerprints: Dict[str, str] = {}
+        self._pending_first: List[int] = []
+        self._pending_sections = {name: array(typecode) for name, typecode in SECTION_COLUMNS[:3]}
+        self._pending_titles: List[str] = []
+        self._pending_postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+
+    def is_indexed(self, key: str, fingerprint: str) -> bool:
+        """Whether ``key`` is indexed (or pending) with this content fingerprint."""
+        if self._pending_fingerprints.get(key) == fingerprint:
+            return True
+        return self._manifest['documents'].get(key, {}).get('fingerprint') == fingerprint
+
+    def add_document(self, key: str, fingerprint: str, sections: Iterable[IndexedSection]):
+        """Index the sections of one document, replacing any earlier version of it."""
+        if key in self._pending_fingerprints:
+            self.flush()
+        document = len(self._pending_keys)
+        self._pending_keys.append(key)
+        self._pending_fingerprints[key] = fingerprint
+        self._pending_first.append(len(self._pending_titles))
+
+        for page, title, text in sections:
+            section = len(self._pending_titles)
+            tokens = Counter(tokenize(f"{title} {text}"))
+            self._pending_sections['document'].append(document)
+            self._pending_sections['page'].append(max(int(page), 0))
+            self._pending_sections['length'].append(sum(tokens.values()))
+            self._pending_titles.append(title)
+            for term, tf in tokens.items():
+                self._pending_postings[term].append((section, tf))
+
+        if len(self._pending_titles) >= self.flush_sections:
+            self.flush()
+
+    def remove_document(self, key: str):
+        with self._locked():
+            manifest = self._read_manifest()
+            if manifest['documents'].pop(key, None) is not None:
+                self._write_manifest(manifest)
+        self.reload()
+
+    def flush(self):
+        """Write the buffered documents as a new segment and publish it."""
+        if not self._pending_keys:
+            return
+        with self._locked():
+            manifest = self._read_manifest()
+            path = self._next_segment_path(manifest)
+            postings = self._pending_postings
+            entry = _write_segment(
+                path, self._pending_keys, self._pending_first, self._pending_sections, self._pending_titles,
+                ((term, bytes(_encode_postings(postings[term])[0]), len(postings[term]))
+                 for term in sorted(postings)))
+            manifest['segments'].append(entry)
+            for key in self._pending_keys:
+                manifest['documents'][key] = {'fingerprint': self._pending_fingerprints[key],
+                                              'segment': entry['name']}
+            self._write_manifest(manifest)
+        self._clear_pending()
+        self.reload()
+        self.maybe_merge()
+
+    def maybe_merge(self):
+        """Merge the smallest segments once there are more than ``merge_factor``."""
+        if len(self._segments) <= self.merge_factor:
+            return
+        if self._merge_thread is not None and self._merge_thread.is_alive():
+            return
+        names = [segment.name for segment in
+                 sorted(self._segments, key=lambda s: s.counts['sections'])[:self.merge_factor]]
+        if self.background_merge:
+            self._merge_thread = threading.Thread(target=self.merge, args=(names,), name='index-merge')
+            self._merge_thread.start()
+        else:
+            self.merge(names)
+
+    def merge(self, names: Optional[List[str]] = None):
+        """Merge segments (default: all) into one, dropping replaced documents."""
+        with self._lock:
+            segments = [s for s in self._segments if names is None or s.name in names]
+        if len(segments) < 2 and not any(0 in s.live for s in segments):
+            return
+
+        keys, first_sections, titles = [], [], []
+        sections = {name: array(typecode) for name, typecode in SECTION_COLUMNS[:3]}
+        remaps: List[Dict[int, int]] = []
+        for segment in segments:
+            c = segment.columns
+            remap = {}
+            for d in range(segment.counts['documents']):
+                if not segment.live[d]:
+                    continue
+                document = len(keys)
+                keys.append(segment.document_key(d))
+                first_sections.append(len(titles))
+                first = c['documents.first_section'][d]
+                last = (c['documents.first_section'][d + 1] if d + 1 < segment.counts['documents']
+                        else segment.counts['sections'])
+                for s in range(first, last):
+                    remap[s] = len(titles)
+                    sections['document'].append(document)
+                    sections['page'].append(c['sections.page'][s])
+                    sections['length'].append(c['sections.length'][s])
+                    titles.append(segment.title(s))
+            remaps.append(remap)
+
+        def merged_terms() -> Iterator[Tuple[str, bytes, int]]:
+            current, parts = None, []
+            for term, i, t in heapq.merge(*(segment.iter_terms(i) for i, segment in enumerate(segments))):
+                if term != current and parts:
+                    yield emit(current, parts)
+                    parts = []
+                current = term
+                parts.append((i, t))
+            if parts:
+                yield emit(current, parts)
+
+        def emit(term: str, parts: List[Tuple[int, int]]) -> Tuple[str, bytes, int]:
+            # Segments are concatenated in order, so remapped ids keep increasing
+            remapped = ((remaps[i][section], tf) for i, t in parts
+                        for section, tf in segments[i].postings(t) if section in remaps[i])
+            data, count = _encode_postings(remapped)
+            return term, bytes(data), count
+
+        with self._locked():
+            manifest = self._read_manifest()
+            path = self._next_segment_path(manifest)
+            self._write_manifest(manifest)
+        entry = _write_segment(path, keys, first_sections, sections, titles,
+                               ((t, p, df) for t, p, df in merged_terms() if df))
+
+        merged = {segment.name for segment in segments}
+        with self._locked():
+            manifest = self._read_manifest()
+            if not merged <= {e['name'] for e in manifest['segments']}:
+                # Another writer merged these segments first
+                path.unlink()
+                return
+            position = min(i for i, e in enumerate(manifest['segments']) if e['name'] in merged)
+            manifest['segments'] = [e for e in manifest['segments'] if e['name'] not in merged]
+            manifest['segments'].insert(position, entry)
+            for key in keys:
+                if manifest['documents'].get(key, {}).get('segment') in merged:
+                    manifest['documents'][key]['segment'] = entry['name']
+            self._write_manifest(manifest)
+        self.reload()
+        for name in merged:
+            try:
+                (self.directory / name).unlink()
+            except OSError:
+                pass
+
+    def close(self):
+        """Flush buffered documents and wait for a running merge."""
+        self.flush()
+        if self._merge_thread is not None:
+            self._merge_thread.join()
+        with self._lock:
+            for segment in self._segments:
+                segment.close()
+            self._segments = []
+
+    # Searching
+
+    def stats(self) -> Dict:
+        """Counts over live sections; replaced copies awaiting a merge are left out."""
+        segments = self._segments
+        return {'documents': len(self._manifest['documents']), 'segments': len(segments),
+                'sections': sum(segment.live_sections for segment in segments),
+                'total_length': sum(segment.live_length for segment in segments)}
+
+    def search(self, query: str, limit: int = 10) -> List[Hit]:
+        """Top ``limit`` live sections for ``query`` by BM25.
+
+        N and the average section length count live sections only. Document
+        frequencies come from the segment term tables, so until the next
+        merge they still include the sections of replaced documents.
+        """
+        segments = self._segments
+        stats = self.stats()
+        sections = stats['sections']
+        if not sections:
+            return []
+        average_length = stats['total_length'] / sections or 1.0
+
+        found = []
+        for term in dict.fromkeys(tokenize(query)):
+            locations = [(position, segment.find_term(term)) for position, segment in enumerate(segments)]
+            locations = [(position, index) for position, index in locations if index is not None]
+            df = sum(segments[position].df(index) for position, index in locations)
+            if df:
+                found.append((df, locations))
+        common = [item for item in found if item[0] > MAX_DF_SHARE * sections]
+        if len(common) < len(found):
+            found = [item for item in found if item[0] <= MAX_DF_SHARE * sections]
+
+        scores: Dict[Tuple[int, int], float] = defaultdict(float)
+        for df, locations in found:
+            idf = math.log(1 + (sections - df + 0.5) / (df + 0.5))
+            for position, index in locations:
+                segment = segments[position]
+                document_column = segment.columns['sections.document']
+                length_column = segment.columns['sections.length']
+                live = segment.live
+                for section, tf in segment.postings(index):
+                    if not live[document_column[section]]:
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length_column[section] / average_length)
+                    scores[(position, section)] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        hits = []
+        for (position, section), score in heapq.nlargest(limit, scores.items(), key=lambda item: item[1]):
+            segment = segments[position]
+            hits.append(Hit(score, segment.document_key(segment.columns['sections.document'][section]),
+                            segment.columns['sections.page'][section], segment.title(section)))
+        return hits
+
+
+def open_search_index(directory: Optional[str] = None) -> Optional[SearchIndex]:
+    """The index in ``directory`` (default: $SEARCH_INDEX_DIR), or None if neither is set."""
+    directory = directory or os.environ.get(SEARCH_INDEX_ENV)
+    return SearchIndex(directory) if directory else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search the sections indexed by both pipelines")
+    parser.add_argument("query", nargs="?", help="keywords to search for")
+    parser.add_argument("--index", metavar="DIR", default=os.environ.get(SEARCH_INDEX_ENV),
+                        help="index directory (default: $SEARCH_INDEX_DIR)")
+    parser.add_argument("--limit", type=int, default=10, help="number of hits (default: 10)")
+    parser.add_argument("--merge", action="store_true", help="merge all segments into one first")
+    parser.add_argument("--json", action="store_true", help="print hits as JSON lines")
+    args = parser.parse_args()
+    if not args.index:
+        parser.error("no index directory: pass --index or set $SEARCH_INDEX_DIR")
+
+    index = SearchIndex(args.index, background_merge=False)
+    if args.merge:
+        index.merge()
+    stats = index.stats()
+    print(f"{stats['sections']} sections of {stats['documents']} documents in "
+          f"{stats['segments']} segment(s)", file=sys.stderr)
+
+    if args.query:
+        start = time.perf_counter()
+        hits = index.search(args.query, args.limit)
+        elapsed = time.perf_counter() - start
+        for hit in hits:
+            if args.json:
+                print(json.dumps(hit._asdict(), ensure_ascii=False))
+            else:
+                print(f"{hit.score:7.3f}  {hit.document}  p.{hit.page}  {hit.title}")
+        print(f"{len(hits)} hit(s) in {elapsed * 1000:.1f} ms", file=sys.stderr)
+    index.close()
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Synthetic PDF corpus generator
+Writes deterministic PDFs of any size with a known heading hierarchy,
+running headers and footers, ruled tables and two-column pages, together
+with ground-truth outlines in the sample_dataset format, so both challenges
+can be scale-tested and profiled offline. Run from the repository root:
+
+    python -m common.synthetic_corpus OUT --files 100 --pages 20-1200
+"""
+
+import json
+import zlib
+import random
+import argparse
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional, BinaryIO
+
+PAGE_WIDTH = 612.0
+PAGE_HEIGHT = 792.0
+MARGIN = 72.0
+COLUMN_GAP = 24.0
+
+# Font sizes in points; headings are bold, everything else regular
+TITLE_SIZE = 22.0
+HEADING_SIZES = {'H1': 16.0, 'H2': 13.0, 'H3': 11.5}
+BODY_SIZE = 10.0
+TABLE_SIZE = 8.0
+RUNNING_SIZE = 8.0
+
+# Average Helvetica glyph width as a fraction of the font size
+REGULAR_WIDTH = 0.5
+BOLD_WIDTH = 0.56
+
+LEADING = 1.3
+
+# Share of pages set in two columns, and chance of a table after a paragraph
+DEFAULT_MULTI_COLUMN_SHARE = 0.2
+DEFAULT_TABLE_RATE = 0.05
+
+WORDS = (
+    "the of and to in a is that for it as with was on be by this are from at or an which have not "
+    "has but were all their can more one its been other when will would into also these some than "
+    "them most only over such time used first each through between after new data system model "
+    "process results analysis method value level design energy market study group water number "
+    "report service support quality information development research policy program project "
+    "review network control period account structure practice approach evidence measure source "
+    "material region effect factor impact growth capacity sample standard response planning"
+).split()
+
+TOPICS = (
+    "Overview Background Methods Results Discussion Scope Requirements Architecture Evaluation "
+    "Governance Funding Timeline Risks Operations Training Security Infrastructure Procurement "
+    "Strategy Stakeholders Budget Compliance Maintenance Deployment Assessment Outcomes Findings "
+    "Recommendations Implementation Monitoring Partnerships Resources Principles Objectives"
+).split()
+
+QUALIFIERS = (
+    "Regional National Digital Annual Technical Financial Community Public Strategic Operational "
+    "Shared Future Current Proposed Local Integrated Sustainable Key Core Detailed"
+).split()
+
+_LEVEL_DEPTH = {'H1': 1, 'H2': 2, 'H3': 3}
+
+
+class _PdfWriter:
+    """Streams numbered objects to a file and finishes with the xref table."""
+
+    def __init__(self, f: BinaryIO):
+        self.f = f
+        self.offsets: List[int] = []
+        self.position = 0
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data: bytes):
+        self.f.write(data)
+        self.position += len(data)
+
+    def reserve(self) -> int:
+        self.offsets.append(0)
+        return len(self.offsets)
+
+    def add(self, body: bytes, number: Optional[int] = None) -> int:
+        number = number or self.reserve()
+        self.offsets[number - 1] = self.position
+        self._write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        return number
+
+    def add_stream(self, content: bytes, compress: bool = True) -> int:
+        if compress:
+            content = zlib.compress(content, 6)
+            header = b"<< /Length %d /Filter /FlateDecode >>" % len(content)
+        else:
+            header = b"<< /Length %d >>" % len(content)
+        return self.add(header + b"\nstream\n" + content + b"\nendstream")
+
+    def finish(self, root: int):
+        xref = self.position
+        table = [b"xref\n0 %d\n0000000000 65535 f \n" % (len(self.offsets) + 1)]
+        table += [b"%010d 00000 n \n" % offset for offset in self.offsets]
+        table.append(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                     % (len(self.offsets) + 1, root, xref))
+        self._write(b"".join(table))
+
+
+def _text_op(font: str, size: float, x: float, y: float, text: str) -> str:
+    escaped = text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return f"BT /{font} {size:g} Tf 1 0 0 1 {x:.2f} {y:.2f} Tm ({escaped}) Tj ET"
+
+
+def _text_width(text: str, size: float, bold: bool = False) -> float:
+    return len(text) * size * (BOLD_WIDTH if bold else REGULAR_WIDTH)
+
+
+class _Layout:
+    """Flows blocks down the columns of successive pages of one document."""
+
+    def __init__(self, writer: _PdfWriter, rng: random.Random, pages_id: int, running_title: str,
+                 multi_column_share: float, compress: bool):
+        self.writer = writer
+        self.rng = rng
+        self.pages_id = pages_id
+        self.running_title = running_title
+        self.multi_column_share = multi_column_share
+        self.compress = compress
+        self.page_ids: List[int] = []
+        self.multi_column_pages: List[int] = []
+        self.table_pages: List[int] = []
+        self.ops: List[str] = []
+        self.columns: List[Tuple[float, float]] = []
+        self.column = 0
+        self.y = 0.0
+
+    @property
+    def page_index(self) -> int:
+        """0-based index of the page being laid out."""
+        return len(self.page_ids)
+
+    @property
+    def x(self) -> float:
+        return self.columns[self.column][0]
+
+    @property
+    def width(self) -> float:
+        return self.columns[self.column][1]
+
+    def new_page(self, single_column: bool = False):
+        if self.ops:
+            self.flush_page()
+        full = PAGE_WIDTH - 2 * MARGIN
+        if not single_column and self.rng.random() < self.multi_column_share:
+            half = (full - COLUMN_GAP) / 2
+            self.columns = [(MARGIN, half), (MARGIN + half + COLUMN_GAP, half)]
+            self.multi_column_pages.append(self.page_index)
+        else:
+            self.columns = [(MARGIN, full)]
+        self.column = 0
+        self.y = PAGE_HEIGHT - MARGIN
+        self.ops = [_text_op('F1', RUNNING_SIZE, MARGIN, PAGE_HEIGHT - 36, self.running_title),
+                    _text_op('F1', RUNNING_SIZE, PAGE_WIDTH / 2 - 20, 36, f"Page {self.page_index + 1}")]
+
+    def flush_page(self):
+        content = self.writer.add_stream("\n".join(self.ops).encode('latin-1'), self.compress)
+        page_id = self.writer.add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %g %g] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> >>"
+            % (self.pages_id, PAGE_WIDTH, PAGE_HEIGHT, content))
+        self.page_ids.append(page_id)
+        self.ops = []
+
+    def ensure(self, height: float):
+        """Move to the next column or page unless ``height`` points fit below."""
+        if self.y - height >= MARGIN:
+            return
+        if self.column + 1 < len(self.columns):
+            self.column += 1
+            self.y = PAGE_HEIGHT - MARGIN
+        else:
+            self.new_page()
+
+    def line(self, text: str, size: float, bold: bool = False, space_before: float = 0.0):
+        self.y -= space_before + size
+        self.ops.append(_text_op('F2' if bold else 'F1', size, self.x, self.y, text))
+        self.y -= size * (LEADING - 1)
+
+    def heading(self, text: str, level: str) -> int:
+        """Lay out a heading kept with two body lines; returns its 0-based page."""
+        size = HEADING_SIZES[level]
+        self.ensure(size * 2 + BODY_SIZE * LEADING * 2)
+        self.line(text, size, bold=True, space_before=size * 0.6)
+        return self.page_index
+
+    def paragraph(self, words: List[str]):
+        chars = max(int(self.width / (BODY_SIZE * REGULAR_WIDTH)), 10)
+        lines, current = [], ''
+        for word in words:
+            if current and len(current) + 1 + len(word) > chars:
+                lines.append(current)
+                current = word
+            else:
+                current = f"{current} {word}" if current else word
+        lines.append(current)
+        for i, text in enumerate(lines):
+            self.ensure(BODY_SIZE * LEADING)
+            self.line(text, BODY_SIZE, space_before=BODY_SIZE * 0.5 if i == 0 else 0.0)
+
+    def table(self, rows: int, columns: int):
+        row_height = TABLE_SIZE * 2
+        self.ensure(rows * row_height + BODY_SIZE)
+        self.table_pages.append(self.page_index)
+        top = self.y - BODY_SIZE * 0.5
+        cell_width = self.width / columns
+        bottom = top - rows * row_height
+        rulings = [f"{self.x:.2f} {top - r * row_height:.2f} m {self.x + self.width:.2f} "
+                   f"{top - r * row_height:.2f} l" for r in range(rows + 1)]
+        rulings += [f"{self.x + c * cell_width:.2f} {top:.2f} m {self.x + c * cell_width:.2f} {bottom:.2f} l"
+                    for c in range(columns + 1)]
+        self.ops.append("0.5 w " + " ".join(rulings) + " S")
+        for r in range(rows):
+            for c in range(columns):
+                text = (self.rng.choice(TOPICS) if r == 0
+                        else f"{self.rng.choice(WORDS)} {self.rng.randint(1, 999)}")
+                self.ops.append(_text_op('F1', TABLE_SIZE, self.x + c * cell_width + 3,
+                                         top - (r + 1) * row_height + 5, text))
+        self.y = bottom - BODY_SIZE * 0.5
+
+
+def _sentence(rng: random.Random) -> List[str]:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 16))]
+    words[0] = words[0].capitalize()
+    words[-1] += '.'
+    return words
+
+
+def _heading_text(rng: random.Random, numbering: Optional[str], max_width: float, size: float) -> str:
+    words = [rng.choice(QUALIFIERS)] if rng.random() < 0.6 else []
+    words.append(rng.choice(TOPICS))
+    if rng.random() < 0.4:
+        words += ['and', rng.choice(TOPICS)]
+    text = ' '.join(([numbering] if numbering else []) + words)
+    while len(words) > 1 and _text_width(text, size, bold=True) > max_width:
+        words.pop(0)
+        text = ' '.join(([numbering] if numbering else []) + words)
+    return text
+
+
+def generate_document(path: Path, pages: int, seed: str,
+                      multi_column_share: float = DEFAULT_MULTI_COLUMN_SHARE,
+                      table_rate: float = DEFAULT_TABLE_RATE, compress: bool = True) -> Tuple[Dict, Dict]:
+    """Write one PDF of about ``pages`` pages; returns (ground truth, manifest entry).
+
+    The ground truth has the sample_dataset outline format, with 0-based
+    pages. The same seed always produces the same bytes.
+    """
+    rng = random.Random(seed)
+    numbered = rng.random() < 0.5
+    title = f"{rng.choice(QUALIFIERS)} {rng.choice(TOPICS)} {rng.choice(['Report', 'Plan', 'Review', 'Guide'])}"
+    outline = []
+
+    with open(path, 'wb') as f:
+        writer = _PdfWriter(f)
+        catalog = writer.reserve()
+        pages_id = writer.reserve()
+        writer.add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        writer.add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+
+        layout = _Layout(writer, rng, pages_id, title, multi_column_share, compress)
+        layout.new_page(single_column=True)
+        layout.line(title, TITLE_SIZE, bold=True)
+
+        counters = [0, 0, 0]
+        level = 'H1'
+        # Stop once the last page is started; a long section may spill one page over
+        while layout.page_index < pages - 1 or not outline:
+            depth = _LEVEL_DEPTH[level]
+            counters[depth - 1] += 1
+            counters[depth:] = [0] * (3 - depth)
+            numbering = '.'.join(str(n) for n in counters[:depth]) if numbered else None
+            text = _heading_text(rng, numbering, layout.width, HEADING_SIZES[level])
+            if level == 'H1' and counters[0] > 1 and rng.random() < 0.3:
+                layout.new_page()
+            page = layout.heading(text, level)
+            outline.append({'level': level, 'text': text, 'page': page})
+
+            for _ in range(rng.randint(1, 4)):
+                layout.paragraph([word for _ in range(rng.randint(2, 5)) for word in _sentence(rng)])
+                if rng.random() < table_rate:
+                    layout.table(rng.randint(4, 7), rng.randint(3, 5))
+
+            # The next heading goes one level down, stays, or climbs back up
+            choice = rng.random()
+            if choice < 0.35 and depth < 3:
+                level = f"H{depth + 1}"
+            elif choice < 0.7 or depth == 1:
+                level = f"H{depth}"
+            else:
+                level = f"H{rng.randint(1, depth - 1)}"
+
+        layout.flush_page()
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in layout.page_ids)
+        writer.add(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(layout.page_ids)), pages_id)
+        writer.add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id, catalog)
+        writer.finish(catalog)
+
+    manifest = {'file': path.name, 'pages': len(layout.page_ids), 'title': title,
+                'headings': len(outline), 'numbered': numbered, 'running_header': title,
+                'multi_column_pages': layout.multi_column_pages, 'table_pages': layout.table_pages}
+    return {'title': title, 'outline': outline}, manifest
+
+
+def parse_page_range(text: str) -> Tuple[int, int]:
+    """'50' -> (50, 50); '20-1200' -> (20, 1200)."""
+    low, _, high = text.partition('-')
+    low_pages = int(low)
+    high_pages = int(high) if high else low_pages
+    if low_pages < 1 or high_pages < low_pages:
+        raise ValueError(f"invalid page range: {text}")
+    return low_pages, high_pages
+
+
+def generate_corpus(out_dir: Path, files: int, pages: Tuple[int, int] = (10, 10), seed: int = 0,
+                    collection: bool = False, multi_column_share: float = DEFAULT_MULTI_COLUMN_SHARE,
+                    table_rate: float = DEFAULT_TABLE_RATE, compress: bool = True) -> List[Dict]:
+    """Write ``files`` PDFs and their ground truth under ``out_dir``.
+
+    Layout: ``pdfs/`` and ``outputs/`` as in Challenge_1a/sample_dataset, or
+    with ``collection`` a Challenge_1b collection (``PDFs/`` and
+    ``challenge1b_input.json``) with the ground truth still in ``outputs/``.
+    Document i depends only on (seed, i), so corpora of different sizes
+    share their leading files.
+    """
+    out_dir = Path(out_dir)
+    pdf_dir = out_dir / ('PDFs' if collection else 'pdfs')
+    truth_dir = out_dir / 'outputs'
+    pdf_dir.mkdir(parents=True, exist_ok=True)
+    truth_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = []
+    for index in range(files):
+        document_seed = f"{seed}:{index}"
+        page_count = random.Random(document_seed + ':pages').randint(*pages)
+        name = f"doc{index:05d}"
+        truth, entry = generate_document(pdf_dir / f"{name}.pdf", page_count, document_seed,
+                                         multi_column_share, table_rate, compress)
+        with open(truth_dir / f"{name}.json", 'w', encoding='utf-8') as f:
+            json.dump(truth, f, indent=4)
+        manifest.append(entry)
+
+    if collection:
+        config = {
+            'challenge_info': {'challenge_id': f"synthetic_{seed}", 'test_case_name': 'synthetic',
+                               'description': f"{files} synthetic documents"},
+            'documents': [{'filename': entry['file'], 'title': entry['title']} for entry in manifest],
+            'persona': {'role': 'Research Analyst'},
+            'job_to_be_done': {'task': 'Summarise the methods, results and risks across the reports.'},
+        }
+        with open(out_dir / 'challenge1b_input.json', 'w', encoding='utf-8') as f:
+            json.dump(config, f, indent=4)
+
+    with open(out_dir / 'manifest.json', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic PDF corpus with ground truth")
+    parser.add_argument("out_dir", type=Path, help="directory to write the corpus to")
+    parser.add_argument("--files", type=int, default=10, help="number of PDFs (default: 10)")
+    parser.add_argument("--pages", default="10", metavar="N|MIN-MAX",
+                        help="pages per PDF, fixed or a range drawn per file (default: 10)")
+    parser.add_argument("--seed", type=int, default=0, help="corpus seed (default: 0)")
+    parser.add_argument("--collection", action="store_true",
+                        help="write a Challenge 1b collection (PDFs/ and challenge1b_input.json)")
+    parser.add_argument("--multi-column-share", type=float, default=DEFAULT_MULTI_COLUMN_SHARE,
+                        help=f"share of two-column pages (default: {DEFAULT_MULTI_COLUMN_SHARE})")
+    parser.add_argument("--table-rate", type=float, default=DEFAULT_TABLE_RATE,
+                        help=f"chance of a table after each paragraph (default: {DEFAULT_TABLE_RATE})")
+    parser.add_argument("--no-compress", action="store_true", help="write uncompressed content streams")
+    args = parser.parse_args()
+
+    try:
+        page_range = parse_page_range(args.pages)
+    except ValueError as e:
+        parser.error(str(e))
+    manifest = generate_corpus(args.out_dir, args.files, page_range, args.seed, args.collection,
+                               args.multi_column_share, args.table_rate, not args.no_compress)
+    print(f"Wrote {len(manifest)} PDFs ({sum(entry['pages'] for entry in manifest)} pages) to {args.out_dir}")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Single-pass text normalization
+Lines and sections are normalized once: one precompiled str.translate table
+drops invisible characters and maps ligatures and unusual spaces, then
+whitespace runs collapse. The raw, normalized and lowercased forms are kept
+together with word offsets, so heading detection, scoring and summarizing
+reuse them instead of each re-stripping, re-lowercasing and re-splitting
+the same strings.
+"""
+
+import re
+from typing import List, Tuple, NamedTuple
+
+# Spaces other than U+0020 that PDF text extraction produces
+_SPACES = ('\t\x0b\x0c\r\x1c\x1d\x1e\x1f\x85\xa0\u1680' + ''.join(map(chr, range(0x2000, 0x200b))) +
+           '\u2028\u2029\u202f\u205f\u3000')
+
+# Control characters, soft hyphens and zero-width characters carry no text
+_INVISIBLE = (''.join(map(chr, range(0x00, 0x09))) + ''.join(map(chr, range(0x0e, 0x1c))) +
+              '\x7f\xad\u200b\u200c\u200d\u2060\ufeff')
+
+_LIGATURES = {'\ufb00': 'ff', '\ufb01': 'fi', '\ufb02': 'fl', '\ufb03': 'ffi', '\ufb04': 'ffl',
+              '\ufb05': 'st', '\ufb06': 'st'}
+
+# Blocks keep their line breaks; a single line has none
+BLOCK_TABLE = str.maketrans({**{c: ' ' for c in _SPACES}, **{c: None for c in _INVISIBLE}, **_LIGATURES})
+LINE_TABLE = str.maketrans({**{c: ' ' for c in _SPACES + '\n'}, **{c: None for c in _INVISIBLE},
+                            **_LIGATURES})
+
+_WORD_SPAN = re.compile(r'\S+')
+
+
+class NormalizedText(NamedTuple):
+    raw: str
+    normalized: str
+    lower: str
+    spans: Tuple[Tuple[int, int], ...]  # (start, end) of every word in normalized/lower
+
+    @property
+    def words(self) -> List[str]:
+        return [self.normalized[start:end] for start, end in self.spans]
+
+    @property
+    def word_count(self) -> int:
+        return len(self.spans)
+
+
+def normalize_line(text: str) -> NormalizedText:
+    """Normalize a single line: every whitespace run becomes one space, ends stripped."""
+    normalized = ' '.join(text.translate(LINE_TABLE).split())
+    return NormalizedText(text, normalized, normalized.lower(),
+                          tuple(match.span() for match in _WORD_SPAN.finditer(normalized)))
+
+
+def normalize_block(text: str) -> NormalizedText:
+    """Normalize multi-line text, keeping its line breaks (and so its paragraphs)."""
+    normalized = '\n'.join(' '.join(line.split()) for line in text.translate(BLOCK_TABLE).split('\n')).strip()
+    return NormalizedText(text, normalized, normalized.lower(),
+                          tuple(match.span() for match in _WORD_SPAN.finditer(normalized)))
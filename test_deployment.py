@@ -129,7 +129,7 @@ def test_docker_builds():
         os.chdir("Challenge_1a")
         result = subprocess.run([
             "docker", "build", "--platform", "linux/amd64", 
-            "-t", "pdf-outline-extractor:test", "."
+            "-f", "Dockerfile", "-t", "pdf-outline-extractor:test", ".."
         ], capture_output=True, text=True)
         
         if result.returncode == 0:
@@ -146,7 +146,7 @@ def test_docker_builds():
         os.chdir("../Challenge_1b")
         result = subprocess.run([
             "docker", "build", "--platform", "linux/amd64", 
-            "-t", "persona-doc-analyzer:test", "."
+            "-f", "Dockerfile", "-t", "persona-doc-analyzer:test", ".."
         ], capture_output=True, text=True)
         
         if result.returncode == 0: